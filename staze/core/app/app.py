@@ -2,6 +2,7 @@ import os
 import sys
 import code
 import secrets
+import time
 from typing import Callable, Type
 
 from flask_cors import CORS
@@ -12,6 +13,7 @@ from staze.core import validation
 from staze.core.app.app_error import AppError
 from staze.core.app.app_mode_enum import (
     RunAppModeEnum, HelperAppModeEnum, DatabaseAppModeEnum, AppModeEnumUnion)
+from staze.core.database.sql_instrumentation import SqlInstrumentation
 from staze.core.log.log import log
 from flask import Flask, request
 from flask.wrappers import Response
@@ -27,7 +29,25 @@ from .turbo_action_enum import TurboActionEnum
 
 class App(Service):
     """Core app's class.
+
+    Besides Flask settings, app's config accepts policy of capturing response
+    bodies to request logs:
+        log_response_body_max_bytes:
+            Maximum amount of bytes captured from the body, 0 disables
+            capturing. Defaults to 8192
+        log_response_body_mime_types:
+            Mime types of responses to capture, wildcard subtypes like
+            `text/*` are allowed. Defaults to json and text types
+        log_response_body_excluded_routes:
+            Routes responses of which are never captured, e.g.
+            `/users/<id>`. Defaults to empty list
     """
+    DEFAULT_LOG_RESPONSE_BODY_MAX_BYTES: int = 8192
+    DEFAULT_LOG_RESPONSE_BODY_MIME_TYPES: list[str] = [
+        'application/json',
+        'text/*'
+    ]
+
     def __init__(
                 self, 
                 config: dict,
@@ -65,6 +85,14 @@ class App(Service):
             "STATIC_DIR", self.DEFAULT_STATIC_DIR
         )
 
+        # Policy of response body capturing to request logs
+        self._log_response_body_max_bytes: int = \
+            self.config['LOG_RESPONSE_BODY_MAX_BYTES']
+        self._log_response_body_mime_types: list[str] = \
+            self.config['LOG_RESPONSE_BODY_MIME_TYPES']
+        self._log_response_body_excluded_routes: set[str] = set(
+            self.config['LOG_RESPONSE_BODY_EXCLUDED_ROUTES'])
+
         super().__init__(self.config)
         self._mode_enum: AppModeEnumUnion = mode_enum
         self._root_dir: str = self.config['ROOT_DIR']
@@ -118,23 +146,24 @@ class App(Service):
     def _handle_after_request_default(self, response: Response) -> Response:
         """Log all responses
         """
-        # This line should be exactly here, at the top of the after_request
-        # function in order to work properly on flask-admin, but i don't know
-        # why it works this way
-        # https://github.com/closeio/Flask-gzip/issues/7
-        response.direct_passthrough = False
-
         # https://gist.github.com/alexaleluia12/e40f1dfa4ce598c2e958611f67d28966
         log_func: Callable
 
         # All request-related data will be populated in log layer, so here work
         # only with response
-        _log = log.logger.bind(
+        log_kwargs: dict = dict(
+            event_duration=self._get_request_duration(),
             http_response_headers=dict(response.headers),
             http_response_status_code=response.status_code,
-            http_response_mime_type=response.mimetype,
-            http_response_body_content=response.get_data(as_text=True)
+            http_response_mime_type=response.mimetype
         )
+        body: str | None = self._get_response_body_for_log(response)
+        if body is not None:
+            log_kwargs['http_response_body_content'] = body
+        sql_stats: dict | None = SqlInstrumentation.get_request_stats()
+        if sql_stats is not None:
+            log_kwargs.update(sql_stats)
+        _log = log.logger.bind(**log_kwargs)
 
         if response.status_code < 400:
             log_func = _log.info
@@ -145,6 +174,65 @@ class App(Service):
         
         return response
 
+    def _mark_request_start(self) -> None:
+        request.environ['staze.request_started_at'] = time.perf_counter_ns()
+
+    def _get_request_duration(self) -> int:
+        """Return nanoseconds elapsed since the request start."""
+        started_at: int | None = request.environ.get(
+            'staze.request_started_at', None)
+        if started_at is None:
+            return 0
+        return time.perf_counter_ns() - started_at
+
+    def _get_response_body_for_log(self, response: Response) -> str | None:
+        """Return response body to be logged according to the app's capture
+        policy, or None if the body shouldn't be captured.
+
+        Streamed and passthrough responses (e.g. file downloads) are never
+        captured, so they are not buffered to memory just to be logged.
+        """
+        if (
+                self._log_response_body_max_bytes <= 0
+                or response.is_streamed
+                or response.direct_passthrough):
+            return None
+
+        if not self._is_mime_type_logged(response.mimetype):
+            return None
+
+        if request.url_rule is not None:
+            if request.url_rule.rule in self._log_response_body_excluded_routes:
+                return None
+
+            view_func: Callable | None = self.native_app.view_functions.get(
+                request.url_rule.endpoint)
+            view_class: type[View] | None = getattr(
+                view_func, 'view_class', None)
+            if (
+                    view_class is not None
+                    and issubclass(view_class, View)
+                    and not view_class.IS_RESPONSE_BODY_LOGGED):
+                return None
+
+        data: bytes = response.get_data()
+        return data[:self._log_response_body_max_bytes].decode(
+            response.mimetype_params.get('charset', 'utf-8'),
+            errors='replace')
+
+    def _is_mime_type_logged(self, mime_type: str | None) -> bool:
+        # Response may have no content type at all
+        if mime_type is None:
+            return False
+
+        for allowed in self._log_response_body_mime_types:
+            if allowed.endswith('/*'):
+                if mime_type.startswith(allowed[:-1]):
+                    return True
+            elif mime_type == allowed:
+                return True
+        return False
+
     def _assign_defaults_to_config(self, config: dict) -> None:
         if 'TEMPLATE_DIR' not in config:
             config['TEMPLATE_DIR'] = self.DEFAULT_TEMPLATE_DIR
@@ -152,6 +240,14 @@ class App(Service):
             config['STATIC_DIR'] = self.DEFAULT_STATIC_DIR
         if 'INSTANCE_DIR' not in config:
             config['INSTANCE_DIR'] = self.DEFAULT_INSTANCE_DIR
+        if 'LOG_RESPONSE_BODY_MAX_BYTES' not in config:
+            config['LOG_RESPONSE_BODY_MAX_BYTES'] = \
+                self.DEFAULT_LOG_RESPONSE_BODY_MAX_BYTES
+        if 'LOG_RESPONSE_BODY_MIME_TYPES' not in config:
+            config['LOG_RESPONSE_BODY_MIME_TYPES'] = \
+                self.DEFAULT_LOG_RESPONSE_BODY_MIME_TYPES
+        if 'LOG_RESPONSE_BODY_EXCLUDED_ROUTES' not in config:
+            config['LOG_RESPONSE_BODY_EXCLUDED_ROUTES'] = []
 
     def _validate_config(self, config: dict) -> None:
         """Check if all keys in the config are correct."""
@@ -393,6 +489,9 @@ class App(Service):
         code.interact(banner=banner, local=ctx)
 
     def _init_app_daemons(self) -> None:
+        # Request duration is measured for request logs
+        self.native_app.before_request(self._mark_request_start)
+
         if self._ctx_processor_func:
             self._ctx_processor_func = self.native_app.context_processor(
                 self._ctx_processor_func)
@@ -18,6 +18,7 @@ class HelperAppModeEnum(Enum):
     DEPLOY = 'deploy'
     VERSION = 'version'
     EXEC = 'exec'
+    LOGS = 'logs'
 
 
 AppModeEnumUnion = DatabaseAppModeEnum | RunAppModeEnum | HelperAppModeEnum
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import importlib.util
+import json
 import os
 import shutil
 import sys
@@ -22,6 +23,8 @@ from staze.core.database.database import Database
 from staze.core.error.error import Error
 from staze.core.error_handler import ErrorHandler
 from staze.core.log.log import log
+from staze.core.log.log_segment_reader import LogSegmentReader
+from staze.core.log.log_segment_writer import LogSegmentWriter
 from staze.core.model.config import Config
 from staze.core.service.service import Service
 from staze.core.socket.socket import Socket
@@ -57,6 +60,9 @@ class Assembler(Singleton):
         executables_to_execute (optional):
             List of string objects which callable objects with the same name
             has to be presented in build.executables to be called
+        log_query (optional):
+            Criteria to query segment logs with in LOGS mode, as
+            LogSegmentReader.query accepts
     """
     def __init__(
             self, 
@@ -69,6 +75,7 @@ class Assembler(Singleton):
             root_dir: str = os.getcwd(),
             extra_configs_by_name: dict[str, Any] | None = None,
             executables_to_execute: list[str] | None = None,
+            log_query: dict | None = None,
             _has_to_recreate_migrations: bool = False,
             _is_self_test: bool = False
         ) -> None:
@@ -81,6 +88,9 @@ class Assembler(Singleton):
         self.mode_enum: AppModeEnumUnion = mode_enum
         self.cli_args = cli_args
         self.executables_to_execute = executables_to_execute
+        self.log_query: dict = log_query or {}
+        # Log arguments the log is set up with
+        self.log_kwargs: dict = {}
         self.host = host
         self.port = port
 
@@ -323,6 +333,8 @@ class Assembler(Singleton):
                 self._run_shell()
             elif self.mode_enum is HelperAppModeEnum.EXEC: 
                 self._run_exec()
+            elif self.mode_enum is HelperAppModeEnum.LOGS:
+                self._run_logs_query()
             elif self.mode_enum is HelperAppModeEnum.DEPLOY:
                 # TODO: Implement deploy operation.
                 raise NotImplementedError
@@ -389,6 +401,18 @@ class Assembler(Singleton):
             raise NoDefinedExecutablesExecAssemblerError(
                 'No executables are defined')
 
+    def _run_logs_query(self) -> None:
+        """Print records of segment logs matching query, one JSON per line.
+        """
+        if self.log_kwargs.get('storage', 'file') != 'segments':
+            raise AssemblerError(
+                'Logs can be queried only for log with segments storage')
+
+        reader = LogSegmentReader(
+            LogSegmentWriter.get_segment_path(self.log_kwargs['path']))
+        for record in reader.query(**self.log_query):
+            print(json.dumps(record))
+
     def _run_shell(self):
         """Invoke app interactive shell."""
         self.app.run_shell()
@@ -448,6 +472,7 @@ class Assembler(Singleton):
             log._service_by_hash = self._service_by_hash
             log._mode_enum = self.mode_enum
 
+            self.log_kwargs = log_kwargs
             log.setup(**log_kwargs)
 
     def _build_custom_socks(self) -> None:
@@ -474,7 +499,8 @@ class Assembler(Singleton):
 
         The setup_database requires native flask app to work with.
         """
-        self.database.setup(flask_app=self.app.get_native_app())
+        self.database.setup(
+            flask_app=self.app.get_native_app(), mode_enum=self.mode_enum)
 
     def _build_custom_services(self) -> None:
         if self.service_classes:
@@ -1,6 +1,7 @@
 import os
 import re
 import sys
+from datetime import datetime
 from typing import get_args
 
 import pytest
@@ -81,6 +82,7 @@ class Cli():
             root_dir=root_dir,
             build=self.build, 
             executables_to_execute=cli_input.executables_to_execute,
+            log_query=cli_input.log_query,
             _has_to_recreate_migrations=_has_to_recreate_migrations,
             _is_self_test=_is_self_test
         )
@@ -106,6 +108,8 @@ class Cli():
                 ModeEnumClass = HelperAppModeEnum
                 self._has_to_check_following_flags = False 
                 self._has_to_check_following_values = True
+            case 'logs':
+                ModeEnumClass = HelperAppModeEnum
             case _:
                 try:
                     # Find enum where mode assigned
@@ -123,7 +127,10 @@ class Cli():
         # "staze" and mode keyword. Searching starts in any case, even if it's
         # not required (e.g. mode "version" already picked) to find possible
         # mistakes and raise error for that
-        if mode_enum is not RunAppModeEnum.TEST:
+        if mode_enum is HelperAppModeEnum.LOGS:
+            # Logs mode has own subcommands with own flags
+            self._parse_log_query(cli_input_kwargs)
+        elif mode_enum is not RunAppModeEnum.TEST:
             # For all other cases perform standard searching
             try:
                 self._search_args(2, cli_input_kwargs)
@@ -173,6 +180,74 @@ class Cli():
 
         self._search_args(next_index, cli_input_kwargs)
 
+    def _parse_log_query(self, cli_input_kwargs: dict) -> None:
+        """Parse "logs query" subcommand flags, e.g.
+        "staze logs query --since 2022-01-01T00:00:00 --level ERROR".
+        """
+        try:
+            subcommand: str = self.args[2]
+        except IndexError:
+            raise CliError('No subcommand specified for mode logs')
+        if subcommand != 'query':
+            raise CliError(f'Unrecognized logs subcommand: {subcommand}')
+
+        log_query: dict = {}
+        index: int = 3
+
+        while index < len(self.args):
+            flag: str = self.args[index]
+            try:
+                value: str = self.args[index+1]
+            except IndexError:
+                raise CliError(f'No value specified for flag {flag}')
+
+            match flag:
+                case '--since':
+                    key = 'since'
+                    parsed_value = self._parse_time(value)
+                case '--until':
+                    key = 'until'
+                    parsed_value = self._parse_time(value)
+                case '--level':
+                    key = 'level'
+                    parsed_value = value.upper()
+                case '--service-hash':
+                    key = 'service_hash'
+                    parsed_value = self._parse_int(flag, value)
+                case '--status':
+                    key = 'status_code'
+                    parsed_value = self._parse_int(flag, value)
+                case _:
+                    raise CliError(f'Unrecognized logs query flag: {flag}')
+
+            if key in log_query:
+                raise RepeatingArgCliError(
+                    f'Flag {flag} has been defined twice')
+            log_query[key] = parsed_value
+            index += 2
+
+        cli_input_kwargs['log_query'] = log_query
+
+    def _parse_time(self, value: str) -> float:
+        """Parse unix timestamp or ISO 8601 datetime to timestamp."""
+        try:
+            return float(value)
+        except ValueError:
+            pass
+
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            raise CliError(
+                f'Wrong time: {value}, expected unix timestamp or ISO 8601'
+                ' datetime')
+
+    def _parse_int(self, flag: str, value: str) -> int:
+        try:
+            return int(value)
+        except ValueError:
+            raise CliError(f'Value of flag {flag} should be integer')
+
     def _parse_bind(
             self, flag_index: int, cli_input_kwargs: dict
         ) -> int:
@@ -10,3 +10,4 @@ class CliInput(Model):
     host: str = DEFAULT_HOST
     port: int = DEFAULT_PORT
     executables_to_execute: list[str] = []
+    log_query: dict = {}
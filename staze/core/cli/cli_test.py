@@ -10,7 +10,8 @@ from staze.core.assembler.assembler_error import (
     NoExecutableWithSuchNameExecAssemblerError)
 from staze.core.assembler.build import Build
 from staze.core.cli.cli import Cli
-from staze.core.cli.cli_error import (BindStringParsingCliError, RedundantFlagCliError,
+from staze.core.cli.cli_error import (BindStringParsingCliError, CliError,
+                                      RedundantFlagCliError,
                                       RedundantValueCliError,
                                       RepeatingArgCliError,
                                       UncompatibleArgsCliError)
@@ -221,3 +222,39 @@ class TestCliExecute:
         assert assembler.host == DEFAULT_HOST
         assert assembler.port == 3000
         assert assembler.mode_enum.value == "prod"
+
+    def test_logs_query(self, cli_blog: Cli):
+        assembler: Assembler = cli_blog.execute(
+            [
+                'staze', 'logs', 'query',
+                '--since', '2022-01-01T00:00:00+00:00',
+                '--until', '1700000000',
+                '--level', 'error',
+                '--service-hash', '123',
+                '--status', '500'
+            ],
+            has_to_run_assembler=False,
+            _is_self_test=True
+        )
+
+        assert assembler.mode_enum.value == 'logs'
+        assert assembler.log_query == {
+            'since': 1640995200.0,
+            'until': 1700000000.0,
+            'level': 'ERROR',
+            'service_hash': 123,
+            'status_code': 500
+        }
+
+    def test_logs_wrong_subcommand(self, cli_blog: Cli):
+        try:
+            cli_blog.execute(
+                ['staze', 'logs', 'delete'],
+                has_to_run_assembler=False,
+                _is_self_test=True
+            )
+        except CliError:
+            pass
+        else:
+            raise AssertionError(
+                'Unrecognized logs subcommand should result in CliError')
@@ -1,10 +1,26 @@
 from __future__ import annotations
+import itertools
+import math
+import operator
 import re
+import time
+from contextlib import contextmanager
 from functools import wraps
-from typing import TYPE_CHECKING, Callable, Any, TypeVar
+from typing import TYPE_CHECKING, Callable, Any, Iterable, Iterator, TypeVar
 
 from warepy import format_message, snakefy
+from staze.core.app.app_mode_enum import AppModeEnumUnion, RunAppModeEnum
+from staze.core.database.memory_query_cache_backend import (
+    MemoryQueryCacheBackend)
+from staze.core.database.n_plus_one_detector import NPlusOneDetector
 from staze.core.database.orm_not_found_error import OrmNotFoundError
+from staze.core.database.pool_metrics import PoolMetrics
+from staze.core.database.query_cache import QueryCache
+from staze.core.database.query_cache_backend import QueryCacheBackend
+from staze.core.database.replica_router import ReplicaRouter
+from staze.core.database.routing_session import RoutingSession
+from staze.core.database.sql_instrumentation import SqlInstrumentation
+from staze.core.database.sqlite_profile import SqliteProfile
 from staze.core.model.model import Model
 from staze.core.log.log import log
 from flask import Flask
@@ -12,6 +28,7 @@ import flask_migrate
 from flask_sqlalchemy import SQLAlchemy
 from flask_sqlalchemy import Model as BaseOrm
 import sqlalchemy as sa
+from sqlalchemy.sql import operators
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.declarative import declared_attr
 
@@ -23,6 +40,7 @@ if TYPE_CHECKING:
 
 
 AnyOrm = TypeVar('AnyOrm', bound='Database.Orm')
+AnyModel = TypeVar('AnyModel', bound=Model)
 
 
 # TODO: Fix type hinting for decorated functions under this decorator.
@@ -58,8 +76,62 @@ class Orm(BaseOrm):
     # Name to exclude on tablename forming
     _BASE_NAME: str = 'Orm'
 
+    # Amount of seconds results of `get_first()` and `get_all()` are cached
+    # for. Cached results are invalidated on commit of changes to the Orm's
+    # tables made through the session. If None, results are not cached.
+    # Results of queries with loader options are never cached, since only
+    # column attributes are kept by the cache. Cached queries are read from
+    # primary, since lagging replica could fill the cache with rows stale
+    # for the whole TTL
+    CACHE_TTL: float | None = None
+
+    # Default loading strategies of relationships by their names, used by
+    # `get_first()`, `get_all()` and `iter_all()`, e.g.:
+    #   `{'_post_orms': 'selectin', '_post_orms._tag_orms': 'joined'}`
+    # Strategies given to the helpers by `load` argument override these
+    DEFAULT_LOAD: dict[str, str] = {}
+
+    # Loader functions of sqlalchemy by loading strategies. `raise` makes
+    # access to not loaded relationship to raise an error instead of emitting
+    # a query, e.g. `{'*': 'raise'}` forbids all lazy loads
+    LOADERS: dict[str, str] = {
+        'select': 'lazyload',
+        'selectin': 'selectinload',
+        'joined': 'joinedload',
+        'subquery': 'subqueryload',
+        'raise': 'raiseload'
+    }
+
+    # Codes of polymorphic identities of the Orm and it's subclasses stored
+    # in indexed small integer `_type` column instead of identities
+    # themselves, e.g.:
+    #   `{'user': 1, 'advanced_user': 2}`
+    # Should be defined at the base Orm of the table and never change codes
+    # of stored identities. Existing tables are converted by
+    # TypeCodeMigration. If None, identities are stored as strings
+    TYPE_CODES: dict[str, int] | None = None
+
+    # Whether queries of the Orm load columns of all it's subclasses at once,
+    # i.e. sqlalchemy's `with_polymorphic='*'`. Otherwise columns declared
+    # only at subclass are loaded on first access for every model
+    WITH_POLYMORPHIC: bool = False
+
+    # Model class Orms are converted to by `model` and `to_models()`
+    MODEL_CLASS: type[Model] | None = None
+    # Attribute names of the Orm by field names of MODEL_CLASS, fields not
+    # listed are taken from attributes of the same name
+    MODEL_FIELDS: dict[str, str] = {}
+
+    # Field names and getter of their values by Orm classes
+    _model_mappings: dict[Any, tuple[list[str], Callable]] = {}
+
     _id = sa.Column(sa.Integer, primary_key=True)
-    _type = sa.Column(sa.String(250))
+
+    @declared_attr
+    def _type(cls) -> Any:
+        if cls.TYPE_CODES is None:
+            return sa.Column(sa.String(250))
+        return sa.Column(sa.SmallInteger, index=True)
 
     @hybrid_property
     def id(self):
@@ -67,7 +139,18 @@ class Orm(BaseOrm):
 
     @hybrid_property
     def type(self):
-        return self._type
+        if self.TYPE_CODES is None:
+            return self._type
+        return self.__identity__
+
+    @type.expression
+    def type(cls):
+        if cls.TYPE_CODES is None:
+            return cls._type
+        # Filtering by the expression doesn't use the index, subclass
+        # queries should be used instead
+        return sa.case(
+            {v: k for k, v in cls.TYPE_CODES.items()}, value=cls._type)
 
     @declared_attr
     def __tablename__(cls) -> str:
@@ -80,11 +163,21 @@ class Orm(BaseOrm):
 
     @declared_attr
     def __mapper_args__(cls) -> dict[str, Any]:
+        identity: str | int = cls.__identity__
+        if cls.TYPE_CODES is not None:
+            try:
+                identity = cls.TYPE_CODES[cls.__identity__]
+            except KeyError:
+                raise ValueError(
+                    f'No type code for identity {cls.__identity__}')
+
         args: dict[str, Any] = {}
         args.update({
             'polymorphic_on': '_type',
-            'polymorphic_identity': cls.__identity__
+            'polymorphic_identity': identity
         })
+        if cls.WITH_POLYMORPHIC:
+            args['with_polymorphic'] = '*'
         return args
 
     @classmethod
@@ -103,23 +196,44 @@ class Orm(BaseOrm):
     def get_first(
             cls,
             order_by: object | list[object] | None = None,
+            load: dict[str, str] | None = None,
             **kwargs) -> Database.Orm:
         """Filter first ORM orm model by given kwargs and return it.
+
+        Args:
+            order_by (optional):
+                Column or list of columns to order by. Defaults to None
+            load (optional):
+                Loading strategies by relationship names, see LOADERS.
+                Defaults to None, i.e. DEFAULT_LOAD is used
         
         Raise:
             ValueError:
                 No such ORM model in database matched given kwargs
         """
-        query: Any = cls.query.filter_by(**kwargs)  # type: ignore
+        load = cls._get_load(load)
+        cache: QueryCache | None = cls._get_query_cache(load)
+        if cache is not None:
+            key: str = cache.make_key(cls, 'first', kwargs, order_by)
+            cached: Any | None = cache.get(cls, key)
+            if cached is not None:
+                return cache.attach(cls._get_session(), cached)
+
+        query: Any = cls._load_query(
+            cls.query.filter_by(**kwargs), load)  # type: ignore
 
         if order_by is not None:
             query = cls._order_query(query, order_by)
 
+        if cache is None:
+            query = cls._read_from_replicas(query)
         model: Database.Orm = query.first()
 
         if not model:
             raise OrmNotFoundError(orm_name=cls.__name__, **kwargs)
         else:
+            if cache is not None:
+                cache.set(key, cache.detach(model), cls.CACHE_TTL)
             return model
 
     @classmethod
@@ -127,14 +241,49 @@ class Orm(BaseOrm):
             cls,
             order_by: object | list[object] | None = None,
             limit: int | None = None,
-            **kwargs) -> list[Database.Orm]:
+            load: dict[str, str] | None = None,
+            columns: list[str | object] | None = None,
+            **kwargs) -> list[Database.Orm] | list[sa.engine.Row]:
         """Filter all ORM orm models by given kwargs and return them.
 
+        Relationships of the models can be loaded by `load` strategies
+        within fixed amount of queries instead of one query per model on
+        access.
+
+        If `columns` are given, rows of them are returned instead of models,
+        see `select_rows()`.
+
+        Args:
+            order_by (optional):
+                Column or list of columns to order by. Defaults to None
+            limit (optional):
+                Maximum amount of models. Defaults to None
+            load (optional):
+                Loading strategies by relationship names, see LOADERS.
+                Defaults to None, i.e. DEFAULT_LOAD is used
+            columns (optional):
+                Names of attributes or column expressions to select.
+                Defaults to None, i.e. models are selected
+
         Return:
             List of found models.
             If no models found, empty list is returned.
         """
-        query: Any = cls.query.filter_by(**kwargs)  # type: ignore
+        if columns is not None:
+            return cls.select_rows(
+                *columns, order_by=order_by, limit=limit, **kwargs)
+
+        load = cls._get_load(load)
+        cache: QueryCache | None = cls._get_query_cache(load)
+        if cache is not None:
+            key: str = cache.make_key(cls, 'all', kwargs, order_by, limit)
+            cached: Any | None = cache.get(cls, key)
+            if cached is not None:
+                session: Any = cls._get_session()
+                return [cache.attach(session, x) for x in cached]
+
+        query: Any = cls._load_query(
+            cls.query.filter_by(**kwargs), load)  # type: ignore
 
         if order_by is not None:
             query = cls._order_query(query, order_by)
@@ -144,14 +293,222 @@ class Orm(BaseOrm):
         elif limit:
             query = query.limit(limit)
 
+        if cache is None:
+            query = cls._read_from_replicas(query)
         models: list[Database.Orm] = query.all()
 
         if type(models) is not list:
             raise OrmNotFoundError(model_name=cls.__name__, **kwargs)
         else:
+            if cache is not None:
+                cache.set(
+                    key, [cache.detach(x) for x in models], cls.CACHE_TTL)
             # Return models even if it's empty list
             return models
 
+    @classmethod
+    def iter_all(
+            cls,
+            chunk_size: int = 1000,
+            order_by: object | list[object] | None = None,
+            load: dict[str, str] | None = None,
+            **kwargs) -> Iterator[Database.Orm]:
+        """Filter all ORM models by given kwargs and yield them chunk by
+        chunk.
+
+        Chunks are fetched by keyset pagination: every next chunk is queried
+        for rows following the last row of previous one in order of given
+        columns, so memory usage doesn't depend on table size and rows
+        inserted during iteration don't shift chunks. Id is always appended
+        to the order to make it unique.
+
+        Models of the chunk are expunged from the session once the next chunk
+        is requested, so they should not be changed or lazy loaded after that.
+
+        Args:
+            chunk_size (optional):
+                Amount of rows fetched at once. Defaults to 1000
+            order_by (optional):
+                Column or list of columns to order by, all ascending or all
+                descending. Defaults to None, i.e. ordered by id
+            load (optional):
+                Loading strategies by relationship names, see LOADERS.
+                Defaults to None, i.e. DEFAULT_LOAD is used
+
+        Raise:
+            ValueError:
+                Wrong chunk size or order columns of mixed directions.
+        """
+        if chunk_size < 1:
+            raise ValueError(
+                f'Chunk size should be positive, got {chunk_size}')
+
+        order: list[object]
+        if order_by is None:
+            order = []
+        elif type(order_by) is list:
+            order = list(order_by)
+        else:
+            order = [order_by]
+
+        columns: list[Any] = []
+        directions: set[bool] = set()
+        for x in order:
+            is_descending: bool = \
+                getattr(x, 'modifier', None) is operators.desc_op
+            directions.add(is_descending)
+            columns.append(x.element if is_descending else x)  # type: ignore
+        if len(directions) > 1:
+            raise ValueError(
+                'Keyset pagination requires all order columns to have the'
+                ' same direction')
+        is_descending = directions.pop() if directions else False
+
+        if not any(getattr(x, 'key', None) == '_id' for x in columns):
+            columns.append(cls._id)
+            order.append(cls._id.desc() if is_descending else cls._id)
+
+        keys: list[str] = [x.key for x in columns]
+        session: Any = Database.instance().native_database.session
+        load = cls._get_load(load)
+        is_yield_per_supported: bool = cls._is_yield_per_supported(load)
+        last_values: tuple | None = None
+
+        while True:
+            query: Any = cls._load_query(
+                cls.query.filter_by(**kwargs), load)  # type: ignore
+
+            if last_values is not None:
+                keyset: Any = sa.tuple_(*columns)
+                if is_descending:
+                    query = query.filter(keyset < sa.tuple_(*last_values))
+                else:
+                    query = query.filter(keyset > sa.tuple_(*last_values))
+
+            query = query.order_by(*order).limit(chunk_size)
+            if is_yield_per_supported:
+                # Rows are fetched from server-side cursor by parts instead
+                # of loading the whole chunk at once
+                query = query.yield_per(chunk_size)
+
+            query = cls._read_from_replicas(query)
+
+            models: list[Database.Orm] = []
+            for model in query:
+                models.append(model)
+                yield model
+
+            if not models:
+                return
+
+            last_values = tuple(getattr(models[-1], x) for x in keys)
+            for model in models:
+                if model in session:
+                    session.expunge(model)
+
+            if len(models) < chunk_size:
+                return
+
+    @classmethod
+    def select_rows(
+            cls,
+            *columns: str | object,
+            order_by: object | list[object] | None = None,
+            limit: int | None = None,
+            **kwargs) -> list[sa.engine.Row]:
+        """Select given columns of rows filtered by kwargs.
+
+        Rows are plain named tuples, so neither models are constructed nor
+        they are kept in the session's identity map, which makes reads of
+        many rows considerably cheaper if only some of columns are needed.
+
+        Args:
+            *columns:
+                Names of attributes, including hybrid ones, or column
+                expressions to select. Rows are accessible by attribute names
+                and labels of expressions
+            order_by (optional):
+                Column or list of columns to order by. Defaults to None
+            limit (optional):
+                Maximum amount of rows. Defaults to None
+
+        Raise:
+            ValueError:
+                No columns are given.
+        """
+        return cls._make_rows_query(
+            cls._get_session(), columns, order_by, limit, kwargs).all()
+
+    @classmethod
+    def select_models(
+            cls,
+            model_class: type[AnyModel],
+            order_by: object | list[object] | None = None,
+            limit: int | None = None,
+            **kwargs) -> list[AnyModel]:
+        """Select rows filtered by kwargs and build models of them.
+
+        Only columns of attributes named as fields of the model are
+        selected, so Orm should define attribute or hybrid property for
+        every field, e.g. UserOrm's `username` for User's `username`.
+        """
+        fields: list[str] = list(model_class.__fields__)
+        return [
+            model_class(**row._mapping)
+            for row in cls.select_rows(
+                *fields, order_by=order_by, limit=limit, **kwargs)
+        ]
+
+    @classmethod
+    def _make_rows_query(
+            cls,
+            session: Any,
+            columns: Iterable[str | object],
+            order_by: object | list[object] | None,
+            limit: int | None,
+            kwargs: dict) -> Any:
+        selected: list[Any] = [
+            getattr(cls, x).label(x) if isinstance(x, str) else x
+            for x in columns
+        ]
+        if not selected:
+            raise ValueError('At least one column should be selected')
+
+        # Selecting from the Orm keeps polymorphic criteria of subclasses
+        query: Any = session.query(*selected).select_from(cls).filter_by(
+            **kwargs)
+        if order_by is not None:
+            query = cls._order_query(query, order_by)
+        if limit:
+            query = query.limit(limit)
+        return cls._read_from_replicas(query)
+
+    @classmethod
+    def _read_from_replicas(cls, query: Any) -> Any:
+        # Only queries of read helpers are marked, lazy loads and queries made
+        # by the developer go to primary
+        return query.execution_options(
+            **{RoutingSession.REPLICA_READS_OPTION: True})
+
+    @classmethod
+    def _is_yield_per_supported(cls, load: dict[str, str]) -> bool:
+        # Eager loading of collections by joins or subqueries requires the
+        # whole result to be loaded
+        for relationship in sa.inspect(cls).relationships:
+            if not relationship.uselist:
+                continue
+            lazy: str = relationship.lazy
+            for path, strategy in load.items():
+                if path in ('*', relationship.key):
+                    lazy = strategy
+            if lazy in ('joined', 'subquery'):
+                return False
+
+        # Nested collections are loaded by the same query as well
+        return not any(
+            '.' in path and strategy in ('joined', 'subquery')
+            for path, strategy in load.items())
+
     @classmethod
     def delete_first(
             cls,
@@ -162,6 +519,188 @@ class Orm(BaseOrm):
         model: Database.Orm = cls.get_first(order_by=order_by, **kwargs)
         database.delete(model)
 
+    @classmethod
+    def delete_where(cls, **kwargs) -> int:
+        """Delete ORM models filtered by given kwargs by a single statement.
+
+        Matched models loaded to the session are marked as deleted. Changes
+        are not committed, as by `Database.delete()`.
+
+        The statement bypasses the ORM: relationship cascades, including
+        delete-orphan, ORM events and validators are not applied, only
+        foreign keys' ON DELETE actions of the database itself. Use
+        `Database.delete()` for models relying on them.
+
+        Return:
+            Amount of deleted rows.
+        """
+        count: int = cls.query.filter_by(  # type: ignore
+            **kwargs).delete(synchronize_session='evaluate')
+        cls._mark_changed()
+        return count
+
+    @classmethod
+    def update_where(cls, filters: dict, values: dict) -> int:
+        """Update ORM models filtered by given filters by a single statement.
+
+        Matched models loaded to the session get new values. Changes are not
+        committed.
+
+        The statement bypasses the ORM: relationship cascades, ORM events,
+        validators and setters of hybrid properties are not applied. Set
+        attributes of loaded models for models relying on them.
+
+        Args:
+            filters:
+                Values to filter models by, as kwargs of `get_all()`.
+            values:
+                New values by attribute names, e.g. `{'_name': 'new'}`.
+                Values can be SQL expressions of the Orm's columns.
+
+        Return:
+            Amount of updated rows.
+        """
+        count: int = cls.query.filter_by(  # type: ignore
+            **filters).update(values, synchronize_session='evaluate')
+        cls._mark_changed()
+        return count
+
+    @classmethod
+    def get_count(cls, **kwargs) -> int:
+        """Count ORM models filtered by given kwargs without loading them."""
+        return cls._aggregate(sa.func.count(), kwargs)
+
+    @classmethod
+    def check_exists(cls, **kwargs) -> bool:
+        """Check if any ORM model matches given kwargs without loading it."""
+        session: Any = cls._get_session()
+        query: Any = session.query(
+            session.query(cls).filter_by(**kwargs).exists())
+        return bool(cls._read_from_replicas(query).scalar())
+
+    @classmethod
+    def get_sum(cls, column: object, **kwargs) -> Any:
+        """Sum column's values of ORM models filtered by given kwargs.
+
+        Return:
+            Sum or None, if no models matched.
+        """
+        return cls._aggregate(sa.func.sum(column), kwargs)
+
+    @classmethod
+    def get_min(cls, column: object, **kwargs) -> Any:
+        """Return minimal column's value of ORM models filtered by given
+        kwargs or None, if no models matched.
+        """
+        return cls._aggregate(sa.func.min(column), kwargs)
+
+    @classmethod
+    def get_max(cls, column: object, **kwargs) -> Any:
+        """Return maximal column's value of ORM models filtered by given
+        kwargs or None, if no models matched.
+        """
+        return cls._aggregate(sa.func.max(column), kwargs)
+
+    @classmethod
+    def get_avg(cls, column: object, **kwargs) -> Any:
+        """Return average column's value of ORM models filtered by given
+        kwargs or None, if no models matched.
+        """
+        return cls._aggregate(sa.func.avg(column), kwargs)
+
+    @classmethod
+    def _mark_changed(cls) -> None:
+        mapper: Any = sa.inspect(cls)
+        tables: set[Any] = set(mapper.tables)
+
+        # Cached results of related Orms embed rows of the changed ones by
+        # eager loads
+        for descendant in mapper.self_and_descendants:
+            for relationship in descendant.relationships:
+                tables.update(relationship.mapper.tables)
+                if relationship.secondary is not None:
+                    tables.add(relationship.secondary)
+
+        # Rows referencing the changed ones can be changed by the database
+        # itself, e.g. by foreign keys' ON DELETE actions
+        for table in mapper.local_table.metadata.tables.values():
+            if any(
+                    x.column.table in mapper.tables
+                    for x in table.foreign_keys):
+                tables.add(table)
+
+        Database.instance()._mark_tables_changed(x.name for x in tables)
+
+    @classmethod
+    def _aggregate(cls, function: Any, kwargs: dict) -> Any:
+        # Selecting from the Orm keeps polymorphic criteria of subclasses
+        # whatever columns are aggregated
+        query: Any = cls._get_session().query(function).select_from(
+            cls).filter_by(**kwargs)
+        return cls._read_from_replicas(query).scalar()
+
+    @classmethod
+    def _get_query_cache(cls, load: dict[str, str]) -> QueryCache | None:
+        if not cls.CACHE_TTL or load:
+            return None
+
+        # Session with uncommitted changes should read them, and results
+        # including them shouldn't be cached for other sessions
+        session: Any = cls._get_session()
+        if (
+                session.new
+                or session.dirty
+                or session.deleted
+                or session.info.get(Database.CHANGED_TABLES_KEY, None)
+                or session.info.get(ReplicaRouter.HAS_FLUSHED_KEY, False)):
+            return None
+
+        return Database.instance().query_cache
+
+    @classmethod
+    def _get_load(cls, load: dict[str, str] | None) -> dict[str, str]:
+        return {**cls.DEFAULT_LOAD, **(load or {})}
+
+    @classmethod
+    def _load_query(cls, query: Any, load: dict[str, str]) -> Any:
+        for path, strategy in load.items():
+            query = query.options(cls._make_loader_option(path, strategy))
+        return query
+
+    @classmethod
+    def _make_loader_option(cls, path: str, strategy: str) -> Any:
+        try:
+            loader_name: str = cls.LOADERS[strategy]
+        except KeyError:
+            raise ValueError(f'Unrecognized loading strategy: {strategy}')
+
+        if path == '*':
+            return getattr(sa.orm, loader_name)('*')
+
+        # Relationships preceding the last one of the path keep their own
+        # strategies
+        option: Any = sa.orm
+        orm_class: Any = cls
+        names: list[str] = path.split('.')
+        for i, name in enumerate(names):
+            relationship: Any | None = \
+                sa.inspect(orm_class).relationships.get(name, None)
+            if relationship is None:
+                raise ValueError(
+                    f'{orm_class.__name__} has no relationship {name}')
+
+            option = getattr(
+                option,
+                loader_name if i == len(names) - 1 else 'defaultload')(
+                    getattr(orm_class, name))
+            orm_class = relationship.mapper.class_
+
+        return option
+
+    @staticmethod
+    def _get_session() -> Any:
+        return Database.instance().native_database.session
+
     @staticmethod
     def _order_query(query: Any, order_by: object | list[object]) -> object:
         if type(order_by) is list:
@@ -177,9 +716,9 @@ class Orm(BaseOrm):
         Model.
 
         Example:
-            UserOrm has to define User(Model) subclass and redefine this
-            method to construct User(Model) class with values from the Orm
-            it requires.
+            UserOrm has to define User(Model) subclass and either set it as
+            MODEL_CLASS or redefine this method to construct User(Model)
+            class with values from the Orm it requires.
             It's often useful for API calls to Orms.
 
         Returns:
@@ -187,16 +726,156 @@ class Orm(BaseOrm):
                 Model subclass contained required to expose Orm's
                 properties.
         """
-        raise NotImplementedError(
-            'Should be re-implemented for Orm-specific Model subclass')
+        if cls.MODEL_CLASS is None:
+            raise NotImplementedError(
+                'Should be re-implemented for Orm-specific Model subclass')
+        return cls.to_models([cls], validation_rate=1)[0]
+
+    @classmethod
+    def to_models(
+            cls,
+            orms: Iterable[Database.Orm],
+            validation_rate: float = 0) -> list[Model]:
+        """Transform given Orms to MODEL_CLASS instances at once.
+
+        Values of the Orms are trusted, so models are constructed without
+        validation, which is a few times faster for lists of Orms. Mapping
+        of the fields to attributes is compiled once per Orm class.
+
+        Args:
+            orms:
+                Orms of the class or it's subclasses to transform.
+            validation_rate (optional):
+                Share of the models constructed with validation, e.g. 0.01
+                validates every hundredth one starting from the first, 1
+                validates all. Useful to catch mismatches of Orm values and
+                model fields in development. Defaults to 0
+
+        Raise:
+            NotImplementedError:
+                MODEL_CLASS is not set.
+            ValueError:
+                Validation rate is out of range from 0 to 1.
+            pydantic.ValidationError:
+                Validated Orm values don't match the model.
+        """
+        if cls.MODEL_CLASS is None:
+            raise NotImplementedError(
+                f'MODEL_CLASS should be set for {cls.__name__}')
+        if not 0 <= validation_rate <= 1:
+            raise ValueError(
+                'Validation rate should be from 0 to 1, got'
+                f' {validation_rate}')
+
+        model_class: type[Model] = cls.MODEL_CLASS
+        fields, get_values = cls._get_model_mapping()
+        stride: int = math.ceil(1 / validation_rate) if validation_rate else 0
+
+        # Every field is set by the mapping, so the set is copied instead of
+        # being collected by `construct()` for each model
+        fields_set: set[str] = set(fields)
+
+        models: list[Model] = []
+        for i, orm in enumerate(orms):
+            values: dict[str, Any] = dict(zip(fields, get_values(orm)))
+            if stride and i % stride == 0:
+                models.append(model_class(**values))
+            else:
+                models.append(
+                    model_class.construct(
+                        _fields_set=fields_set.copy(), **values))
+        return models
+
+    @classmethod
+    def _get_model_mapping(cls) -> tuple[list[str], Callable]:
+        mapping: tuple[list[str], Callable] | None = \
+            Orm._model_mappings.get(cls, None)
+
+        if mapping is None:
+            fields: list[str] = list(
+                cls.MODEL_CLASS.__fields__)  # type: ignore
+            getter: Callable = operator.attrgetter(
+                *(cls.MODEL_FIELDS.get(x, x) for x in fields))
+            if len(fields) == 1:
+                # Getter of single attribute returns value instead of tuple
+                mapping = (fields, lambda orm: (getter(orm),))
+            else:
+                mapping = (fields, getter)
+            Orm._model_mappings[cls] = mapping
+
+        return mapping
 
 
 class Database(Service):
-    """Operates over database processes."""
+    """Operates over database processes.
+
+    Config keys:
+        uri (optional):
+            Uri of the database. Defaults to sqlite database at root dir
+        query_cache_size (optional):
+            Maximum amount of results of Orms with `CACHE_TTL` kept in
+            in-process query cache. Defaults to 1024
+        pool (optional):
+            Connection pool options: `size`, `max_overflow`, `timeout` (in
+            seconds), `recycle` (in seconds), `pre_ping` as sqlalchemy's
+            engine accepts them with `pool_` prefix, and `stats_log_interval`
+            - amount of seconds to log pool stats every. Sizing options are
+            applied to sqlite databases only with `sqlite` config, since
+            otherwise they don't use queue pool. Defaults to sqlalchemy's
+            defaults
+        sqlite (optional):
+            Pragmas applied to every sqlite connection: `profile` - name of
+            SqliteProfile's predefined profile, and pragmas overriding
+            profile's ones: `journal_mode`, `synchronous`, `cache_size`,
+            `mmap_size`, `temp_store`, `busy_timeout`. Defaults to sqlite's
+            defaults
+        replicas (optional):
+            Read replicas config: `uris` - list of replica uris in the same
+            format as `uri`, and `balancing`, `read_your_writes_window`,
+            `retry_interval` as ReplicaRouter specifies. Reads of Orm helpers
+            are sent to replicas, except ones cached by `CACHE_TTL`, all
+            other queries - to primary. Defaults to
+            None, i.e. everything is sent to primary
+        instrumentation (optional):
+            Accounting of SQL statements: `enabled` - whether statements of
+            requests are accounted and bound to request logs, defaults to
+            True, and `slow_query_threshold` - amount of seconds statements
+            executed longer are logged, defaults to None, i.e. not logged.
+            See SqlInstrumentation. Also `n_plus_one_threshold` - amount of
+            executions of the same statement within a request allowed in dev
+            and test modes, defaults to 5, None disables detection. See
+            NPlusOneDetector
+        request_unit_of_work (optional):
+            Whether every request is wrapped to `transaction()`, so all
+            changes of the request are committed once after the view if
+            response status is below 400, and rolled back otherwise. If a
+            nested scope of the request has failed, response is replaced by
+            the error of `transaction()`. Defaults to False
+    """
+    # Key of session's info names of tables changed in the current
+    # transaction are collected under
+    CHANGED_TABLES_KEY: str = 'staze.changed_tables'
+    # Keys of session's info depth of nested `transaction()` scopes, models
+    # to refresh on the scope's commit and flag of failed nested scope are
+    # stored under
+    TRANSACTION_DEPTH_KEY: str = 'staze.transaction_depth'
+    PENDING_REFRESH_KEY: str = 'staze.pending_refresh'
+    ROLLBACK_ONLY_KEY: str = 'staze.rollback_only'
+    # Engine options by keys of `pool` config
+    POOL_OPTION_NAMES: dict[str, str] = {
+        'size': 'pool_size',
+        'max_overflow': 'max_overflow',
+        'timeout': 'pool_timeout',
+        'recycle': 'pool_recycle',
+        'pre_ping': 'pool_pre_ping'
+    }
+    # Options accepted only by queue pool
+    QUEUE_POOL_OPTION_KEYS: set[str] = {'size', 'max_overflow', 'timeout'}
     # Helper references for shorter writing at ORMs.
     # Ignore lines added for a workaround to fix issue:
     # https://github.com/microsoft/pylance-release/issues/187
-    native_database = SQLAlchemy(model_class=Orm)
+    native_database = SQLAlchemy(
+        model_class=Orm, session_options={'class_': RoutingSession})
     Orm: Any = native_database.Model 
     column = native_database.Column
     integer = native_database.Integer
@@ -221,6 +900,76 @@ class Database(Service):
         # For now service config propagated to Database domain
         self._assign_uri_from_config(config)
 
+        self.query_cache: QueryCache = QueryCache(
+            MemoryQueryCacheBackend(config.get('query_cache_size', 1024)))
+
+        self.pool_metrics: PoolMetrics | None = None
+        pool_config: dict = dict(config.get('pool', None) or {})
+        self._pool_stats_log_interval: float | None = pool_config.pop(
+            'stats_log_interval', None)
+
+        self.sqlite_profile: SqliteProfile | None = None
+        sqlite_config: dict | None = config.get('sqlite', None)
+        if sqlite_config:
+            if self.type_enum is not DatabaseTypeEnum.SQLITE:
+                raise ValueError(
+                    'Sqlite config is given for non-sqlite database')
+            self.sqlite_profile = SqliteProfile.from_config(sqlite_config)
+
+        self._engine_options: dict[str, Any] = self._get_engine_options(
+            pool_config)
+        if self.sqlite_profile is not None:
+            # By default file databases are connected on every checkout, which
+            # would reapply pragmas and drop connection's cache every time.
+            # Connections of the pool are used by one thread at a time, so
+            # they can be safely shared between threads
+            self._engine_options['poolclass'] = sa.pool.QueuePool
+            self._engine_options['connect_args'] = {
+                'check_same_thread': False
+            }
+
+        self.sql_instrumentation: SqlInstrumentation | None = None
+        instrumentation_config: dict = dict(
+            config.get('instrumentation', None) or {})
+        self.n_plus_one_detector: NPlusOneDetector | None = None
+        self._n_plus_one_threshold: int | None = instrumentation_config.pop(
+            'n_plus_one_threshold', NPlusOneDetector.DEFAULT_THRESHOLD)
+        if instrumentation_config.pop('enabled', True):
+            self.sql_instrumentation = SqlInstrumentation(
+                **instrumentation_config)
+
+        self._is_request_unit_of_work: bool = config.get(
+            'request_unit_of_work', False)
+
+        self.replica_router: ReplicaRouter | None = None
+        self._replicas_config: dict = dict(config.get('replicas', None) or {})
+        self._replicas_config['uris'] = [
+            self._parse_uri(x)[0]
+            for x in self._replicas_config.get('uris', [])
+        ]
+
+    def _get_engine_options(self, pool_config: dict) -> dict[str, Any]:
+        engine_options: dict[str, Any] = {}
+
+        for k, v in pool_config.items():
+            if k not in self.POOL_OPTION_NAMES:
+                raise ValueError(f'Unrecognized database pool option: {k}')
+
+            # Sqlite uses queue pool only with pragmas profile
+            if (
+                    k in self.QUEUE_POOL_OPTION_KEYS
+                    and self.type_enum is DatabaseTypeEnum.SQLITE
+                    and self.sqlite_profile is None):
+                log.warning(
+                    f'Database pool option {k} is not applied to sqlite'
+                    ' without sqlite config, since it doesn\'t use queue'
+                    ' pool')
+                continue
+
+            engine_options[self.POOL_OPTION_NAMES[k]] = v
+
+        return engine_options
+
     def _assign_uri_from_config(self, config: dict) -> None:
         raw_uri = config.get("uri", None)  # type: str
 
@@ -228,37 +977,38 @@ class Database(Service):
             log.info(f"URI for database is not specified, using default")
             raw_uri = self.DEFAULT_URI
         else:
-            # Case 1: SQLite Database
-            # Developer can give relative path to the Database
-            # (it will be absolutized at Config.parse()),
-            # by setting sqlite Database extension to `.database`, e.g.:
-            #   `./instance/sqlite3.database`
-            # or by setting full absolute path with protocol, e.g.:
-            #   `sqlite:////home/user/project/instance/sqlite3.database`
-            if raw_uri.rfind(".database") != -1 or "sqlite:///" in raw_uri:
-                if "sqlite:///" not in raw_uri: 
-                    # Set absolute path to database
-                    # Ref: https://stackoverflow.com/a/44687471/14748231
-                    self.uri = "sqlite:///" + raw_uri
-                else:
-                    self.uri = raw_uri
-                self.type_enum = DatabaseTypeEnum.SQLITE
-            # Case 2: PostgreSQL Database
-            elif re.match(r"postgresql(\+\w+)?://", raw_uri):
-                # No need to calculate path since psql uri should be given in
-                # full form
-                self.uri = raw_uri
-                self.type_enum = DatabaseTypeEnum.PSQL
-            else:
-                raise ValueError(
-                    "Unrecognized or yet unsupported type of Database uri:"
-                    f" {raw_uri}")
+            self.uri, self.type_enum = self._parse_uri(raw_uri)
             
             # WARNING:
             #   Never print full Database uri to config, since it may
             #   contain user's password (as in case of psql)
             log.info(f"Set database type: {self.type_enum.value}")
 
+    def _parse_uri(self, raw_uri: str) -> tuple[str, DatabaseTypeEnum]:
+        # Case 1: SQLite Database
+        # Developer can give relative path to the Database
+        # (it will be absolutized at Config.parse()),
+        # by setting sqlite Database extension to `.database`, e.g.:
+        #   `./instance/sqlite3.database`
+        # or by setting full absolute path with protocol, e.g.:
+        #   `sqlite:////home/user/project/instance/sqlite3.database`
+        if raw_uri.rfind(".database") != -1 or "sqlite:///" in raw_uri:
+            if "sqlite:///" not in raw_uri: 
+                # Set absolute path to database
+                # Ref: https://stackoverflow.com/a/44687471/14748231
+                return "sqlite:///" + raw_uri, DatabaseTypeEnum.SQLITE
+            else:
+                return raw_uri, DatabaseTypeEnum.SQLITE
+        # Case 2: PostgreSQL Database
+        elif re.match(r"postgresql(\+\w+)?://", raw_uri):
+            # No need to calculate path since psql uri should be given in
+            # full form
+            return raw_uri, DatabaseTypeEnum.PSQL
+        else:
+            raise ValueError(
+                "Unrecognized or yet unsupported type of Database uri:"
+                f" {raw_uri}")
+
     @migration_implemented
     def init_migration(
             self,
@@ -305,12 +1055,43 @@ class Database(Service):
             tag=tag
         )
 
-    def setup(self, flask_app: Flask) -> None:
-        """Setup Database and migration object with given Flask app."""
+    def setup(
+            self,
+            flask_app: Flask,
+            mode_enum: AppModeEnumUnion | None = None) -> None:
+        """Setup Database and migration object with given Flask app.
+
+        N+1 queries are detected only if given mode is dev or test.
+        """
+        if (
+                mode_enum in (RunAppModeEnum.DEV, RunAppModeEnum.TEST)
+                and self._n_plus_one_threshold is not None):
+            self.n_plus_one_detector = NPlusOneDetector(
+                self._n_plus_one_threshold)
+
         flask_app.config["SQLALCHEMY_DATABASE_URI"] = self.uri
         flask_app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"] = \
+            self._engine_options.copy()
         self.native_database.init_app(flask_app)
 
+        with flask_app.app_context():
+            engine: Any = self.native_database.engine
+            self._prepare_engine(engine)
+            self.pool_metrics = PoolMetrics(engine)
+        if self._pool_stats_log_interval:
+            self.pool_metrics.start_logging(self._pool_stats_log_interval)
+
+        if self._replicas_config['uris']:
+            self.replica_router = ReplicaRouter(
+                **self._replicas_config,
+                engine_options=self._engine_options,
+                on_engine_created=self._prepare_engine)
+            flask_app.extensions[RoutingSession.REPLICA_ROUTER_KEY] = \
+                self.replica_router
+        else:
+            flask_app.extensions.pop(RoutingSession.REPLICA_ROUTER_KEY, None)
+
         # render_as_batch kwarg required only for sqlite3 databases to avoid
         # ALTER TABLE issue on migrations
         # https://blog.miguelgrinberg.com/post/fixing-alter-table-errors-with-flask-migrate-and-sqlite
@@ -322,6 +1103,116 @@ class Database(Service):
             flask_app, self.native_database, render_as_batch=is_sqlite_database
         )
 
+        flask_app.before_request(self._begin_request_unit_of_work)
+        flask_app.after_request(self._end_request_unit_of_work)
+        flask_app.teardown_request(self._teardown_request_unit_of_work)
+
+        # Native database is shared between Database instances, so listeners
+        # are registered only once
+        session_factory: Any = self.native_database.session.session_factory
+        for event_name, listener in [
+                ('after_flush', Database._collect_changed_tables),
+                ('after_commit', Database._invalidate_changed_tables),
+                ('after_flush', Database._remember_flush),
+                ('after_commit', Database._remember_commit_time),
+                ('after_rollback', Database._discard_changed_tables),
+                ('after_rollback', Database._forget_flush)]:
+            if not sa.event.contains(session_factory, event_name, listener):
+                sa.event.listen(session_factory, event_name, listener)
+
+    def _begin_request_unit_of_work(self) -> None:
+        if self._is_request_unit_of_work:
+            self._begin_transaction()
+
+    def _end_request_unit_of_work(self, response: Any) -> Any:
+        if (
+                self._is_request_unit_of_work
+                and self._get_transaction_depth() > 0):
+            self._end_transaction(is_committed=response.status_code < 400)
+        return response
+
+    def _teardown_request_unit_of_work(
+            self, error: BaseException | None) -> None:
+        # Request has failed before the response is made, so transaction
+        # is left open, probably with nested scopes as well
+        if (
+                self._is_request_unit_of_work
+                and self._get_transaction_depth() > 0):
+            self.native_database.session.info[
+                Database.TRANSACTION_DEPTH_KEY] = 1
+            self._end_transaction(is_committed=False)
+
+    def _prepare_engine(self, engine: Any) -> None:
+        # Applied to primary and replica engines
+        if self.sqlite_profile is not None:
+            self.sqlite_profile.listen(engine)
+        if self.sql_instrumentation is not None:
+            self.sql_instrumentation.listen(engine)
+        if self.n_plus_one_detector is not None:
+            self.n_plus_one_detector.listen(engine)
+
+    def get_pool_stats(self) -> dict[str, Any]:
+        """Return stats of the connection pool as PoolMetrics specifies.
+
+        Raise:
+            AttributeError:
+                Database hasn't been set up yet.
+        """
+        if self.pool_metrics is None:
+            raise AttributeError('Database hasn\'t been set up yet')
+        return self.pool_metrics.stats
+
+    def set_query_cache_backend(self, backend: QueryCacheBackend) -> None:
+        """Replace in-process query cache with cache stored in given backend,
+        e.g. shared between processes.
+        """
+        self.query_cache = QueryCache(backend)
+
+    @staticmethod
+    def _collect_changed_tables(session: Any, flush_context: Any) -> None:
+        tables: set[str] = session.info.setdefault(
+            Database.CHANGED_TABLES_KEY, set())
+        for orm in itertools.chain(
+                session.new, session.dirty, session.deleted):
+            tables.update(x.name for x in sa.inspect(orm).mapper.tables)
+
+    @staticmethod
+    def _invalidate_changed_tables(session: Any) -> None:
+        tables: set[str] | None = session.info.pop(
+            Database.CHANGED_TABLES_KEY, None)
+        if tables:
+            Database.instance().query_cache.invalidate(tables)
+
+    @staticmethod
+    def _remember_flush(session: Any, flush_context: Any) -> None:
+        # Flushed changes are visible only within the primary's transaction
+        session.info[ReplicaRouter.HAS_FLUSHED_KEY] = True
+
+    @staticmethod
+    def _remember_commit_time(session: Any) -> None:
+        # Starts read-your-writes window of the session
+        session.info.pop(ReplicaRouter.HAS_FLUSHED_KEY, None)
+        session.info[ReplicaRouter.LAST_COMMIT_AT_KEY] = time.monotonic()
+
+    @staticmethod
+    def _forget_flush(session: Any) -> None:
+        session.info.pop(ReplicaRouter.HAS_FLUSHED_KEY, None)
+
+    @staticmethod
+    def _discard_changed_tables(session: Any) -> None:
+        session.info.pop(Database.CHANGED_TABLES_KEY, None)
+
+    def _mark_tables_changed(self, tables: Iterable[str]) -> None:
+        """Invalidate cached results read from given tables on commit.
+
+        Required for changes made bypassing the session's unit of work, e.g.
+        by bulk operations. Until commit, the session reads from primary as
+        if it has flushed the changes.
+        """
+        info: dict = self.native_database.session.info
+        info.setdefault(Database.CHANGED_TABLES_KEY, set()).update(tables)
+        info[ReplicaRouter.HAS_FLUSHED_KEY] = True
+
     def get_native_database(self) -> SQLAlchemy:
         return self.native_database
 
@@ -337,11 +1228,13 @@ class Database(Service):
     @migration_implemented
     def create_all(self) -> None:
         self.native_database.create_all()
+        self.query_cache.clear()
 
     @migration_implemented
     def drop_all(self):
         """Drop all tables."""
         self.native_database.drop_all()
+        self.query_cache.clear()
 
     @migration_implemented
     def add(self, *entities):
@@ -361,10 +1254,169 @@ class Database(Service):
             self.add(entity)
         self.commit()
 
+    @migration_implemented
+    def bulk_push(
+            self,
+            entities: Iterable[Orm] | Iterable[dict] | dict[str, list],
+            orm_class: type[Orm] | None = None,
+            chunk_size: int = 1000,
+            has_to_return_ids: bool = False) -> list[int] | None:
+        """Insert many rows in chunks and commit the session.
+
+        Rows are inserted bypassing the session's unit of work: every chunk is
+        sent as a single executemany call, so given Orm instances are not
+        attached to the session, their relationships are not persisted and
+        only column attributes are inserted.
+
+        Polymorphic type column is always filled with identity of the Orm
+        class the row is inserted for.
+
+        Args:
+            entities:
+                Orm instances, mappings of column attribute names to values
+                (e.g. `{'_username': 'max'}`) or a single mapping of column
+                attribute names to lists of values, i.e. column-oriented input.
+            orm_class (optional):
+                Orm class to insert mappings for. Required if mappings are
+                given. Defaults to None
+            chunk_size (optional):
+                Amount of rows sent in one executemany call. Defaults to 1000
+            has_to_return_ids (optional):
+                Whether to return ids of inserted rows. Ids are fetched for
+                every row, which is slower on drivers unable to return them
+                from executemany (e.g. sqlite). Defaults to False
+
+        Returns:
+            list[int] | None:
+                Ids of inserted rows in the same order as entities are given,
+                if requested.
+
+        Raise:
+            ValueError:
+                Wrong chunk size, mixed or column-oriented input with columns
+                of different length, or no Orm class given for mappings.
+        """
+        if chunk_size < 1:
+            raise ValueError(
+                f'Chunk size should be positive, got {chunk_size}')
+
+        # Indexes of rows in given entities and rows itself by Orm class
+        rows_by_orm_class: dict[type[Orm], list[tuple[int, dict]]] = \
+            self._collect_bulk_rows(entities, orm_class)
+
+        session: Any = self.native_database.session
+
+        for OrmClass, indexed_rows in rows_by_orm_class.items():
+            mapper: Any = sa.inspect(OrmClass)
+
+            if mapper.polymorphic_on is not None:
+                type_key: str = mapper.get_property_by_column(
+                    mapper.polymorphic_on).key
+                for _, row in indexed_rows:
+                    row[type_key] = mapper.polymorphic_identity
+
+            self._mark_tables_changed(x.name for x in mapper.tables)
+
+            for i in range(0, len(indexed_rows), chunk_size):
+                chunk: list[dict] = [
+                    row for _, row in indexed_rows[i:i+chunk_size]
+                ]
+                session.bulk_insert_mappings(
+                    mapper, chunk, return_defaults=has_to_return_ids)
+
+        self.commit()
+
+        if not has_to_return_ids:
+            return None
+
+        ids: list[int] = [0] * sum(
+            len(x) for x in rows_by_orm_class.values())
+        for indexed_rows in rows_by_orm_class.values():
+            for index, row in indexed_rows:
+                # Generated primary key is set to the row by sqlalchemy
+                ids[index] = row['_id']
+        return ids
+
+    def _collect_bulk_rows(
+            self,
+            entities: Iterable[Orm] | Iterable[dict] | dict[str, list],
+            orm_class: type[Orm] | None
+            ) -> dict[type[Orm], list[tuple[int, dict]]]:
+        if isinstance(entities, dict):
+            # Column-oriented input is transposed to rows
+            lengths: set[int] = {len(x) for x in entities.values()}
+            if len(lengths) > 1:
+                raise ValueError(
+                    'All columns of column-oriented input should have the'
+                    f' same length, got lengths {sorted(lengths)}')
+            keys: list[str] = list(entities.keys())
+            entities = [
+                dict(zip(keys, values))
+                for values in zip(*entities.values())
+            ]
+
+        rows_by_orm_class: dict[type[Orm], list[tuple[int, dict]]] = {}
+
+        for index, entity in enumerate(entities):
+            OrmClass: type[Orm]
+            row: dict
+
+            if isinstance(entity, dict):
+                if orm_class is None:
+                    raise ValueError(
+                        'Orm class should be given to insert mappings')
+                OrmClass = orm_class
+                row = dict(entity)
+            elif isinstance(entity, Orm):
+                OrmClass = type(entity)
+                state_dict: dict = sa.inspect(entity).dict
+                row = {
+                    x.key: state_dict[x.key]
+                    for x in sa.inspect(OrmClass).column_attrs
+                    if x.key in state_dict
+                }
+            else:
+                raise ValueError(
+                    f'Entity {entity} should be Orm instance or mapping')
+
+            rows_by_orm_class.setdefault(OrmClass, []).append((index, row))
+
+        return rows_by_orm_class
+
     @migration_implemented
     def refresh(self, *entities):
+        """Reload attributes of entities from the database.
+
+        Persistent entities are reloaded by one SELECT per Orm class.
+
+        Raise:
+            sa.exc.InvalidRequestError:
+                Some of entities are not found in the database, e.g. deleted
+                by another transaction, as by `session.refresh()`.
+        """
+        session: Any = self.native_database.session
+        entities_by_mapper: dict[Any, dict[Any, Any]] = {}
+
         for entity in entities:
-            self.native_database.session.refresh(entity)
+            state: Any = sa.inspect(entity)
+            if not state.persistent or len(state.key[1]) != 1:
+                session.refresh(entity)
+                continue
+            entities_by_mapper.setdefault(
+                state.mapper, {})[state.key[1][0]] = entity
+
+        for mapper, entities_by_id in entities_by_mapper.items():
+            refreshed_ids: set[Any] = {
+                sa.inspect(x).key[1][0]
+                for x in session.query(mapper).filter(
+                    mapper.primary_key[0].in_(entities_by_id)
+                ).populate_existing()
+            }
+            for entity_id, entity in entities_by_id.items():
+                if entity_id not in refreshed_ids:
+                    raise sa.exc.InvalidRequestError(
+                        f'Could not refresh instance'
+                        f' {sa.orm.util.instance_str(entity)}')
 
     @migration_implemented
     def expire(self, *entities):
@@ -373,8 +1425,17 @@ class Database(Service):
 
     @migration_implemented
     def refpush(self, *entities):
+        """Push entities and refresh them from the database.
+
+        Within `transaction()` refresh is postponed until the scope's
+        commit.
+        """
         self.push(*entities)
-        self.refresh(*entities)
+        if self._get_transaction_depth() > 0:
+            self.native_database.session.info.setdefault(
+                Database.PENDING_REFRESH_KEY, []).extend(entities)
+        else:
+            self.refresh(*entities)
 
     @migration_implemented
     def flush(self):
@@ -382,8 +1443,86 @@ class Database(Service):
 
     @migration_implemented
     def commit(self):
-        """Commit current transaction."""
-        self.native_database.session.commit()
+        """Commit current transaction.
+
+        Within `transaction()` changes are only flushed, and committed once
+        on the scope's exit.
+        """
+        if self._get_transaction_depth() > 0:
+            self.native_database.session.flush()
+        else:
+            self.native_database.session.commit()
+
+    @migration_implemented
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Commit changes made within the context once on exit and roll them
+        back on error.
+
+        Pushes and commits made within the context only flush the session,
+        so models get their ids, and refreshes of `refpush()` are batched
+        after the commit. Nested scopes are committed by the outermost one.
+
+        If a nested scope fails, the outermost one rolls back on exit even
+        if the error is caught in between, since changes of the failed
+        scope are already flushed along with others.
+
+        Raise:
+            sa.exc.InvalidRequestError:
+                The outermost scope exits normally, but is rolled back due to
+                the failed nested one.
+
+        Can be used as decorator as well:
+        ```python
+        @Database.instance().transaction()
+        def create_user(...):
+            ...
+        ```
+        """
+        self._begin_transaction()
+        try:
+            yield
+        except BaseException:
+            self._end_transaction(is_committed=False)
+            raise
+        self._end_transaction(is_committed=True)
+
+    def _get_transaction_depth(self) -> int:
+        return self.native_database.session.info.get(
+            Database.TRANSACTION_DEPTH_KEY, 0)
+
+    def _begin_transaction(self) -> None:
+        self.native_database.session.info[Database.TRANSACTION_DEPTH_KEY] = \
+            self._get_transaction_depth() + 1
+
+    def _end_transaction(self, is_committed: bool) -> None:
+        session: Any = self.native_database.session
+        depth: int = self._get_transaction_depth() - 1
+
+        if depth > 0:
+            # Error can be caught by the caller before it reaches the
+            # outermost scope, so the failure is remembered
+            session.info[Database.TRANSACTION_DEPTH_KEY] = depth
+            if not is_committed:
+                session.info[Database.ROLLBACK_ONLY_KEY] = True
+            return
+
+        session.info.pop(Database.TRANSACTION_DEPTH_KEY, None)
+        pending_refresh: list[Any] = session.info.pop(
+            Database.PENDING_REFRESH_KEY, [])
+        is_rollback_only: bool = session.info.pop(
+            Database.ROLLBACK_ONLY_KEY, False)
+
+        if is_committed and not is_rollback_only:
+            session.commit()
+            self.refresh(*pending_refresh)
+            return
+
+        session.rollback()
+        if is_committed:
+            # Otherwise the caller can't tell the changes are discarded
+            raise sa.exc.InvalidRequestError(
+                'Transaction is rolled back due to failed nested scope')
 
     @migration_implemented
     def rollback(self):
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from staze.core.database.query_cache_backend import QueryCacheBackend
+
+
+class MemoryQueryCacheBackend(QueryCacheBackend):
+    """In-process storage evicting least recently used values.
+
+    Args:
+        max_size (optional):
+            Maximum amount of stored values. Defaults to 1024
+    """
+    def __init__(self, max_size: int = 1024) -> None:
+        if max_size < 1:
+            raise ValueError(
+                f'Cache max size should be positive, got {max_size}')
+
+        self._max_size = max_size
+        # Values with time they expire at, the least recently used first
+        self._values: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self._values)
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            item: tuple[Any, float] | None = self._values.get(key, None)
+            if item is None:
+                return None
+
+            value, expires_at = item
+            if time.monotonic() >= expires_at:
+                del self._values[key]
+                return None
+
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl)
+            self._values.move_to_end(key)
+
+            while len(self._values) > self._max_size:
+                self._values.popitem(last=False)
+
+    def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def increment_counter(self, key: str) -> int:
+        with self._lock:
+            value: int = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
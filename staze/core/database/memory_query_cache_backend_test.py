@@ -0,0 +1,42 @@
+import time
+
+import pytest
+from staze.core.database.memory_query_cache_backend import (
+    MemoryQueryCacheBackend)
+
+
+class TestMemoryQueryCacheBackend:
+    def test_lru(self):
+        backend = MemoryQueryCacheBackend(max_size=2)
+
+        backend.set('a', 1, 60)
+        backend.set('b', 2, 60)
+        assert backend.get('a') == 1
+
+        # Least recently used "b" is evicted
+        backend.set('c', 3, 60)
+        assert backend.get('b') is None
+        assert backend.get('a') == 1
+        assert backend.get('c') == 3
+
+    def test_ttl(self):
+        backend = MemoryQueryCacheBackend()
+
+        backend.set('a', 1, 0.01)
+        time.sleep(0.02)
+        assert backend.get('a') is None
+        assert backend.size == 0
+
+    def test_counters(self):
+        backend = MemoryQueryCacheBackend(max_size=1)
+
+        assert backend.get_counter('x') == 0
+        assert backend.increment_counter('x') == 1
+        backend.set('a', 1, 60)
+        backend.set('b', 2, 60)
+        backend.clear()
+        assert backend.get_counter('x') == 1
+
+    def test_wrong_size(self):
+        with pytest.raises(ValueError):
+            MemoryQueryCacheBackend(max_size=0)
@@ -0,0 +1,109 @@
+import os
+import traceback
+from collections import deque
+from typing import Any
+
+import flask
+import flask_sqlalchemy
+import sqlalchemy as sa
+from flask import request
+from staze.core.database.sql_instrumentation import SqlInstrumentation
+from staze.core.log.log import log
+
+
+class NPlusOneDetector:
+    """Detects the same statement executed many times within a request.
+
+    Statements are fingerprinted by their SQL with parameters bound
+    separately, so statements differing only by parameters, as lazy loads
+    of relationship for every model of a list, are counted together. Once
+    the count exceeds the threshold, detection is logged with warning level
+    and call site - the innermost frame of the stack outside of sqlalchemy,
+    flask and database internals.
+
+    Intended for development and testing, since it keeps counts of all
+    statements of the request.
+
+    Args:
+        threshold (optional):
+            Amount of executions of the same statement within a request
+            allowed. Defaults to 5
+    """
+    # Key of request's environ counts of statements are stored under
+    REQUEST_COUNTS_KEY: str = 'staze.statement_counts'
+    DEFAULT_THRESHOLD: int = 5
+    # Maximum amount of detections kept
+    DETECTIONS_MAX_SIZE: int = 100
+
+    # Frames of these directories are skipped on call site search
+    _INTERNAL_DIRS: tuple[str, ...] = tuple(
+        os.path.dirname(x.__file__) + os.sep
+        for x in (sa, flask_sqlalchemy, flask)
+    ) + (os.path.dirname(__file__) + os.sep,)
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD) -> None:
+        if threshold < 1:
+            raise ValueError(f'Threshold should be positive, got {threshold}')
+        self._threshold = threshold
+        self._detections: deque[dict[str, Any]] = deque(
+            maxlen=self.DETECTIONS_MAX_SIZE)
+
+    @property
+    def threshold(self) -> int:
+        return self._threshold
+
+    @property
+    def detections(self) -> list[dict[str, Any]]:
+        """Latest detections with keys `statement`, `count` - amount of
+        executions on detection, `call_site` and `view`.
+        """
+        return list(self._detections)
+
+    def listen(self, engine: Any) -> None:
+        sa.event.listen(
+            engine, 'after_cursor_execute', self._on_after_cursor_execute)
+
+    def _on_after_cursor_execute(
+            self,
+            conn: Any,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Any,
+            executemany: bool) -> None:
+        try:
+            environ: dict = request.environ
+            view: str | None = request.endpoint
+        except RuntimeError:
+            return
+
+        counts: dict[str, int] = environ.setdefault(
+            self.REQUEST_COUNTS_KEY, {})
+        # Counted by raw statement to not normalize every one of them
+        count: int = counts.get(statement, 0) + 1
+        counts[statement] = count
+
+        # Every statement is reported once per request
+        if count != self._threshold + 1:
+            return
+
+        detection: dict[str, Any] = {
+            'statement': SqlInstrumentation.normalize(statement),
+            'count': count,
+            'call_site': self._get_call_site(),
+            'view': view
+        }
+        self._detections.append(detection)
+        log.logger.bind(
+            db_statement=detection['statement'],
+            db_call_site=detection['call_site'],
+            db_view=view or ''
+        ).warning(
+            f'Statement is executed more than {self._threshold} times within'
+            ' the request, consider eager loading')
+
+    def _get_call_site(self) -> str:
+        for frame in reversed(traceback.extract_stack()):
+            if not frame.filename.startswith(self._INTERNAL_DIRS):
+                return f'{frame.filename}:{frame.lineno} in {frame.name}'
+        return ''
@@ -0,0 +1,62 @@
+import pytest
+import sqlalchemy as sa
+from flask import Flask
+from staze.core.database.n_plus_one_detector import NPlusOneDetector
+
+
+@pytest.fixture
+def engine():
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.exec_driver_sql('CREATE TABLE item (id INTEGER)')
+    yield engine
+    engine.dispose()
+
+
+def select_items(connection, count: int) -> None:
+    for i in range(count):
+        connection.execute(
+            sa.text('SELECT id FROM item WHERE id = :id'), {'id': i})
+
+
+class TestNPlusOneDetector:
+    def test_detect(self, engine):
+        detector = NPlusOneDetector(threshold=2)
+        detector.listen(engine)
+
+        app = Flask(__name__)
+        app.add_url_rule('/items', 'items', lambda: '')
+        with engine.connect() as connection:
+            with app.test_request_context('/items'):
+                select_items(connection, 2)
+                assert detector.detections == []
+
+                select_items(connection, 3)
+                detections = detector.detections
+                # Reported once per request
+                assert len(detections) == 1
+                assert detections[0]['statement'] \
+                    == 'SELECT id FROM item WHERE id = ?'
+                assert detections[0]['count'] == 3
+                assert detections[0]['view'] == 'items'
+                # Frames of the database package itself, including this
+                # test, are skipped
+                assert '/sqlalchemy/' not in detections[0]['call_site']
+                assert '/staze/core/database/' \
+                    not in detections[0]['call_site']
+
+            with app.test_request_context('/items'):
+                select_items(connection, 2)
+            assert len(detector.detections) == 1
+
+    def test_outside_request(self, engine):
+        detector = NPlusOneDetector(threshold=1)
+        detector.listen(engine)
+
+        with engine.connect() as connection:
+            select_items(connection, 3)
+        assert detector.detections == []
+
+    def test_wrong_threshold(self):
+        with pytest.raises(ValueError):
+            NPlusOneDetector(threshold=0)
@@ -0,0 +1,153 @@
+import threading
+import time
+from typing import Any, Callable
+
+import sqlalchemy as sa
+from staze.core.log.log import log
+
+
+class PoolMetrics:
+    """Collects statistics of connection pool of the engine.
+
+    Checkout latency is the time `pool.connect()` takes, i.e. time spent on
+    waiting for a free connection plus time of opening a new one, if it is
+    required. Latencies are counted to histogram buckets by their upper
+    bounds in seconds.
+
+    Pool recreated by `engine.dispose()` is instrumented as well, but counters
+    are kept.
+
+    Args:
+        engine:
+            Engine which pool is measured.
+    """
+    LATENCY_BUCKETS: list[float] = [
+        0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float('inf')
+    ]
+
+    def __init__(self, engine: Any) -> None:
+        self._engine = engine
+        self._lock = threading.Lock()
+
+        self._checked_out: int = 0
+        self._checkouts: int = 0
+        self._connects: int = 0
+        self._invalidations: int = 0
+        self._wait_time_total: float = 0.0
+        self._wait_time_max: float = 0.0
+        self._latency_bucket_counts: list[int] = \
+            [0] * len(self.LATENCY_BUCKETS)
+
+        self._logger: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+        sa.event.listen(engine, 'checkout', self._on_checkout)
+        sa.event.listen(engine, 'checkin', self._on_checkin)
+        sa.event.listen(engine, 'connect', self._on_connect)
+        sa.event.listen(engine, 'invalidate', self._on_invalidate)
+        sa.event.listen(engine, 'engine_disposed', self._on_engine_disposed)
+        self._instrument_pool(engine.pool)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Current state of the pool and counters since creation.
+
+        Keys are:
+        - `size` - configured size of the pool, None if pool is not sized
+        - `checked_out` - connections currently in use
+        - `overflow` - connections opened over the size, None if pool
+            doesn't overflow
+        - `checkouts`, `connects`, `invalidations` - amount of events
+        - `wait_time_total`, `wait_time_max` - checkout latency in seconds
+        - `checkout_latency_histogram` - amount of checkouts by upper bound
+            of the latency in seconds, not cumulative
+        """
+        pool: Any = self._engine.pool
+        size: Callable | None = getattr(pool, 'size', None)
+        overflow: Callable | None = getattr(pool, 'overflow', None)
+
+        with self._lock:
+            return {
+                'size': size() if size else None,
+                'checked_out': self._checked_out,
+                'overflow': overflow() if overflow else None,
+                'checkouts': self._checkouts,
+                'connects': self._connects,
+                'invalidations': self._invalidations,
+                'wait_time_total': self._wait_time_total,
+                'wait_time_max': self._wait_time_max,
+                'checkout_latency_histogram': {
+                    str(bound): count for bound, count in zip(
+                        self.LATENCY_BUCKETS, self._latency_bucket_counts)
+                }
+            }
+
+    def start_logging(self, interval: float) -> None:
+        """Log stats every given amount of seconds in background thread."""
+        if self._logger is not None:
+            return
+
+        self._stop_event.clear()
+        self._logger = threading.Thread(
+            target=self._log_periodically,
+            args=(interval,),
+            name='staze-pool-metrics',
+            daemon=True)
+        self._logger.start()
+
+    def stop_logging(self) -> None:
+        if self._logger is None:
+            return
+        self._stop_event.set()
+        self._logger.join()
+        self._logger = None
+
+    def _log_periodically(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            log.logger.bind(pool_stats=str(self.stats)).info(
+                'Database pool stats')
+
+    def _instrument_pool(self, pool: Any) -> None:
+        # Pool has no event emitted before checkout, so the time is measured
+        # around the call engine uses to checkout connections
+        connect: Callable = pool.connect
+
+        def measured_connect() -> Any:
+            started_at: float = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                self._record_latency(time.perf_counter() - started_at)
+
+        pool.connect = measured_connect
+
+    def _record_latency(self, latency: float) -> None:
+        with self._lock:
+            self._wait_time_total += latency
+            if latency > self._wait_time_max:
+                self._wait_time_max = latency
+
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if latency <= bound:
+                    self._latency_bucket_counts[i] += 1
+                    break
+
+    def _on_checkout(self, *args) -> None:
+        with self._lock:
+            self._checked_out += 1
+            self._checkouts += 1
+
+    def _on_checkin(self, *args) -> None:
+        with self._lock:
+            self._checked_out -= 1
+
+    def _on_connect(self, *args) -> None:
+        with self._lock:
+            self._connects += 1
+
+    def _on_invalidate(self, *args) -> None:
+        with self._lock:
+            self._invalidations += 1
+
+    def _on_engine_disposed(self, engine: Any) -> None:
+        self._instrument_pool(engine.pool)
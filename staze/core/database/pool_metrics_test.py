@@ -0,0 +1,45 @@
+import os
+
+import sqlalchemy as sa
+from staze.core.database.pool_metrics import PoolMetrics
+
+
+class TestPoolMetrics:
+    def test_stats(self, tmp_path):
+        engine = sa.create_engine(
+            'sqlite:///' + os.path.join(tmp_path, 'test.db'),
+            poolclass=sa.pool.QueuePool,
+            pool_size=2,
+            max_overflow=1)
+        metrics = PoolMetrics(engine)
+
+        first = engine.connect()
+        second = engine.connect()
+        third = engine.connect()
+
+        stats: dict = metrics.stats
+        assert stats['size'] == 2
+        assert stats['checked_out'] == 3
+        assert stats['overflow'] == 1
+        assert stats['checkouts'] == 3
+        assert stats['connects'] == 3
+        assert sum(stats['checkout_latency_histogram'].values()) == 3
+        assert stats['wait_time_max'] <= stats['wait_time_total']
+
+        first.close()
+        second.close()
+        third.close()
+        assert metrics.stats['checked_out'] == 0
+
+        engine.dispose()
+        engine.connect().close()
+        assert metrics.stats['checkouts'] == 4
+        assert sum(
+            metrics.stats['checkout_latency_histogram'].values()) == 4
+
+    def test_logging(self, tmp_path):
+        engine = sa.create_engine('sqlite://')
+        metrics = PoolMetrics(engine)
+
+        metrics.start_logging(0.01)
+        metrics.stop_logging()
@@ -0,0 +1,144 @@
+"""Benchmark of reading models from full Orms and from projected rows.
+
+Table of ROWS is read and converted to Models:
+- `orms` - by loading full Orms to the session and building models of
+    them, as `[x.model for x in get_all()]` does
+- `rows` - by selecting only columns of model's fields, as
+    `select_models()` does
+
+Run as:
+```sh
+python -m staze.core.database.projection_bench
+```
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import sqlalchemy as sa
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session, declarative_base
+from staze.core.database.database import Orm
+from staze.core.model.model import Model
+
+
+class BenchUser(Model):
+    id: int
+    name: str
+    email: str
+
+
+def make_orm_class() -> Any:
+    """Return Orm mapped to own metadata with columns beyond model's
+    fields, as real tables usually have.
+    """
+    Base: Any = declarative_base(cls=Orm, metadata=sa.MetaData())
+
+    class BenchUserOrm(Base):
+        _name = sa.Column(sa.String(150))
+        _email = sa.Column(sa.String(150))
+        _password = sa.Column(sa.String(150))
+        _about = sa.Column(sa.Text)
+
+        @hybrid_property
+        def name(self) -> str:
+            return self._name
+
+        @hybrid_property
+        def email(self) -> str:
+            return self._email
+
+        @property
+        def model(self) -> BenchUser:
+            return BenchUser(id=self.id, name=self.name, email=self.email)
+
+    return BenchUserOrm
+
+
+def read_orms(session: Session, orm_class: Any) -> list[BenchUser]:
+    return [x.model for x in session.query(orm_class).all()]
+
+
+def read_rows(session: Session, orm_class: Any) -> list[BenchUser]:
+    query: Any = orm_class._make_rows_query(
+        session, BenchUser.__fields__, None, None, {})
+    return [BenchUser(**x._mapping) for x in query]
+
+
+def measure(
+        session: Session,
+        read: Callable[[Session, Any], list[BenchUser]],
+        orm_class: Any,
+        reads: int) -> dict[str, float]:
+    """Return average seconds of the read and peak memory allocated by it in
+    bytes.
+    """
+    started_at: float = time.perf_counter()
+    for _ in range(reads):
+        read(session, orm_class)
+        session.expunge_all()
+    seconds: float = (time.perf_counter() - started_at) / reads
+
+    # Measured separately, since tracing slows down allocations
+    gc.collect()
+    tracemalloc.start()
+    try:
+        read(session, orm_class)
+        peak_memory: int = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        session.expunge_all()
+
+    return {'seconds': seconds, 'peak_memory': peak_memory}
+
+
+def run(rows: int = 100000, reads: int = 3) -> dict[str, dict[str, float]]:
+    """Return measurements by read kind."""
+    orm_class: Any = make_orm_class()
+    engine: Any = sa.create_engine('sqlite://')
+    orm_class.metadata.create_all(engine)
+
+    try:
+        with Session(engine) as session:
+            session.bulk_insert_mappings(
+                sa.inspect(orm_class),
+                [
+                    {
+                        '_type': sa.inspect(orm_class).polymorphic_identity,
+                        '_name': f'user{i}',
+                        '_email': f'user{i}@example.com',
+                        '_password': 'x' * 100,
+                        '_about': 'about' * 20
+                    }
+                    for i in range(rows)
+                ])
+            session.commit()
+
+            return {
+                'orms': measure(session, read_orms, orm_class, reads),
+                'rows': measure(session, read_rows, orm_class, reads)
+            }
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark reading models from Orms and projected rows')
+    parser.add_argument(
+        '--rows', type=int, default=100000, help='amount of rows in table')
+    parser.add_argument(
+        '--reads', type=int, default=3, help='amount of timed reads')
+    parsed = parser.parse_args()
+
+    results: dict[str, dict[str, float]] = run(parsed.rows, parsed.reads)
+    for name, result in results.items():
+        print(
+            f'{name:>8}: {result["seconds"]:>7.3f} sec/read'
+            f' {result["peak_memory"] / 1024 / 1024:>8.1f} MiB peak')
+    orms, rows = results['orms'], results['rows']
+    print(
+        f' speedup: {orms["seconds"] / rows["seconds"]:>7.2f}x'
+        f' {orms["peak_memory"] / rows["peak_memory"]:>8.2f}x less memory')
@@ -0,0 +1,10 @@
+from staze.core.database import projection_bench
+
+
+def test_run():
+    results: dict[str, dict[str, float]] = projection_bench.run(
+        rows=500, reads=2)
+
+    assert list(results.keys()) == ['orms', 'rows']
+    assert all(
+        x['seconds'] > 0 and x['peak_memory'] > 0 for x in results.values())
@@ -0,0 +1,159 @@
+import threading
+from typing import Any, Iterable
+
+import sqlalchemy as sa
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from staze.core.database.memory_query_cache_backend import (
+    MemoryQueryCacheBackend)
+from staze.core.database.query_cache_backend import QueryCacheBackend
+
+
+class QueryCache:
+    """Caches results of Orm queries until tables they are read from are
+    changed.
+
+    Every key contains generations of the Orm's tables, so invalidation of
+    the table just increments it's generation, and values stored under keys
+    with previous generations are never read again and eventually evicted.
+
+    Results are stored as detached copies of Orm models with only column
+    attributes loaded, so they don't depend on the session they were read
+    with and can be pickled by shared backends. On read, copies are merged
+    to the current session without emitting SQL.
+
+    Args:
+        backend (optional):
+            Storage of cached results. Defaults to MemoryQueryCacheBackend
+            with default size
+    """
+    def __init__(self, backend: QueryCacheBackend | None = None) -> None:
+        self._backend: QueryCacheBackend = \
+            backend or MemoryQueryCacheBackend()
+        self._tables_by_orm_class: dict[type, list[str]] = {}
+        self._stats_by_orm_name: dict[str, dict[str, int]] = {}
+        self._invalidations: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self) -> QueryCacheBackend:
+        return self._backend
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Amount of hits, misses and invalidated tables since creation."""
+        return {
+            'hits': sum(x['hits'] for x in self._stats_by_orm_name.values()),
+            'misses':
+                sum(x['misses'] for x in self._stats_by_orm_name.values()),
+            'invalidations': self._invalidations
+        }
+
+    def get_orm_stats(self, orm_class: type) -> dict[str, int]:
+        """Amount of hits and misses of given Orm class since creation."""
+        return dict(self._stats_by_orm_name.get(
+            orm_class.__name__, {'hits': 0, 'misses': 0}))
+
+    def make_key(
+            self,
+            orm_class: type,
+            method: str,
+            kwargs: dict,
+            order_by: object | list[object] | None = None,
+            limit: int | None = None) -> str:
+        """Return key of the query with given parameters for current state
+        of the Orm's tables.
+        """
+        generations: str = ','.join(
+            str(self._backend.get_counter(self._get_generation_key(x)))
+            for x in self._get_tables(orm_class))
+
+        order: list[object]
+        if order_by is None:
+            order = []
+        elif type(order_by) is list:
+            order = order_by
+        else:
+            order = [order_by]
+
+        return '{}.{}:{}:{}:{}:{}:{}'.format(
+            orm_class.__module__,
+            orm_class.__qualname__,
+            method,
+            generations,
+            repr(sorted(kwargs.items())),
+            ','.join(str(x) for x in order),
+            limit)
+
+    def get(self, orm_class: type, key: str) -> Any | None:
+        """Return cached detached copies or None, if nothing is cached."""
+        value: Any | None = self._backend.get(key)
+
+        with self._lock:
+            stats: dict[str, int] = self._stats_by_orm_name.setdefault(
+                orm_class.__name__, {'hits': 0, 'misses': 0})
+            if value is None:
+                stats['misses'] += 1
+            else:
+                stats['hits'] += 1
+
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._backend.set(key, value, ttl)
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """Make all cached results read from given tables outdated."""
+        for table in tables:
+            self._backend.increment_counter(self._get_generation_key(table))
+            with self._lock:
+                self._invalidations += 1
+
+    def clear(self) -> None:
+        self._backend.clear()
+
+    def detach(self, orm: Any) -> Any:
+        """Return detached copy of Orm model with column attributes only."""
+        mapper: Any = sa.inspect(type(orm))
+        state_dict: dict = sa.inspect(orm).dict
+
+        copy: Any = mapper.class_manager.new_instance()
+        for attribute in mapper.column_attrs:
+            if attribute.key in state_dict:
+                set_committed_value(
+                    copy, attribute.key, state_dict[attribute.key])
+        make_transient_to_detached(copy)
+
+        return copy
+
+    def attach(self, session: Any, copy: Any) -> Any:
+        """Return model of the session for detached copy.
+
+        Model already present in the session is returned as is, so it's
+        pending changes are not overwritten.
+        """
+        existing: Any | None = session.identity_map.get(
+            sa.inspect(copy).key)
+        if existing is not None:
+            return existing
+        return session.merge(copy, load=False)
+
+    def _get_tables(self, orm_class: type) -> list[str]:
+        tables: list[str] | None = self._tables_by_orm_class.get(
+            orm_class, None)
+
+        if tables is None:
+            # Polymorphic queries read rows of subclasses as well, which may
+            # be stored in own tables
+            tables = sorted({
+                table.name
+                for mapper in sa.inspect(orm_class).self_and_descendants
+                for table in mapper.tables
+            })
+            self._tables_by_orm_class[orm_class] = tables
+
+        return tables
+
+    def _get_generation_key(self, table: str) -> str:
+        return f'generation:{table}'
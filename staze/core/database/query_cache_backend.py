@@ -0,0 +1,38 @@
+from typing import Any
+
+
+class QueryCacheBackend:
+    """Storage of cached query results.
+
+    In-process storage is implemented by MemoryQueryCacheBackend. Storage
+    shared between processes (e.g. Redis or Memcached) should implement the
+    same methods and pickle stored values itself.
+    """
+    def get(self, key: str) -> Any | None:
+        """Return stored value or None if it is missing or expired."""
+        raise NotImplementedError(
+            'Should be re-implemented at the children class')
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store value for given amount of seconds."""
+        raise NotImplementedError(
+            'Should be re-implemented at the children class')
+
+    def get_counter(self, key: str) -> int:
+        """Return counter's value, 0 if counter is missing.
+
+        Counters are separate from values and never evicted, since they are
+        used to invalidate stored values.
+        """
+        raise NotImplementedError(
+            'Should be re-implemented at the children class')
+
+    def increment_counter(self, key: str) -> int:
+        """Increment counter and return it's new value."""
+        raise NotImplementedError(
+            'Should be re-implemented at the children class')
+
+    def clear(self) -> None:
+        """Remove all stored values."""
+        raise NotImplementedError(
+            'Should be re-implemented at the children class')
@@ -0,0 +1,171 @@
+import itertools
+import threading
+import time
+from typing import Any, Callable
+
+import sqlalchemy as sa
+
+
+class ReplicaRouter:
+    """Chooses replica engine for reads.
+
+    Replica is considered unavailable if connection to it can't be
+    established, and it's not chosen for `retry_interval` seconds after that.
+
+    Args:
+        uris:
+            Uris of replicas.
+        balancing (optional):
+            How to choose replica: `round_robin` or `least_connections`, i.e.
+            the one with the least amount of checked out connections. Defaults
+            to `round_robin`
+        read_your_writes_window (optional):
+            Amount of seconds after commit in the session during which reads
+            of the session go to primary, so the session reads own writes
+            even if replicas are lagging. Defaults to 5
+        retry_interval (optional):
+            Amount of seconds unavailable replica is not chosen for. Defaults
+            to 30
+        engine_options (optional):
+            Options to create replica engines with. Defaults to None
+        on_engine_created (optional):
+            Callable called with every created engine, e.g. to apply sqlite
+            pragmas. Defaults to None
+    """
+    BALANCINGS: list[str] = ['round_robin', 'least_connections']
+
+    # Keys of session's info
+    LAST_COMMIT_AT_KEY: str = 'staze.last_commit_at'
+    HAS_FLUSHED_KEY: str = 'staze.has_flushed'
+    CHECKED_ENGINES_KEY: str = 'staze.checked_replica_engines'
+
+    def __init__(
+                self,
+                uris: list[str],
+                balancing: str = 'round_robin',
+                read_your_writes_window: float = 5.0,
+                retry_interval: float = 30.0,
+                engine_options: dict[str, Any] | None = None,
+                on_engine_created: Callable[[Any], None] | None = None
+            ) -> None:
+        if balancing not in self.BALANCINGS:
+            raise ValueError(f'Unrecognized replica balancing: {balancing}')
+
+        self._balancing = balancing
+        self._read_your_writes_window = read_your_writes_window
+        self._retry_interval = retry_interval
+        self._lock = threading.Lock()
+
+        self._engines: list[Any] = []
+        for uri in uris:
+            engine: Any = sa.create_engine(uri, **(engine_options or {}))
+            if on_engine_created is not None:
+                on_engine_created(engine)
+            self._engines.append(engine)
+
+        self._round_robin_indexes = itertools.cycle(range(len(self._engines)))
+        self._checked_out_by_engine: dict[Any, int] = {
+            x: 0 for x in self._engines
+        }
+        self._unavailable_until_by_engine: dict[Any, float] = {}
+
+        for engine in self._engines:
+            sa.event.listen(
+                engine, 'checkout', self._make_counter(engine, 1))
+            sa.event.listen(
+                engine, 'checkin', self._make_counter(engine, -1))
+
+    @property
+    def engines(self) -> list[Any]:
+        return self._engines.copy()
+
+    def get_engine_for(self, session: Any) -> Any | None:
+        """Return replica engine to read with for the session or None if
+        session should read from primary.
+
+        Session reads from primary if it has changes not committed yet or it
+        has committed within read-your-writes window.
+        """
+        if (
+                session.new
+                or session.dirty
+                or session.deleted
+                or session.info.get(self.HAS_FLUSHED_KEY, False)):
+            return None
+
+        last_commit_at: float | None = session.info.get(
+            self.LAST_COMMIT_AT_KEY, None)
+        if (
+                last_commit_at is not None
+                and time.monotonic() - last_commit_at
+                    < self._read_your_writes_window):
+            return None
+
+        # Every replica is tried at most once
+        for _ in range(len(self._engines)):
+            engine: Any | None = self._choose()
+            if engine is None:
+                return None
+            if self._is_connectable(session, engine):
+                return engine
+            self.mark_unavailable(engine)
+
+        return None
+
+    def mark_unavailable(self, engine: Any) -> None:
+        with self._lock:
+            self._unavailable_until_by_engine[engine] = \
+                time.monotonic() + self._retry_interval
+
+    def dispose(self) -> None:
+        for engine in self._engines:
+            engine.dispose()
+
+    def _choose(self) -> Any | None:
+        now: float = time.monotonic()
+
+        with self._lock:
+            available: list[Any] = [
+                x for x in self._engines
+                if self._unavailable_until_by_engine.get(x, 0.0) <= now
+            ]
+            if not available:
+                return None
+
+            match self._balancing:
+                case 'round_robin':
+                    while True:
+                        engine: Any = self._engines[
+                            next(self._round_robin_indexes)]
+                        if engine in available:
+                            return engine
+                case 'least_connections':
+                    return min(
+                        available,
+                        key=lambda x: self._checked_out_by_engine[x])
+                case _:
+                    raise ValueError(
+                        f'Unrecognized replica balancing: {self._balancing}')
+
+    def _is_connectable(self, session: Any, engine: Any) -> bool:
+        # Engine is checked once per session, further failures are raised to
+        # the caller as for primary
+        checked_engines: set = session.info.setdefault(
+            self.CHECKED_ENGINES_KEY, set())
+        if engine in checked_engines:
+            return True
+
+        try:
+            with engine.connect():
+                pass
+        except sa.exc.DBAPIError:
+            return False
+
+        checked_engines.add(engine)
+        return True
+
+    def _make_counter(self, engine: Any, delta: int) -> Callable:
+        def count(*args) -> None:
+            with self._lock:
+                self._checked_out_by_engine[engine] += delta
+        return count
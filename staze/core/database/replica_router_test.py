@@ -0,0 +1,111 @@
+import os
+import time
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from staze.core.database.replica_router import ReplicaRouter
+
+
+class _Orm(sa.orm.declarative_base()):
+    __tablename__ = 'replica_router_test_orm'
+    id = sa.Column(sa.Integer, primary_key=True)
+
+
+def make_uri(path) -> str:
+    return 'sqlite:///' + os.path.join(path, 'replica.db')
+
+
+class TestReplicaRouter:
+    def test_round_robin(self, tmp_path):
+        os.mkdir(os.path.join(tmp_path, 'a'))
+        os.mkdir(os.path.join(tmp_path, 'b'))
+        router = ReplicaRouter([
+            make_uri(os.path.join(tmp_path, 'a')),
+            make_uri(os.path.join(tmp_path, 'b'))
+        ])
+        a, b = router.engines
+
+        with Session() as session:
+            assert [router.get_engine_for(session) for _ in range(4)] \
+                == [a, b, a, b]
+
+        router.dispose()
+
+    def test_least_connections(self, tmp_path):
+        os.mkdir(os.path.join(tmp_path, 'a'))
+        os.mkdir(os.path.join(tmp_path, 'b'))
+        router = ReplicaRouter(
+            [
+                make_uri(os.path.join(tmp_path, 'a')),
+                make_uri(os.path.join(tmp_path, 'b'))
+            ],
+            balancing='least_connections')
+        a, b = router.engines
+
+        with Session() as session:
+            with a.connect():
+                assert router.get_engine_for(session) is b
+            with b.connect():
+                assert router.get_engine_for(session) is a
+
+        router.dispose()
+
+    def test_primary_for_changes(self, tmp_path):
+        router = ReplicaRouter([make_uri(tmp_path)])
+
+        with Session() as session:
+            session.add(_Orm())
+            assert router.get_engine_for(session) is None
+
+        with Session() as session:
+            session.info[ReplicaRouter.HAS_FLUSHED_KEY] = True
+            assert router.get_engine_for(session) is None
+
+        router.dispose()
+
+    def test_read_your_writes(self, tmp_path):
+        router = ReplicaRouter(
+            [make_uri(tmp_path)], read_your_writes_window=0.05)
+
+        with Session() as session:
+            session.info[ReplicaRouter.LAST_COMMIT_AT_KEY] = time.monotonic()
+            assert router.get_engine_for(session) is None
+            time.sleep(0.05)
+            assert router.get_engine_for(session) is router.engines[0]
+
+        router.dispose()
+
+    def test_fallback(self, tmp_path):
+        router = ReplicaRouter([
+            # Sqlite can't create database in nonexistent directory
+            make_uri(os.path.join(tmp_path, 'nonexistent')),
+            make_uri(tmp_path)
+        ])
+        unavailable, available = router.engines
+
+        with Session() as session:
+            assert [router.get_engine_for(session) for _ in range(3)] \
+                == [available, available, available]
+
+        with Session() as session:
+            os.mkdir(os.path.join(tmp_path, 'nonexistent'))
+            # Replica is not retried until retry interval passes
+            assert router.get_engine_for(session) is available
+            router._unavailable_until_by_engine.clear()
+            assert unavailable in [
+                router.get_engine_for(session) for _ in range(2)]
+
+        router.dispose()
+
+    def test_all_unavailable(self, tmp_path):
+        router = ReplicaRouter([make_uri(os.path.join(tmp_path, 'x'))])
+
+        with Session() as session:
+            assert router.get_engine_for(session) is None
+
+        router.dispose()
+
+    def test_wrong_balancing(self):
+        with pytest.raises(ValueError):
+            ReplicaRouter([], balancing='random')
@@ -0,0 +1,38 @@
+from typing import Any
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+
+
+class RoutingSession(Session):
+    """Session sending queries marked with REPLICA_READS_OPTION execution
+    option to replicas.
+
+    Writes, flushes and all other reads go to primary as usual.
+    """
+    # Key of Flask app's extensions replica router is stored under
+    REPLICA_ROUTER_KEY: str = 'staze_replica_router'
+    # Execution option marking queries which can be sent to replicas
+    REPLICA_READS_OPTION: str = 'staze_replica_reads'
+
+    def get_bind(
+            self,
+            mapper: Any | None = None,
+            clause: Any | None = None,
+            bind: Any | None = None,
+            **kwargs: Any) -> Any:
+        if (
+                bind is None
+                and clause is not None
+                and not self._flushing
+                and clause.get_execution_options().get(
+                    self.REPLICA_READS_OPTION, False)):
+            router: Any | None = current_app.extensions.get(
+                self.REPLICA_ROUTER_KEY, None)
+            if router is not None:
+                engine: Any | None = router.get_engine_for(self)
+                if engine is not None:
+                    return engine
+
+        return super().get_bind(
+            mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,158 @@
+import re
+import time
+from typing import Any
+
+import sqlalchemy as sa
+from flask import request
+from staze.core.log.log import log
+
+
+class SqlInstrumentation:
+    """Accounts SQL statements executed within requests and logs slow ones.
+
+    Stats of the current request are collected to request's environ and
+    contain keys ready to be bound to request's log:
+    - `db_statements` - amount of executed statements
+    - `db_duration` - total execution time in nanoseconds
+    - `db_slowest_statement` - normalized SQL of the slowest statement
+    - `db_slowest_duration` - it's execution time in nanoseconds
+    - `db_rows` - amount of rows returned or affected as reported by the
+        driver, e.g. sqlite reports only affected ones
+    - `db_errors` - amount of failed statements, which are accounted in
+        the stats above as well
+
+    Args:
+        slow_query_threshold (optional):
+            Amount of seconds statements executed longer are logged with
+            warning level, normalized SQL and view they are originated from.
+            Defaults to None, i.e. slow statements are not logged
+    """
+    # Key of request's environ stats are stored under
+    REQUEST_STATS_KEY: str = 'staze.sql_stats'
+    # Key of connection's info start times of executed statements are
+    # stacked under
+    STARTED_AT_KEY: str = 'staze.sql_started_at'
+
+    _STRING_RE = re.compile(r"'(?:[^']|'')*'")
+    _NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+    _LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+    _SPACE_RE = re.compile(r'\s+')
+
+    def __init__(self, slow_query_threshold: float | None = None) -> None:
+        self._slow_query_threshold: int | None = \
+            None if slow_query_threshold is None \
+            else int(slow_query_threshold * 1_000_000_000)
+
+    def listen(self, engine: Any) -> None:
+        """Instrument statements executed by the engine."""
+        sa.event.listen(
+            engine, 'before_cursor_execute', self._on_before_cursor_execute)
+        sa.event.listen(
+            engine, 'after_cursor_execute', self._on_after_cursor_execute)
+        sa.event.listen(engine, 'handle_error', self._on_handle_error)
+
+    @classmethod
+    def get_request_stats(cls) -> dict[str, Any] | None:
+        """Return stats of the current request or None, if no statements
+        were executed or there is no request.
+        """
+        try:
+            environ: dict = request.environ
+        except RuntimeError:
+            return None
+
+        stats: dict | None = environ.get(cls.REQUEST_STATS_KEY, None)
+        return dict(stats) if stats is not None else None
+
+    @classmethod
+    def normalize(cls, statement: str) -> str:
+        """Return statement with literals and lists of parameters replaced
+        by placeholders, so statements differing only by values are equal.
+        """
+        statement = cls._STRING_RE.sub('?', statement)
+        statement = cls._NUMBER_RE.sub('?', statement)
+        statement = cls._LIST_RE.sub('(?)', statement)
+        return cls._SPACE_RE.sub(' ', statement).strip()
+
+    def _on_before_cursor_execute(
+            self,
+            conn: Any,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Any,
+            executemany: bool) -> None:
+        conn.info.setdefault(self.STARTED_AT_KEY, []).append(
+            time.perf_counter_ns())
+
+    def _on_after_cursor_execute(
+            self,
+            conn: Any,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Any,
+            executemany: bool) -> None:
+        duration: int = \
+            time.perf_counter_ns() - conn.info[self.STARTED_AT_KEY].pop()
+        self._account(statement, duration, cursor.rowcount, False)
+
+    def _on_handle_error(self, exception_context: Any) -> None:
+        conn: Any = exception_context.connection
+        # Errors can be raised not by statements, e.g. on connecting or
+        # fetching results, so there is no start time to pop
+        if conn is None or not conn.info.get(self.STARTED_AT_KEY, None):
+            return
+        duration: int = \
+            time.perf_counter_ns() - conn.info[self.STARTED_AT_KEY].pop()
+        self._account(exception_context.statement or '', duration, 0, True)
+
+    def _account(
+            self,
+            statement: str,
+            duration: int,
+            rowcount: int,
+            is_failed: bool) -> None:
+        is_slow: bool = \
+            self._slow_query_threshold is not None \
+            and duration > self._slow_query_threshold
+
+        try:
+            environ: dict | None = request.environ
+            view: str | None = request.endpoint
+        except RuntimeError:
+            # Statements executed outside of requests are not accounted
+            environ = None
+            view = None
+
+        if environ is not None:
+            stats: dict[str, Any] | None = environ.get(
+                self.REQUEST_STATS_KEY, None)
+            if stats is None:
+                stats = {
+                    'db_statements': 0,
+                    'db_duration': 0,
+                    'db_slowest_statement': '',
+                    'db_slowest_duration': 0,
+                    'db_rows': 0,
+                    'db_errors': 0
+                }
+                environ[self.REQUEST_STATS_KEY] = stats
+
+            stats['db_statements'] += 1
+            stats['db_duration'] += duration
+            if duration >= stats['db_slowest_duration']:
+                stats['db_slowest_statement'] = self.normalize(statement)
+                stats['db_slowest_duration'] = duration
+            if rowcount > 0:
+                stats['db_rows'] += rowcount
+            if is_failed:
+                stats['db_errors'] += 1
+
+        if is_slow:
+            log_kwargs: dict[str, Any] = dict(
+                db_statement=self.normalize(statement),
+                db_duration=duration)
+            if view is not None:
+                log_kwargs['db_view'] = view
+            log.logger.bind(**log_kwargs).warning('Slow SQL statement')
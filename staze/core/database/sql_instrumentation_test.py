@@ -0,0 +1,99 @@
+import pytest
+import sqlalchemy as sa
+from flask import Flask
+from staze.core.database.sql_instrumentation import SqlInstrumentation
+from staze.core.log.log import log
+
+
+@pytest.fixture
+def engine():
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.exec_driver_sql('CREATE TABLE item (id INTEGER)')
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def slow_records():
+    records: list[dict] = []
+    handler_id: int = log.logger.add(
+        lambda message: records.append(message.record),
+        level='DEBUG',
+        filter=lambda record: 'db_statement' in record['extra'])
+    yield records
+    log.logger.remove(handler_id)
+
+
+class TestSqlInstrumentation:
+    def test_normalize(self):
+        assert SqlInstrumentation.normalize(
+            "SELECT *\n  FROM item_1 WHERE id IN (?, ?, ?)"
+            " AND name = 'it''s' AND price > 1.5 LIMIT 10") \
+                == 'SELECT * FROM item_1 WHERE id IN (?) AND name = ?' \
+                    ' AND price > ? LIMIT ?'
+
+    def test_request_stats(self, engine):
+        SqlInstrumentation().listen(engine)
+
+        with Flask(__name__).test_request_context('/'):
+            assert SqlInstrumentation.get_request_stats() is None
+
+            with engine.begin() as connection:
+                connection.execute(
+                    sa.text('INSERT INTO item (id) VALUES (:id)'),
+                    [{'id': 1}, {'id': 2}])
+                connection.exec_driver_sql(
+                    'SELECT id FROM item WHERE id = 1').all()
+
+            stats: dict | None = SqlInstrumentation.get_request_stats()
+            assert stats is not None
+            assert stats['db_statements'] == 2
+            assert stats['db_rows'] == 2
+            assert stats['db_duration'] >= stats['db_slowest_duration'] > 0
+            assert stats['db_slowest_statement'] in [
+                'INSERT INTO item (id) VALUES (?)',
+                'SELECT id FROM item WHERE id = ?'
+            ]
+
+    def test_failed_statement(self, engine):
+        SqlInstrumentation().listen(engine)
+
+        with Flask(__name__).test_request_context('/'):
+            with engine.connect() as connection:
+                with pytest.raises(sa.exc.OperationalError):
+                    connection.exec_driver_sql('SELECT id FROM unknown')
+                assert connection.info[SqlInstrumentation.STARTED_AT_KEY] \
+                    == []
+                connection.exec_driver_sql('SELECT id FROM item').all()
+
+            stats: dict | None = SqlInstrumentation.get_request_stats()
+            assert stats is not None
+            assert stats['db_statements'] == 2
+            assert stats['db_errors'] == 1
+            assert stats['db_duration'] >= stats['db_slowest_duration'] > 0
+
+    def test_outside_request(self, engine, slow_records):
+        SqlInstrumentation().listen(engine)
+
+        with engine.connect() as connection:
+            connection.exec_driver_sql('SELECT id FROM item').all()
+
+        assert SqlInstrumentation.get_request_stats() is None
+        assert slow_records == []
+
+    def test_slow_query_log(self, engine, slow_records):
+        SqlInstrumentation(slow_query_threshold=0).listen(engine)
+
+        app = Flask(__name__)
+        app.add_url_rule('/items', 'items', lambda: '')
+        with engine.connect() as connection:
+            connection.exec_driver_sql('SELECT id FROM item WHERE id = 1')
+            with app.test_request_context('/items'):
+                connection.exec_driver_sql('SELECT id FROM item WHERE id = 2')
+
+        assert [x['extra']['db_statement'] for x in slow_records] \
+            == ['SELECT id FROM item WHERE id = ?'] * 2
+        assert 'db_view' not in slow_records[0]['extra']
+        assert slow_records[1]['extra']['db_view'] == 'items'
+        assert slow_records[1]['level'].name == 'WARNING'
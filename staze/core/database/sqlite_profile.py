@@ -0,0 +1,90 @@
+import re
+from typing import Any
+
+import sqlalchemy as sa
+
+
+class SqliteProfile:
+    """Set of pragmas applied to every new sqlite connection.
+
+    Sqlite pragmas are per connection, so they are applied on connection
+    creation by the engine's pool.
+
+    Args:
+        pragmas:
+            Values by pragma names, only names of PRAGMAS are accepted.
+    """
+    PRAGMAS: list[str] = [
+        # Journal mode is applied first, since other pragmas may depend on it
+        'journal_mode',
+        'synchronous',
+        'cache_size',
+        'mmap_size',
+        'temp_store',
+        'busy_timeout'
+    ]
+    PROFILES: dict[str, dict[str, Any]] = {
+        'default': {},
+        'wal': {
+            'journal_mode': 'WAL',
+            # In WAL mode NORMAL is durable against application crashes, only
+            # power loss may rollback the last transactions
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000
+        },
+        'performance': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            # Negative size is in KiB, i.e. 64 MiB
+            'cache_size': -65536,
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY'
+        }
+    }
+
+    def __init__(self, pragmas: dict[str, Any]) -> None:
+        for k, v in pragmas.items():
+            if k not in self.PRAGMAS:
+                raise ValueError(f'Unrecognized sqlite pragma: {k}')
+            # Pragma values can't be passed as parameters, so they're checked
+            # to be plain words or numbers before formatting to statement
+            if type(v) is not int and not re.fullmatch(r'\w+', str(v)):
+                raise ValueError(f'Wrong value of sqlite pragma {k}: {v}')
+
+        self._pragmas: dict[str, Any] = {
+            x: pragmas[x] for x in self.PRAGMAS if x in pragmas
+        }
+
+    @property
+    def pragmas(self) -> dict[str, Any]:
+        return self._pragmas.copy()
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'SqliteProfile':
+        """Create profile from `sqlite` section of database config.
+
+        Config's `profile` key chooses one of PROFILES, default one if not
+        given, other keys are pragmas overriding profile's ones.
+        """
+        pragmas: dict[str, Any] = dict(config)
+        profile_name: str = pragmas.pop('profile', 'default')
+
+        try:
+            profile: dict[str, Any] = cls.PROFILES[profile_name]
+        except KeyError:
+            raise ValueError(f'Unrecognized sqlite profile: {profile_name}')
+
+        return cls({**profile, **pragmas})
+
+    def listen(self, engine: Any) -> None:
+        """Apply pragmas to every new connection of the engine."""
+        sa.event.listen(engine, 'connect', self.apply)
+
+    def apply(self, dbapi_connection: Any, connection_record: Any) -> None:
+        cursor: Any = dbapi_connection.cursor()
+        try:
+            for k, v in self._pragmas.items():
+                cursor.execute(f'PRAGMA {k}={v}')
+        finally:
+            cursor.close()
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+import sqlalchemy as sa
+from staze.core.database.sqlite_profile import SqliteProfile
+
+
+class TestSqliteProfile:
+    def test_apply(self, tmp_path):
+        engine = sa.create_engine(
+            'sqlite:///' + os.path.join(tmp_path, 'test.db'))
+        SqliteProfile.from_config(
+            {'profile': 'performance', 'busy_timeout': 1000}).listen(engine)
+
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql(
+                'PRAGMA journal_mode').scalar() == 'wal'
+            assert connection.exec_driver_sql(
+                'PRAGMA synchronous').scalar() == 1
+            assert connection.exec_driver_sql(
+                'PRAGMA busy_timeout').scalar() == 1000
+            assert connection.exec_driver_sql(
+                'PRAGMA cache_size').scalar() == -65536
+
+    def test_default(self):
+        assert SqliteProfile.from_config({}).pragmas == {}
+
+    def test_wrong_config(self):
+        with pytest.raises(ValueError):
+            SqliteProfile.from_config({'profile': 'unknown'})
+        with pytest.raises(ValueError):
+            SqliteProfile({'foreign_keys': 'ON'})
+        with pytest.raises(ValueError):
+            SqliteProfile({'journal_mode': 'WAL; DROP TABLE user_orm'})
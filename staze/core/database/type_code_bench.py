@@ -0,0 +1,97 @@
+"""Benchmark of subclass queries over string and compact type columns.
+
+Table of ROWS is filled so that every SUBCLASS_RATIO row belongs to
+subclass, and the subclass is queried with the base Orm's discriminator
+stored:
+- `string` - as unindexed identity string, the default
+- `code` - as indexed type code of TYPE_CODES
+
+Run as:
+```sh
+python -m staze.core.database.type_code_bench
+```
+"""
+import argparse
+import time
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session, declarative_base
+from staze.core.database.database import Orm
+
+
+SUBCLASS_RATIO: int = 100
+
+
+def make_orm_classes(type_codes: dict[str, int] | None) -> tuple[Any, Any]:
+    """Return base and subclass Orms mapped to own metadata."""
+    Base: Any = declarative_base(cls=Orm, metadata=sa.MetaData())
+
+    class BenchUserOrm(Base):
+        TYPE_CODES = type_codes
+        _name = sa.Column(sa.String(150))
+
+    class BenchAdvancedUserOrm(BenchUserOrm):
+        # Single table inheritance
+        __tablename__ = None
+
+    return BenchUserOrm, BenchAdvancedUserOrm
+
+
+def bench_orm_classes(
+        orm_classes: tuple[Any, Any], rows: int, queries: int) -> float:
+    """Return subclass queries per second."""
+    user_orm_class, advanced_user_orm_class = orm_classes
+    engine: Any = sa.create_engine('sqlite://')
+    user_orm_class.metadata.create_all(engine)
+
+    try:
+        with Session(engine) as session:
+            session.bulk_insert_mappings(
+                sa.inspect(user_orm_class),
+                [
+                    {
+                        '_type': sa.inspect(
+                            advanced_user_orm_class
+                            if i % SUBCLASS_RATIO == 0
+                            else user_orm_class).polymorphic_identity,
+                        '_name': f'user{i}'
+                    }
+                    for i in range(rows)
+                ])
+            session.commit()
+
+            started_at: float = time.perf_counter()
+            for _ in range(queries):
+                session.query(advanced_user_orm_class).all()
+                session.expunge_all()
+            return queries / (time.perf_counter() - started_at)
+    finally:
+        engine.dispose()
+
+
+def run(rows: int = 100000, queries: int = 50) -> dict[str, float]:
+    """Return subclass queries per second by type column kind."""
+    return {
+        'string': bench_orm_classes(make_orm_classes(None), rows, queries),
+        'code': bench_orm_classes(
+            make_orm_classes({'bench_user': 1, 'bench_advanced_user': 2}),
+            rows,
+            queries)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark subclass queries over type column kinds')
+    parser.add_argument(
+        '--rows', type=int, default=100000, help='amount of rows in table')
+    parser.add_argument(
+        '--queries', type=int, default=50,
+        help='amount of subclass queries')
+    parsed = parser.parse_args()
+
+    results: dict[str, float] = run(parsed.rows, parsed.queries)
+    for name, result in results.items():
+        print(f'{name:>8}: {result:>9.1f} queries/sec')
+    print(f' speedup: {results["code"] / results["string"]:>9.2f}x')
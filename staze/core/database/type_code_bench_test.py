@@ -0,0 +1,8 @@
+from staze.core.database import type_code_bench
+
+
+def test_run():
+    results: dict[str, float] = type_code_bench.run(rows=500, queries=5)
+
+    assert list(results.keys()) == ['string', 'code']
+    assert all(x > 0 for x in results.values())
@@ -0,0 +1,99 @@
+from typing import Any
+
+import sqlalchemy as sa
+
+
+class TypeCodeMigration:
+    """Converts string `_type` column of existing table to compact type codes
+    and back.
+
+    Intended to be called from alembic revision, after TYPE_CODES are
+    defined for the table's Orm, e.g.:
+    ```python
+    def upgrade():
+        TypeCodeMigration.for_orm(UserOrm).upgrade(op)
+
+    def downgrade():
+        TypeCodeMigration.for_orm(UserOrm).downgrade(op)
+    ```
+
+    Column is recreated in batch mode, so it works for sqlite as well.
+
+    Args:
+        table_name:
+            Name of the table to convert.
+        type_codes:
+            Codes by polymorphic identities stored in the table.
+    """
+    COLUMN_NAME: str = '_type'
+    # Name of temporary column values are converted to
+    CONVERTED_COLUMN_NAME: str = '_type_converted'
+
+    def __init__(self, table_name: str, type_codes: dict[str, int]) -> None:
+        self._table_name = table_name
+        self._type_codes = type_codes
+
+    @property
+    def index_name(self) -> str:
+        # The same name sqlalchemy gives to indexed column by default
+        return f'ix_{self._table_name}_{self.COLUMN_NAME}'
+
+    @classmethod
+    def for_orm(cls, orm_class: Any) -> 'TypeCodeMigration':
+        if orm_class.TYPE_CODES is None:
+            raise ValueError(f'{orm_class.__name__} has no type codes')
+        return cls(orm_class.__table__.name, orm_class.TYPE_CODES)
+
+    def upgrade(self, op: Any) -> None:
+        """Replace stored identities with their codes.
+
+        Raise:
+            ValueError:
+                Table contains identity without code.
+        """
+        self._convert(op, sa.SmallInteger, self._type_codes)
+
+        with op.batch_alter_table(self._table_name) as batch:
+            batch.create_index(self.index_name, [self.COLUMN_NAME])
+
+    def downgrade(self, op: Any) -> None:
+        """Replace stored codes with their identities."""
+        with op.batch_alter_table(self._table_name) as batch:
+            batch.drop_index(self.index_name)
+
+        self._convert(
+            op,
+            sa.String(250),
+            {v: k for k, v in self._type_codes.items()})
+
+    def _convert(
+            self, op: Any, column_type: Any, values: dict[Any, Any]) -> None:
+        with op.batch_alter_table(self._table_name) as batch:
+            batch.add_column(
+                sa.Column(self.CONVERTED_COLUMN_NAME, column_type))
+
+        table: Any = sa.table(
+            self._table_name,
+            sa.column(self.COLUMN_NAME),
+            sa.column(self.CONVERTED_COLUMN_NAME))
+        column: Any = table.c[self.COLUMN_NAME]
+        converted_column: Any = table.c[self.CONVERTED_COLUMN_NAME]
+
+        op.execute(table.update().values({
+            converted_column: sa.case(values, value=column)
+        }))
+
+        unconverted: list[Any] = [
+            x[0] for x in op.get_bind().execute(
+                sa.select(column).distinct().where(
+                    column.is_not(None), converted_column.is_(None)))
+        ]
+        if unconverted:
+            raise ValueError(
+                f'No conversion for values of {self._table_name}'
+                f' {self.COLUMN_NAME}: {unconverted}')
+
+        with op.batch_alter_table(self._table_name) as batch:
+            batch.drop_column(self.COLUMN_NAME)
+            batch.alter_column(
+                self.CONVERTED_COLUMN_NAME, new_column_name=self.COLUMN_NAME)
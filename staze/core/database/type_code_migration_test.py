@@ -0,0 +1,59 @@
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from staze.core.database.type_code_migration import TypeCodeMigration
+
+
+@pytest.fixture
+def engine():
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            'CREATE TABLE user_orm'
+            ' (_id INTEGER PRIMARY KEY, _type VARCHAR(250), _name VARCHAR)')
+        connection.exec_driver_sql(
+            "INSERT INTO user_orm (_type, _name) VALUES"
+            " ('user', 'a'), ('advanced_user', 'b'), (NULL, 'c')")
+    yield engine
+    engine.dispose()
+
+
+def get_rows(connection) -> list[tuple]:
+    return [
+        tuple(x) for x in connection.exec_driver_sql(
+            'SELECT _id, _type, _name FROM user_orm ORDER BY _id')
+    ]
+
+
+class TestTypeCodeMigration:
+    def test_upgrade_downgrade(self, engine):
+        migration = TypeCodeMigration(
+            'user_orm', {'user': 1, 'advanced_user': 2})
+
+        with engine.begin() as connection:
+            op = Operations(MigrationContext.configure(connection))
+
+            migration.upgrade(op)
+            assert get_rows(connection) \
+                == [(1, 1, 'a'), (2, 2, 'b'), (3, None, 'c')]
+            inspector = sa.inspect(connection)
+            assert [x['name'] for x in inspector.get_indexes('user_orm')] \
+                == ['ix_user_orm__type']
+            assert isinstance(
+                inspector.get_columns('user_orm')[-1]['type'],
+                sa.SmallInteger)
+
+            migration.downgrade(op)
+            assert get_rows(connection) == [
+                (1, 'user', 'a'), (2, 'advanced_user', 'b'), (3, None, 'c')
+            ]
+            assert sa.inspect(connection).get_indexes('user_orm') == []
+
+    def test_unknown_identity(self, engine):
+        migration = TypeCodeMigration('user_orm', {'user': 1})
+
+        with engine.connect() as connection:
+            op = Operations(MigrationContext.configure(connection))
+            with pytest.raises(ValueError):
+                migration.upgrade(op)
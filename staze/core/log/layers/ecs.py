@@ -1,223 +1,137 @@
-import json
-from datetime import datetime, timezone
 from loguru._handler import Message
+from staze.core.log.layers.ecs_field import EcsField
 from staze.core.log.layers.layer import Layer
 from staze.core.log.log_error import LogError
 
 
 class Ecs(Layer):
-    def format(self, message: Message):
-        result: dict = {}
-        record = message.record
-
-        labels: dict = {}
-
-        self._populate_request_context(result)
-        
-        client_ip: str | None = None
-        url_full: str | None = None
-        url_path: str | None = None
-        url_port: str | None = None
-        url_query: str | None = None
+    """Layer formatting records to Elastic Common Schema.
 
-        http_request_mime_type: str | None = None
-        http_request_method: str | None = None
-        http_request_headers: dict | None = None
-        http_request_body_content: str | None = None
+    Known record's extra keys are written to according ECS fields by `FIELDS`
+    schema, all others are stored as labels.
+    https://www.elastic.co/guide/en/ecs/current/ecs-base.html
+    """
+    FIELDS: list[EcsField] = [
+        EcsField('client_ip', 'client.ip', str, 'client ip'),
+        EcsField('url_full', 'url.full', str, 'full url'),
+        EcsField('url_path', 'url.path', str, 'url path'),
+        EcsField('url_port', 'url.port', str, 'url port'),
+        EcsField('url_query', 'url.query', str, 'url query'),
+        EcsField('error_type', 'error.type', str, 'error type'),
+        EcsField('error_message', 'error.message', str, 'error message'),
+        EcsField('error_code', 'error.code', int, 'error code'),
+        EcsField('event_duration', 'event.duration', int, 'event duration'),
+        EcsField(
+            'http_request_method',
+            'http.request.method',
+            str,
+            'http request method'),
+        EcsField(
+            'http_request_headers',
+            'http.request.headers',
+            dict,
+            'request headers'),
+        EcsField(
+            'http_request_mime_type',
+            'http.request.mime_type',
+            str,
+            'request mimetype'),
+        EcsField(
+            'http_request_body_content',
+            'http.request.body.content',
+            str,
+            'request body content'),
+        EcsField(
+            'http_response_status_code',
+            'http.response.status_code',
+            int,
+            'http response status code'),
+        EcsField(
+            'http_response_headers',
+            'http.response.headers',
+            dict,
+            'response headers'),
+        EcsField(
+            'http_response_mime_type',
+            'http.response.mime_type',
+            str,
+            'response mimetype'),
+        EcsField(
+            'http_response_body_content',
+            'http.response.body.content',
+            str,
+            'response body content')
+    ]
+    LABEL_TYPES: tuple[type, ...] = (str, int, float)
+    VERSION: str = '8.4'
 
-        http_response_status_code: int | None = None
-        http_response_headers: dict | None = None
-        http_response_mime_type: str | None = None
-        http_response_body_content: str | None = None
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Compile schema once to plain tuples of path and type, to avoid
+        # per record attribute lookups
+        self._field_by_key: dict[str, tuple[str, type]] = {
+            field.key: (field.path, field.type) for field in self.FIELDS
+        }
+        self._description_by_key: dict[str, str] = {
+            field.key: field.description for field in self.FIELDS
+        }
 
-        error_type: str | None = None
-        error_message: str | None = None
-        error_code: int | None = None
+    def format(self, message: Message, context: dict | None = None):
+        record = message.record
 
-        # Extra dictionary transformed to ECS labels shouldn't contain nested
-        # objects in values as ECS restricts
-        # https://www.elastic.co/guide/en/ecs/current/ecs-base.html
-        for k, v in record['extra'].items():
-            # Client information should be stored separately
-            match k:
-                case 'service_hash':
-                    service_hash = v
-                    if type(service_hash) is not int:
-                        raise LogError(
-                            'Service hash should have type int,'
-                            f' got {type(service_hash)} instead'
-                            )
-                    self._populate_service_context(result, service_hash)
-                    # Write service hash to labels anyway
-                    labels[k] = v
-                case 'client_ip':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of client ip should be string,'
-                            f' got {type(v)} instead'
-                        )
-                    client_ip = v
-                case 'url_full':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of full url should be string,'
-                            f' got {type(v)} instead'
-                        )
-                    url_full = v
-                case 'url_path':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of url path should be string,'
-                            f' got {type(v)} instead'
-                        )
-                    url_path = v
-                case 'url_port':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of url port should be string,'
-                            f' got {type(v)} instead'
-                        )
-                    url_port = v
-                case 'url_query':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of url query should be string,'
-                            f' got {type(v)} instead'
-                        )
-                    url_query = v
-                case 'http_request_method':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of http request method should be string,'
-                            f' got {type(v)} instead'
-                        )
-                    http_request_method = v
-                case 'http_response_status_code':
-                    if type(v) is not int:
-                        raise LogError(
-                            'Value of http response status code should be int,'
-                            f' got {type(v)} instead'
-                        )
-                    http_response_status_code = v
-                case 'error_type':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of error type should be str,'
-                            f' got {type(v)} instead'
-                        )
-                    error_type = v
-                case 'error_message':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of error message should be str,'
-                            f' got {type(v)} instead'
-                        )
-                    error_message = v
-                case 'error_code':
-                    if type(v) is not int:
-                        raise LogError(
-                            'Value of error code should be int,'
-                            f' got {type(v)} instead'
-                        )
-                    error_code = v
-                case 'http_response_headers':
-                    if type(v) is not dict:
-                        raise LogError(
-                            'Value of response headers should be dict,'
-                            f' got {type(v)} instead'
-                        )
-                    http_response_headers = v
-                case 'http_response_mime_type':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of response mimetype should be str,'
-                            f' got {type(v)} instead'
-                        )
-                    http_response_mime_type = v
-                case 'http_response_body_content':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of response body content should be str,'
-                            f' got {type(v)} instead'
-                        )
-                    http_response_body_content = v
-                case 'http_request_headers':
-                    if type(v) is not dict:
-                        raise LogError(
-                            'Value of request headers should be dict,'
-                            f' got {type(v)} instead'
-                        )
-                    http_request_headers = v
-                case 'http_request_body_content':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of request body content should be str,'
-                            f' got {type(v)} instead'
-                        )
-                    http_request_body_content = v
-                case 'http_request_mime_type':
-                    if type(v) is not str:
-                        raise LogError(
-                            'Value of request mimetype should be str,'
-                            f' got {type(v)} instead'
-                        )
-                    http_request_mime_type = v
-                case _:
-                    if type(k) is not str:
-                        raise LogError(f'Key {k} of extra field should be str')
-                    if type(v) not in [str, int, float]:
-                        raise LogError(
-                            f'Value {v} of extra field should be str, int or'
-                            ' float'
-                            )
-                    labels[k] = v
+        if context is None:
+            context = self.capture_context()
 
         # Since loguru correctly sets up timezone for every datetime emitted,
         # there is not problem of getting timestamp directly - utc timestamp
         # will be returned
-        result['@timestamp'] = record['time'].timestamp()
-        result['labels'] = labels
-        result['message'] = record['message']
-        result['log.file.path'] = record['file'].path
-        result['log.level'] = record['level'].name
-        result['log.origin.file.line'] = record['line']
-        result['log.origin.file.name'] = record['name']
-        result['log.origin.function'] = record['function']
-        if client_ip:
-            result['client.ip'] = client_ip
-
-        if url_full:
-            result['url.full'] = url_full
-        if url_path:
-            result['url.path'] = url_path
-        if url_port:
-            result['url.query'] = url_query
-
-        if error_type:
-            result['error.type'] = error_type
-        if error_message:
-            result['error.message'] = error_message
-        if error_code:
-            result['error.code'] = error_code
+        result: dict = {
+            '@timestamp': record['time'].timestamp(),
+            'message': record['message'],
+            'log.file.path': record['file'].path,
+            'log.level': record['level'].name,
+            'log.origin.file.line': record['line'],
+            'log.origin.file.name': record['name'],
+            'log.origin.function': record['function']
+        }
+        labels: dict = {}
+        field_by_key = self._field_by_key
+        label_types = self.LABEL_TYPES
 
-        if http_request_method:
-            result['http.request.method'] = http_request_method
-        if http_request_headers:
-            result['http.request.headers'] = http_request_headers
-        if http_request_mime_type:
-            result['http.request.mime_type'] = http_request_mime_type
-        if http_request_body_content:
-            result['http.request.body.content'] = http_request_body_content
+        # Extra dictionary transformed to ECS labels shouldn't contain nested
+        # objects in values as ECS restricts
+        for k, v in record['extra'].items():
+            field = field_by_key.get(k)
 
-        if http_response_status_code:
-            result['http.response.status_code'] = http_response_status_code
-        if http_response_headers:
-            result['http.response.headers'] = http_response_headers
-        if http_response_mime_type:
-            result['http.response.mime_type'] = http_response_mime_type
-        if http_response_body_content:
-            result['http.response.body.content'] = http_response_body_content
+            if field is not None:
+                path, type_ = field
+                if type(v) is not type_:
+                    raise LogError(
+                        f'Value of {self._description_by_key[k]} should be'
+                        f' {type_.__name__}, got {type(v)} instead'
+                    )
+                if v:
+                    result[path] = v
+            elif k == 'service_hash':
+                if type(v) is not int:
+                    raise LogError(
+                        'Service hash should have type int,'
+                        f' got {type(v)} instead'
+                        )
+                self._populate_service_context(result, v)
+                # Write service hash to labels anyway
+                labels[k] = v
+            else:
+                if type(k) is not str:
+                    raise LogError(f'Key {k} of extra field should be str')
+                if type(v) not in label_types:
+                    raise LogError(
+                        f'Value {v} of extra field should be str, int or'
+                        ' float'
+                        )
+                labels[k] = v
 
-        result['ecs.version'] = '8.4'
+        result['labels'] = labels
+        result['ecs.version'] = self.VERSION
 
-        self._write(result)
+        self._write(result, context)
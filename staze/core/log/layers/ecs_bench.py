@@ -0,0 +1,159 @@
+"""Micro-benchmark of ECS layer formatting.
+
+Measures records per second of the `Ecs` layer formatting typical response
+records, RECORDS_PER_REQUEST of them sharing the same request context, with
+standard json encoder and with orjson, if installed. Both are compared
+against `LegacyEcs` - the formatter the `Ecs` layer has been replaced from,
+if it's available, i.e. the benchmark is run from the source tree. Run as:
+```sh
+python -m staze.core.log.layers.ecs_bench
+```
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from loguru._handler import Message
+from staze.core.app.app_mode_enum import RunAppModeEnum
+from staze.core.log.layers.ecs import Ecs
+from staze.core.log.layers.layer import Layer, orjson
+
+try:
+    from staze.core.log.layers.ecs_bench_baseline import LegacyEcs
+except ImportError:
+    # Baseline isn't distributed with the package
+    LegacyEcs = None
+
+
+RECORDS_PER_REQUEST: int = 3
+
+
+class NullWriter:
+    """Writer discarding all records to measure formatting only."""
+    def write(self, line: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def create_messages(count: int) -> list[Message]:
+    """Return given amount of typical response records as loguru messages.
+
+    Messages are created directly instead of emitting them to not pass them
+    to sinks added to the logger.
+    """
+    messages: list[Message] = []
+    extra: dict = {
+        'http_response_status_code': 200,
+        'http_response_headers': {
+            'Content-Type': 'application/json',
+            'Content-Length': '19'
+        },
+        'http_response_mime_type': 'application/json',
+        'http_response_body_content': '{"user": {"id": 1}}',
+        'db_statements': 2,
+        'db_duration': 120000
+    }
+
+    for i in range(count):
+        message = Message(f'GET /users/1 - {i}\n')
+        message.record = {
+            'time': datetime.now(timezone.utc),
+            'message': f'GET /users/1 - {i}',
+            'file': SimpleNamespace(name=__file__, path=__file__),
+            'level': SimpleNamespace(name='INFO', no=20, icon=''),
+            'line': i,
+            'name': __name__,
+            'function': 'create_messages',
+            'extra': dict(extra)
+        }
+        messages.append(message)
+
+    return messages
+
+
+def create_context() -> dict:
+    """Return typical request context as captured by layers."""
+    return {
+        'http.request.method': 'POST',
+        'http.request.headers': {
+            'Host': 'example.com',
+            'User-Agent':
+                'Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101'
+                ' Firefox/118.0',
+            'Accept': 'application/json',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+            'Cookie': 'session=' + 'a' * 200,
+            'Content-Type': 'application/json',
+            'Content-Length': '38'
+        },
+        'http.request.mime_type': 'application/json',
+        'http.request.body.content': '{"username": "max", "password": "x"}'
+    }
+
+
+def create_layer(
+        LayerClass: type[Layer], path: str, json_encoder: str = 'json'
+        ) -> Layer:
+    layer: Layer = LayerClass(
+        path=path,
+        mode_enum=RunAppModeEnum.TEST,
+        service_by_hash={},
+        json_encoder=json_encoder)
+    layer.close()
+    layer._writer = NullWriter()  # type: ignore
+    return layer
+
+
+def measure(
+        layer: Layer, messages: list[Message], repeat: int = 5) -> float:
+    """Return best records per second formatted and encoded by given layer
+    over several runs.
+    """
+    contexts: list[dict] = [
+        create_context()
+        for _ in range(0, len(messages), RECORDS_PER_REQUEST)
+    ]
+    best: float = 0.0
+    for _ in range(repeat):
+        started_at: float = time.perf_counter()
+        for i, message in enumerate(messages):
+            layer.format(message, contexts[i // RECORDS_PER_REQUEST])
+        best = max(best, len(messages) / (time.perf_counter() - started_at))
+    return best
+
+
+def bench_format(count: int = 20000) -> dict[str, float]:
+    """Return records per second for the baseline and every json encoder."""
+    messages: list[Message] = create_messages(count)
+    result: dict[str, float] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, 'bench.log')
+
+        if LegacyEcs is not None:
+            result['legacy'] = measure(
+                create_layer(LegacyEcs, path), messages)
+        result['json'] = measure(create_layer(Ecs, path), messages)
+        if orjson is not None:
+            result['orjson'] = measure(
+                create_layer(Ecs, path, 'orjson'), messages)
+
+    return result
+
+
+if __name__ == '__main__':
+    result: dict[str, float] = bench_format()
+    baseline: str = 'legacy' if 'legacy' in result else 'json'
+    for name, records_per_second in result.items():
+        print(
+            f'{name:>8}: {records_per_second:>10.0f} records/sec'
+            f' ({records_per_second / result[baseline]:.2f}x of {baseline})')
@@ -0,0 +1,20 @@
+from typing import NamedTuple
+
+
+class EcsField(NamedTuple):
+    """Declaration of record's extra key to be placed to ECS field.
+
+    Args:
+        key:
+            Key of record's extra dictionary.
+        path:
+            Dotted ECS path the value is written to.
+        type:
+            Exact type the value should have.
+        description:
+            Human readable name of the value used in error messages.
+    """
+    key: str
+    path: str
+    type: type
+    description: str
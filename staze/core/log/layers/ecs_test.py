@@ -0,0 +1,132 @@
+import json
+import os
+
+from pytest import fixture, mark, raises
+from staze.core.log.layers.ecs import Ecs
+from staze.core.log.layers.ecs_bench import (NullWriter, create_context,
+                                             create_layer, create_messages)
+from staze.core.log.layers.ecs_bench_baseline import LegacyEcs
+from staze.core.log.layers.layer import Layer, orjson
+from staze.core.log.log_error import LogError
+
+
+class CollectingWriter(NullWriter):
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def write(self, line: str) -> None:
+        self.lines.append(line)
+
+
+@fixture
+def path(tmp_path) -> str:
+    return os.path.join(tmp_path, 'ecs.log')
+
+
+def _format(layer: Layer, messages: list) -> list[dict]:
+    writer = CollectingWriter()
+    layer._writer = writer  # type: ignore
+    for message in messages:
+        layer.format(message, {})
+    return [json.loads(x) for x in writer.lines]
+
+
+class TestEcs:
+    def test_format(self, path: str):
+        message = create_messages(1)[0]
+        message.record['extra'].update({
+            'client_ip': '127.0.0.1',
+            'url_path': '/users/1',
+            'url_port': '5000',
+            'url_query': 'page=1',
+            'error_code': 0
+        })
+
+        log: dict = _format(create_layer(Ecs, path), [message])[0]
+
+        assert log == {
+            '@timestamp': message.record['time'].timestamp(),
+            'message': 'GET /users/1 - 0',
+            'log.file.path': message.record['file'].path,
+            'log.level': 'INFO',
+            'log.origin.file.line': 0,
+            'log.origin.file.name': message.record['name'],
+            'log.origin.function': 'create_messages',
+            'client.ip': '127.0.0.1',
+            'url.path': '/users/1',
+            # Previous formatter wrote query only under port's condition and
+            # never wrote the port itself
+            'url.port': '5000',
+            'url.query': 'page=1',
+            'http.response.status_code': 200,
+            'http.response.headers': {
+                'Content-Type': 'application/json',
+                'Content-Length': '19'
+            },
+            'http.response.mime_type': 'application/json',
+            'http.response.body.content': '{"user": {"id": 1}}',
+            # Falsy field values are omitted
+            'labels': {'db_statements': 2, 'db_duration': 120000},
+            'ecs.version': Ecs.VERSION
+        }
+
+    def test_context(self, path: str):
+        messages: list = create_messages(2)
+        messages[1].record['extra']['http_request_method'] = 'PUT'
+        context: dict = create_context()
+        writer = CollectingWriter()
+        layer: Layer = create_layer(Ecs, path)
+        layer._writer = writer  # type: ignore
+
+        for message in messages:
+            layer.format(message, context)
+        layer.format(messages[0], context)
+        logs: list[dict] = [json.loads(x) for x in writer.lines]
+
+        assert logs[0] == logs[2] == {
+            **context,
+            **_format(create_layer(Ecs, path), messages[:1])[0]
+        }
+        # Fields of the record override context's ones
+        assert logs[1]['http.request.method'] == 'PUT'
+        assert logs[1]['http.request.headers'] \
+            == context['http.request.headers']
+        assert list(logs[0])[:len(context)] == list(context)
+
+    def test_same_as_baseline(self, path: str):
+        messages: list = create_messages(3)
+        context: dict = create_context()
+
+        lines: list[list[dict]] = []
+        for LayerClass in [LegacyEcs, Ecs]:
+            writer = CollectingWriter()
+            layer: Layer = create_layer(LayerClass, path)
+            layer._writer = writer  # type: ignore
+            for message in messages:
+                layer.format(message, context)
+            lines.append([json.loads(x) for x in writer.lines])
+
+        assert lines[0] == lines[1]
+
+    @mark.skipif(orjson is None, reason='orjson is not installed')
+    def test_orjson(self, path: str):
+        messages: list = create_messages(3)
+
+        assert \
+            _format(create_layer(Ecs, path, 'orjson'), messages) \
+            == _format(create_layer(Ecs, path), messages)
+
+        context: dict = create_context()
+        writer = CollectingWriter()
+        layer: Layer = create_layer(Ecs, path, 'orjson')
+        layer._writer = writer  # type: ignore
+        layer.format(messages[0], context)
+        assert json.loads(writer.lines[0]) \
+            == {**context, **_format(create_layer(Ecs, path), messages)[0]}
+
+    def test_wrong_type(self, path: str):
+        message = create_messages(1)[0]
+        message.record['extra']['http_response_status_code'] = '200'
+
+        with raises(LogError):
+            create_layer(Ecs, path).format(message, {})
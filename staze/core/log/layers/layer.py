@@ -1,13 +1,22 @@
 import json
+import time
 from types import NoneType
-from typing import TYPE_CHECKING, Any, Literal, Sequence
+from typing import TYPE_CHECKING, Any, Callable, Literal, Sequence
 from loguru._handler import Message
 from flask import request
 from staze.core.app.app_mode_enum import AppModeEnumUnion, RunAppModeEnum
 
+from staze.core.log.layers.layer_writer import LayerWriter
+from staze.core.log.log_archiver import LogArchiver
 from staze.core.log.log_error import LogError
+from staze.core.log.log_segment_writer import LogSegmentWriter
 from staze.core.log.log_snapshot_field_spec_enum import LogSnapshotFieldSpecEnum
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 if TYPE_CHECKING:
     from staze.core.service.service import Service
 
@@ -23,7 +32,29 @@ class Layer:
         rotation (optional):
             Condition indicating wheneve the current logged file should be
             closed and a new one started. 
+        retention (optional):
+            Amount of the newest rotated files to keep.
+        buffer_size (optional):
+            Amount of bytes to accumulate before writing to file.
+        flush_interval (optional):
+            Maximum amount of seconds the record can stay in the buffer.
+        json_encoder (optional):
+            Encoder to serialize records with: `json` from standard library
+            or faster `orjson`, which should be installed separately.
+        request_body_max_bytes (optional):
+            Maximum amount of bytes of request body to be logged. Bodies with
+            larger declared length are not logged.
+        storage (optional):
+            How records are stored: `file` - as plain NDJSON file at the path,
+            or `segments` - as compressed blocks with a sidecar index next to
+            the path, with `.seg` extension. Rotated segments are neither
+            compressed nor removed.
+        segment_block_size (optional):
+            Amount of records in one block of segments storage.
     """
+    # Key of request's environ the captured context is stored under
+    REQUEST_CONTEXT_KEY: str = 'staze.log_request_context'
+
 
     def __init__(
                 self,
@@ -32,35 +63,144 @@ class Layer:
                 service_by_hash: dict,
                 compression: str | None = None,
                 rotation: str | None = None,
+                retention: int | None = None,
+                buffer_size: int = 64 * 1024,
+                flush_interval: float = 1.0,
+                json_encoder: str = 'json',
+                request_body_max_bytes: int = 8192,
+                storage: str = 'file',
+                segment_block_size: int = 1000
             ) -> None:
         self._path = path
         self._compression = compression
         self._rotation = rotation
+        self._archiver = LogArchiver(
+            path=path, compression=compression, retention=retention)
+        self._writer: LayerWriter
+        match storage:
+            case 'file':
+                self._writer = LayerWriter(
+                    path=path,
+                    rotation=rotation,
+                    archiver=self._archiver,
+                    buffer_size=buffer_size,
+                    flush_interval=flush_interval)
+            case 'segments':
+                self._writer = LogSegmentWriter(
+                    path=LogSegmentWriter.get_segment_path(path),
+                    rotation=rotation,
+                    block_size=segment_block_size,
+                    buffer_size=buffer_size,
+                    flush_interval=flush_interval)
+            case _:
+                raise LogError(f'Unrecognized log storage: {storage}')
+        self._is_segmented: bool = storage == 'segments'
         self._service_by_hash = service_by_hash
         self._mode_enum = mode_enum
+        self._dumps: Callable[[dict], str] = self._get_dumps(json_encoder)
+        # Separator of items of serialized object
+        self._item_separator: str = ',' if json_encoder == 'orjson' else ', '
+        # Last request context with it's serialized fields
+        self._context_dump: tuple[dict | None, str] = (None, '')
+        self._request_body_max_bytes = request_body_max_bytes
+        # Cached snapshots with service state version and time of computation
+        self._snapshot_by_service_hash: \
+            dict[int, tuple[int, float, dict]] = {}
+
+    def capture_context(self) -> dict:
+        """Capture data of the current request to be put to the log.
+
+        Data is captured once per request on the first call and reused by all
+        subsequent records emitted within the same request.
 
-    def _populate_request_context(self, log: dict) -> None:
+        Should be called in the thread emitted the record, since request
+        context is not available from other threads.
+        """
         try:
-            request.__dict__
+            environ: dict = request.environ
         except RuntimeError:
             # Sometimes operations done without request context. In this case -
             # just skip
-            return
+            return {}
+
+        context: dict | None = environ.get(self.REQUEST_CONTEXT_KEY, None)
+        if context is None:
+            context = self._make_request_context()
+            environ[self.REQUEST_CONTEXT_KEY] = context
+        return context
+
+    def _make_request_context(self) -> dict:
+        context: dict = {
+            'http.request.method': request.method,
+            'http.request.headers': dict(request.headers),
+            'http.request.mime_type': request.mimetype
+        }
+
+        # Too large bodies are not read at all to not load them to memory
+        # just for logging. Bodies of unknown length, e.g. chunked ones, are
+        # logged only if already read by the app, since size of them is
+        # known only after reading
+        data: bytes | None = None
+        content_length: int | None = request.content_length
+        if content_length is None:
+            data = getattr(request, '_cached_data', None)
+        elif content_length <= self._request_body_max_bytes:
+            data = request.get_data(cache=True)
 
-        log['http.request.method'] = request.method
-        log['http.request.headers'] = dict(request.headers)
-        log['http.request.mime_type'] = request.mimetype
-        log['http.request.body.content'] = request.get_data(as_text=True)
+        if data is not None:
+            context['http.request.body.content'] = \
+                data[:self._request_body_max_bytes].decode(
+                    request.mimetype_params.get('charset', 'utf-8'),
+                    errors='replace')
+
+        return context
 
     def _populate_service_context(self, log: dict, service_hash: int) -> None:
         # FIXME:
         #   I haven't found right field to store my service information in ECS,
         #   so here i just store it in arbitrary field.
         service: 'Service' = self._service_by_hash[service_hash]
-        log['service.data'] = self._get_service_snapshot(service)
+        log['service.data'] = self._get_service_snapshot(service_hash, service)
+
+    def _get_service_snapshot(
+            self, service_hash: int, service: 'Service') -> dict:
+        """Return cached snapshot of the service.
+
+        Snapshot is recomputed once per service's `LOG_SNAPSHOT_INTERVAL`
+        seconds, if it is set, and only if service's state version is changed
+        otherwise.
+        """
+        now: float = time.monotonic()
+        cached: tuple[int, float, dict] | None = \
+            self._snapshot_by_service_hash.get(service_hash)
 
-    def _get_service_snapshot(self, service: 'Service') -> dict:
+        if cached is not None:
+            version, computed_at, snapshot = cached
+            interval: float | None = service.LOG_SNAPSHOT_INTERVAL
+            # Version doesn't track in place changes, so with interval set
+            # snapshot expires by time only
+            if (
+                    now - computed_at < interval if interval is not None
+                    else version == service.log_snapshot_version):
+                return snapshot
+
+        # Version is taken before making snapshot, so changes made during the
+        # making will cause recomputation on next call
+        version = service.log_snapshot_version
+        snapshot = self._make_service_snapshot(service)
+        self._snapshot_by_service_hash[service_hash] = (version, now, snapshot)
+        return snapshot
+
+    def _make_service_snapshot(self, service: 'Service') -> dict:
         rules: dict[str, LogSnapshotFieldSpecEnum] = service.LOG_SNAPSHOT_RULES
+        max_depth: int = service.LOG_SNAPSHOT_MAX_DEPTH
+        max_size: int = service.LOG_SNAPSHOT_MAX_SIZE
+
+        # Amount of values stored to snapshot
+        size: int = 0
+        # Ids of containers and objects on the current path from the service,
+        # to detect cycles
+        path_ids: set[int] = set()
 
         def _check_key_against_rules(key: str) -> bool:
             key_type: Literal['public', 'protected', 'private']
@@ -112,50 +252,141 @@ class Layer:
                 # Also for NEVER enum
                 return False
 
-        def _filter_sequence(list_: Sequence) -> list:
+        def _filter_sequence(list_: Sequence, depth: int) -> list:
+            nonlocal size
             result: list = []
-            for x in list_:
-                result.append(_filter_value(x))
+            # Copied at once, since in async mode the snapshot is made in
+            # the worker thread, while request threads can change the
+            # containers
+            for x in list(list_):
+                if size >= max_size:
+                    break
+                result.append(_filter_value(x, depth))
+                size += 1
             return result
 
         def _filter_value(
-                value: Any
+                value: Any,
+                depth: int
                 ) -> int | str | float | dict | list | bool | None:
             if type(value) in [int, str, float, bool, NoneType]:
                 return value
-            elif type(value) in (list, tuple, set):
-                return _filter_sequence(value)
-            elif type(value) is dict:
-                return _filter_dict(value)
-            else:
-                # Arbitrary object, check for it's __dict__ first
-                if hasattr(value, '__dict__'):
-                    return _filter_dict(value.__dict__)
+
+            # Values which are too deep or refer to own parents are skipped
+            if depth >= max_depth or id(value) in path_ids:
+                return None
+
+            path_ids.add(id(value))
+            try:
+                if type(value) in (list, tuple, set):
+                    return _filter_sequence(value, depth + 1)
+                elif type(value) is dict:
+                    return _filter_dict(value, depth + 1)
                 else:
-                    if hasattr(value, '__name__'):
-                        return _filter_value(value.__name__)
+                    # Arbitrary object, check for it's __dict__ first
+                    if hasattr(value, '__dict__'):
+                        return _filter_dict(value.__dict__, depth + 1)
                     else:
-                        return _filter_value(hash(value))
+                        if hasattr(value, '__name__'):
+                            return _filter_value(value.__name__, depth)
+                        else:
+                            return _filter_value(hash(value), depth)
+            finally:
+                path_ids.discard(id(value))
 
-        def _filter_dict(dict_: dict) -> dict:
+        def _filter_dict(dict_: dict, depth: int) -> dict:
+            nonlocal size
             # Only JSON-compatible types are stored
             result: dict = {}
 
-            for k, v in dict_.items():
+            for k, v in list(dict_.items()):
+                if size >= max_size:
+                    break
                 if _check_key_against_rules(k):
-                    value = _filter_value(v)
+                    value = _filter_value(v, depth)
                     if value:
                         result[k] = value
+                        size += 1
 
             return result
 
-        return _filter_dict(service.__dict__)
+        path_ids.add(id(service))
+        service_dict: dict = {
+            k: v for k, v in list(service.__dict__.items())
+            if k not in service.LOG_SNAPSHOT_EXCLUDED_KEYS
+        }
+        snapshot: dict = _filter_dict(service_dict, 0)
+
+        if size >= max_size:
+            snapshot['__truncated__'] = True
+        return snapshot
+
+    def _get_dumps(self, json_encoder: str) -> Callable[[dict], str]:
+        match json_encoder:
+            case 'json':
+                return json.JSONEncoder().encode
+            case 'orjson':
+                if orjson is None:
+                    raise LogError(
+                        'Json encoder orjson is chosen, but not installed')
+                # Standard encoder accepts non-string keys as well
+                return lambda log: orjson.dumps(
+                    log, option=orjson.OPT_NON_STR_KEYS).decode()
+            case _:
+                raise LogError(f'Unrecognized json encoder: {json_encoder}')
+
+    def _write(self, log: dict, context: dict | None = None) -> None:
+        """Serialize record prepended by fields of the request context and
+        write it.
+
+        Context is shared by all records of the request, so it's serialized
+        once and spliced to every record's line, unless the record overrides
+        some of it's fields.
+        """
+        line: str
+        if not context:
+            line = self._dumps(log)
+        elif context.keys().isdisjoint(log):
+            line = \
+                '{' + self._dump_context(context) \
+                + self._item_separator + self._dumps(log)[1:]
+        else:
+            line = self._dumps({**context, **log})
+
+        if self._is_segmented:
+            # Segment writer indexes blocks by record's fields, none of them
+            # is taken from the context
+            self._writer.write(line + '\n', log)  # type: ignore
+        else:
+            self._writer.write(line + '\n')
+
+    def _dump_context(self, context: dict) -> str:
+        # Held reference keeps the context alive, so identity check can't
+        # match another context placed to the same memory
+        cached_context, dump = self._context_dump
+        if cached_context is not context:
+            # Serialized fields without enclosing braces
+            dump = self._dumps(context)[1:-1]
+            self._context_dump = (context, dump)
+        return dump
+
+    def flush(self) -> None:
+        self._writer.flush()
+        self._archiver.drain()
+
+    def close(self) -> None:
+        self._writer.close()
+        self._archiver.stop()
 
-    def _write(self, log: dict) -> None:
-        with open(self._path, 'a+') as file:
-            json.dump(log, file)
-            file.write('\n')
+    def format(self, message: Message, context: dict | None = None) -> None:
+        """Format message and write it to the file.
 
-    def format(self, message: Message) -> None:
+        Args:
+            message:
+                Message emitted by loguru.
+            context (optional):
+                Context captured by `capture_context()` in the emitting thread.
+                Defaults to None, i.e. context is captured in place
+        """
         raise NotImplementedError(
             'Should be re-implemented at the children class')
@@ -0,0 +1,185 @@
+import io
+import os
+import time
+
+from flask import Flask, request
+from pytest import fixture
+from staze.core.log.layers.ecs import Ecs
+from staze.core.log.layers.ecs_bench import create_layer
+from staze.core.log.layers.layer import Layer
+from staze.core.service.service import Service
+
+
+class Node:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.children: list[Node] = []
+        self.parent: Node | None = None
+
+
+class SnapshotService(Service):
+    LOG_SNAPSHOT_MAX_DEPTH = 3
+    LOG_SNAPSHOT_MAX_SIZE = 50
+
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        self.counter: int = 0
+        self.cache: dict = {}
+
+
+@fixture
+def layer(tmp_path) -> Layer:
+    return create_layer(Ecs, os.path.join(tmp_path, 'layer.log'))
+
+
+@fixture
+def service():
+    yield SnapshotService({})
+    SnapshotService.__class__.instances.pop(SnapshotService, None)
+
+
+class TestServiceSnapshot:
+    def test_cache(self, layer: Layer, service: SnapshotService):
+        snapshot: dict = layer._get_service_snapshot(hash(service), service)
+        assert 'counter' not in snapshot
+
+        # In place mutations are not tracked
+        service.cache['key'] = 'value'
+        assert \
+            layer._get_service_snapshot(hash(service), service) is snapshot
+
+        service.counter = 1
+        snapshot = layer._get_service_snapshot(hash(service), service)
+        assert snapshot['counter'] == 1
+        assert snapshot['cache'] == {'key': 'value'}
+
+        service.cache['key'] = 'another value'
+        service.invalidate_log_snapshot()
+        snapshot = layer._get_service_snapshot(hash(service), service)
+        assert snapshot['cache'] == {'key': 'another value'}
+
+    def test_interval(
+            self, layer: Layer, service: SnapshotService, monkeypatch):
+        now: float = time.monotonic()
+        monkeypatch.setattr(time, 'monotonic', lambda: now)
+        service.LOG_SNAPSHOT_INTERVAL = 60
+        snapshot: dict = layer._get_service_snapshot(hash(service), service)
+
+        service.counter = 1
+        assert \
+            layer._get_service_snapshot(hash(service), service) is snapshot
+
+        # Expired even with the same version, since in place changes are not
+        # tracked
+        now += 60
+        snapshot = layer._get_service_snapshot(hash(service), service)
+        assert snapshot['counter'] == 1
+        service.cache['key'] = 'value'
+        assert \
+            layer._get_service_snapshot(hash(service), service) is snapshot
+        now += 60
+        assert layer._get_service_snapshot(hash(service), service)['cache'] \
+            == {'key': 'value'}
+
+    def test_concurrent_change(
+            self, layer: Layer, service: SnapshotService):
+        class Mutator:
+            # Stands for request thread changing the service while the
+            # snapshot is made by the worker
+            __slots__ = ()
+
+            @property
+            def __name__(self) -> str:
+                setattr(service, f'added{len(service.__dict__)}', 1)
+                service.cache[len(service.cache)] = 1
+                return 'mutator'
+
+        service.cache['mutator'] = Mutator()
+        service.mutator = Mutator()
+
+        snapshot: dict = layer._get_service_snapshot(hash(service), service)
+        assert snapshot['mutator'] == 'mutator'
+        assert snapshot['cache']['mutator'] == 'mutator'
+
+    def test_cycle_and_depth(self, layer: Layer, service: SnapshotService):
+        root = Node('root')
+        child = Node('child')
+        child.parent = root
+        root.children.append(child)
+        service.cache['root'] = root
+        service.invalidate_log_snapshot()
+
+        snapshot: dict = layer._get_service_snapshot(hash(service), service)
+
+        # Cache dict -> root node -> children list -> child node is out of
+        # depth
+        assert snapshot['cache']['root']['name'] == 'root'
+        assert snapshot['cache']['root']['children'] == [None]
+
+        service.LOG_SNAPSHOT_MAX_DEPTH = 10
+        service.invalidate_log_snapshot()
+        snapshot = layer._get_service_snapshot(hash(service), service)
+        child_snapshot: dict = snapshot['cache']['root']['children'][0]
+        assert child_snapshot['name'] == 'child'
+        # Back reference to the parent is skipped
+        assert 'parent' not in child_snapshot
+
+    def test_size(self, layer: Layer, service: SnapshotService):
+        service.cache.update({str(i): i for i in range(100)})
+        service.invalidate_log_snapshot()
+
+        snapshot: dict = layer._get_service_snapshot(hash(service), service)
+
+        assert snapshot['__truncated__'] is True
+        assert len(snapshot['cache']) <= 50
+
+
+class TestRequestContext:
+    def test_memoized(self, layer: Layer):
+        app = Flask(__name__)
+
+        with app.test_request_context(
+                '/users', method='POST', data='{"name": "max"}'):
+            context: dict = layer.capture_context()
+            assert context['http.request.method'] == 'POST'
+            assert context['http.request.body.content'] == '{"name": "max"}'
+
+            assert layer.capture_context() is context
+
+        with app.test_request_context('/users', method='GET'):
+            assert layer.capture_context() is not context
+
+    def test_body_limit(self, layer: Layer):
+        app = Flask(__name__)
+        layer._request_body_max_bytes = 4
+
+        with app.test_request_context('/', method='POST', data='a' * 4):
+            assert layer.capture_context()['http.request.body.content'] \
+                == 'aaaa'
+
+        with app.test_request_context('/', method='POST', data='a' * 5):
+            assert 'http.request.body.content' not in layer.capture_context()
+
+    def test_unknown_length(self, layer: Layer):
+        app = Flask(__name__)
+        layer._request_body_max_bytes = 4
+        kwargs: dict = dict(
+            method='POST',
+            headers={'Transfer-Encoding': 'chunked'},
+            environ_overrides={'wsgi.input_terminated': True})
+
+        with app.test_request_context(
+                '/', input_stream=io.BytesIO(b'a' * 1000), **kwargs):
+            assert 'http.request.body.content' not in layer.capture_context()
+            assert not hasattr(request, '_cached_data')
+            # Body is left to the app
+            assert len(request.get_data()) == 1000
+
+        with app.test_request_context(
+                '/', input_stream=io.BytesIO(b'a' * 1000), **kwargs):
+            request.get_data(cache=True)
+            assert layer.capture_context()['http.request.body.content'] \
+                == 'aaaa'
+
+    def test_no_request(self, layer: Layer):
+        assert layer.capture_context() == {}
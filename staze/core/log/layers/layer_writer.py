@@ -0,0 +1,358 @@
+import atexit
+import os
+import re
+import signal
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+from typing import IO, Any
+
+from staze.core.log.log_archiver import LogArchiver
+from staze.core.log.log_error import LogError
+
+
+# All writers alive in the process, flushed together on termination signal
+_writers: 'weakref.WeakSet[LayerWriter]' = weakref.WeakSet()
+_is_signal_handler_installed: bool = False
+
+_SIZE_UNITS: dict[str, int] = {
+    'b': 1,
+    'kb': 1000,
+    'mb': 1000 ** 2,
+    'gb': 1000 ** 3,
+    'kib': 1024,
+    'mib': 1024 ** 2,
+    'gib': 1024 ** 3
+}
+_DURATION_UNITS: dict[str, int] = {
+    's': 1,
+    'second': 1,
+    'm': 60,
+    'minute': 60,
+    'h': 3600,
+    'hour': 3600,
+    'd': 86400,
+    'day': 86400,
+    'w': 604800,
+    'week': 604800
+}
+_INTERVAL_KEYWORDS: dict[str, int] = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 604800
+}
+
+
+class LayerWriter:
+    """Appends serialized log records to a file through a persistent handle.
+
+    Records are accumulated in memory and written out when the buffer exceeds
+    `buffer_size` bytes, when `flush_interval` seconds are elapsed since the
+    last flush, on interpreter exit and on SIGTERM.
+
+    Args:
+        path:
+            Path to file to write records to. Parent directories are created
+            if not exist.
+        rotation (optional):
+            Condition to close current file and start a new one: a size as
+            `10 MB`, an interval as `12 hours` or `daily`, or a time of day as
+            `00:00`. Defaults to None, i.e. no rotation.
+        archiver (optional):
+            Archiver rotated files are handed to for compression and
+            retention in background. Defaults to None, i.e. rotated files are
+            left as is.
+        buffer_size (optional):
+            Amount of bytes to be accumulated before writing to file.
+            Defaults to 64 KiB.
+        flush_interval (optional):
+            Maximum amount of seconds the record can stay in the buffer.
+            Defaults to 1 second.
+        max_retained_size (optional):
+            Amount of bytes kept in memory after failed writes, e.g. on full
+            disk, oldest records over it are dropped. Defaults to 16 buffer
+            sizes.
+    """
+    # Default limit of retained records in buffer sizes
+    RETAINED_BUFFERS: int = 16
+
+    def __init__(
+                self,
+                path: str,
+                rotation: str | None = None,
+                archiver: LogArchiver | None = None,
+                buffer_size: int = 64 * 1024,
+                flush_interval: float = 1.0,
+                max_retained_size: int | None = None
+            ) -> None:
+        self._path = path
+        self._archiver = archiver
+        self._rotation_size: int | None = None
+        self._rotation_interval: float | None = None
+        # Time of day as seconds since midnight
+        self._rotation_time: int | None = None
+        self._parse_rotation(rotation)
+
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._buffered_size: int = 0
+        self._max_retained_size: int = \
+            buffer_size * self.RETAINED_BUFFERS \
+            if max_retained_size is None else max_retained_size
+        # Encoded records left after failed write, the first one can be
+        # partially written already
+        self._unwritten: bytes = b''
+        self._dropped_count: int = 0
+        self._lock = threading.RLock()
+
+        self._file: IO[bytes] | None = None
+        self._file_size: int = 0
+        self._file_opened_at: float = 0.0
+        self._rotation_at: float | None = None
+        self._is_closed: bool = False
+
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            name='staze-log-flusher',
+            daemon=True)
+        self._flusher.start()
+
+        _writers.add(self)
+        atexit.register(self.close)
+        _install_signal_handler()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def dropped_count(self) -> int:
+        """Amount of records dropped over `max_retained_size` after failed
+        writes.
+        """
+        with self._lock:
+            return self._dropped_count
+
+    def write(self, line: str) -> None:
+        """Put serialized record to the buffer.
+
+        Given line is expected to be terminated by newline.
+        """
+        with self._lock:
+            if self._is_closed:
+                raise LogError(f'Writer for {self._path} is closed')
+
+            self._buffer.append(line)
+            self._buffered_size += get_encoded_size(line)
+
+            if self._buffered_size >= self._buffer_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered records to file.
+
+        On write errors unwritten records are kept to be written on the next
+        flush, but not more than `max_retained_size` bytes of them.
+        """
+        with self._lock:
+            if not self._buffer and not self._unwritten:
+                return
+
+            data: bytes = \
+                self._unwritten + ''.join(self._buffer).encode('utf-8')
+            self._unwritten = b''
+            self._buffer.clear()
+            self._buffered_size = 0
+
+            offset: int | None = None
+            try:
+                if self._should_rotate(len(data)):
+                    self._rotate()
+                file: IO[bytes] = self._open()
+                offset = self._file_size
+                self._write_all(file, data)
+            except BaseException:
+                # Written part is skipped, so it isn't duplicated on retry
+                self._retain(
+                    data[0 if offset is None else self._file_size - offset:])
+                raise
+
+    def close(self) -> None:
+        """Flush remaining records and release the file handle."""
+        with self._lock:
+            if self._is_closed:
+                return
+            self.flush()
+            self._is_closed = True
+            self._stop_event.set()
+
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+        # Bounded, since on termination signal the flusher may wait for the
+        # lock held by the interrupted thread
+        self._flusher.join(timeout=1)
+        atexit.unregister(self.close)
+
+    def _write_all(self, file: IO[bytes], data: bytes) -> None:
+        # Unbuffered file can write data partially
+        view: memoryview = memoryview(data)
+        while view:
+            size: int = file.write(view) or 0
+            self._file_size += size
+            view = view[size:]
+
+    def _retain(self, data: bytes) -> None:
+        excess: int = len(data) - self._max_retained_size
+        if excess > 0:
+            # Records are dropped whole, from the oldest one
+            end: int = data.find(b'\n', excess - 1) + 1 or len(data)
+            self._dropped_count += data.count(b'\n', 0, end)
+            data = data[end:]
+        self._unwritten = data
+
+    def _flush_periodically(self) -> None:
+        while not self._stop_event.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # Flusher shouldn't die on transient disk errors, they will
+                # be raised on next write to the caller anyway
+                pass
+
+    def _open(self) -> IO[bytes]:
+        if self._file is None:
+            directory: str = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Written in binary, so sizes are counted in bytes, and
+            # unbuffered, since records are buffered by the writer
+            self._file = open(self._path, 'ab', buffering=0)
+            self._file_size = self._file.tell()
+            self._file_opened_at = time.time()
+            self._rotation_at = self._get_next_rotation_time(
+                self._file_opened_at)
+        return self._file
+
+    def _parse_rotation(self, rotation: str | None) -> None:
+        if rotation is None:
+            return
+
+        normalized: str = rotation.strip().lower()
+
+        if normalized in _INTERVAL_KEYWORDS:
+            self._rotation_interval = _INTERVAL_KEYWORDS[normalized]
+            return
+
+        match = re.fullmatch(r'(?:at\s+)?(\d{1,2}):(\d{2})', normalized)
+        if match:
+            hours, minutes = int(match.group(1)), int(match.group(2))
+            if hours > 23 or minutes > 59:
+                raise LogError(f'Wrong log rotation time: {rotation}')
+            self._rotation_time = hours * 3600 + minutes * 60
+            return
+
+        match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([a-z]+?)s?', normalized)
+        if not match:
+            raise LogError(f'Unrecognized log rotation: {rotation}')
+
+        value: float = float(match.group(1))
+        unit: str = match.group(2)
+
+        if unit in _SIZE_UNITS:
+            self._rotation_size = int(value * _SIZE_UNITS[unit])
+        elif unit in _DURATION_UNITS:
+            self._rotation_interval = value * _DURATION_UNITS[unit]
+        else:
+            raise LogError(f'Unrecognized log rotation unit: {unit}')
+
+    def _get_next_rotation_time(self, opened_at: float) -> float | None:
+        if self._rotation_time is None:
+            return None
+
+        opened: datetime = datetime.fromtimestamp(opened_at)
+        rotation: datetime = \
+            opened.replace(hour=0, minute=0, second=0, microsecond=0) \
+            + timedelta(seconds=self._rotation_time)
+        if rotation <= opened:
+            rotation += timedelta(days=1)
+        return rotation.timestamp()
+
+    def _should_rotate(self, incoming_size: int) -> bool:
+        if self._file is None:
+            self._open()
+
+        # Empty file is never rotated, otherwise too big record would produce
+        # endless sequence of empty files
+        if self._file_size == 0:
+            return False
+
+        if (
+                self._rotation_size is not None
+                and self._file_size + incoming_size > self._rotation_size):
+            return True
+        if (
+                self._rotation_interval is not None
+                and time.time() - self._file_opened_at
+                    >= self._rotation_interval):
+            return True
+        if (
+                self._rotation_at is not None
+                and time.time() >= self._rotation_at):
+            return True
+        return False
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        root, extension = os.path.splitext(self._path)
+        rotated_path: str = '{}.{}{}'.format(
+            root,
+            datetime.now().strftime('%Y-%m-%d_%H-%M-%S_%f'),
+            extension)
+        os.rename(self._path, rotated_path)
+
+        # Compression of large files is slow, so it's done in background
+        if self._archiver:
+            self._archiver.submit(rotated_path)
+
+
+def get_encoded_size(line: str) -> int:
+    """Return amount of bytes of the line encoded to utf-8."""
+    # Most of records are ascii, which is checked much faster than encoded
+    return len(line) if line.isascii() else len(line.encode('utf-8'))
+
+
+def _install_signal_handler() -> None:
+    global _is_signal_handler_installed
+
+    # Signal handlers can be set only from the main thread
+    if (
+            _is_signal_handler_installed
+            or threading.current_thread() is not threading.main_thread()):
+        return
+
+    previous_handler: Any = signal.getsignal(signal.SIGTERM)
+
+    def handle_sigterm(signum: int, frame: Any) -> None:
+        for writer in list(_writers):
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+        if callable(previous_handler):
+            previous_handler(signum, frame)
+        elif previous_handler != signal.SIG_IGN:
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    _is_signal_handler_installed = True
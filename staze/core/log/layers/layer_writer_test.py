@@ -0,0 +1,138 @@
+import os
+import zipfile
+
+import pytest
+
+from staze.core.log.layers.layer_writer import LayerWriter
+from staze.core.log.log_archiver import LogArchiver
+
+
+class TestLayerWriter:
+    def test_buffer(self, tmp_path):
+        path: str = os.path.join(tmp_path, 'logs/app.log')
+        writer = LayerWriter(path, buffer_size=1024, flush_interval=60)
+
+        writer.write('{"message": "hello"}\n')
+        assert not os.path.isfile(path)
+
+        writer.flush()
+        with open(path) as file:
+            assert file.read() == '{"message": "hello"}\n'
+
+        writer.close()
+
+    def test_flush_on_buffer_overflow(self, tmp_path):
+        path: str = os.path.join(tmp_path, 'app.log')
+        writer = LayerWriter(path, buffer_size=10, flush_interval=60)
+
+        writer.write('0123456789\n')
+        with open(path) as file:
+            assert file.read() == '0123456789\n'
+
+        writer.close()
+
+    def test_rotation(self, tmp_path):
+        path: str = os.path.join(tmp_path, 'app.log')
+        archiver = LogArchiver(path, compression='zip')
+        writer = LayerWriter(
+            path,
+            rotation='20 B',
+            archiver=archiver,
+            buffer_size=0,
+            flush_interval=60)
+
+        writer.write('0123456789\n')
+        writer.write('0123456789\n')
+        writer.close()
+        archiver.stop()
+
+        archives: list[str] = [
+            x for x in os.listdir(tmp_path) if x.endswith('.zip')]
+        assert len(archives) == 1
+
+        with zipfile.ZipFile(os.path.join(tmp_path, archives[0])) as archive:
+            assert archive.read(archive.namelist()[0]) == b'0123456789\n'
+        with open(path) as file:
+            assert file.read() == '0123456789\n'
+
+    def test_rotation_policies(self, tmp_path):
+        path: str = os.path.join(tmp_path, 'app.log')
+
+        writer = LayerWriter(path, rotation='12 hours')
+        assert writer._rotation_interval == 12 * 3600
+        writer.close()
+
+        writer = LayerWriter(path, rotation='daily')
+        assert writer._rotation_interval == 86400
+        writer.close()
+
+        writer = LayerWriter(path, rotation='at 13:30')
+        assert writer._rotation_time == 13 * 3600 + 30 * 60
+        writer.close()
+
+    def test_sizes_in_bytes(self, tmp_path):
+        path: str = os.path.join(tmp_path, 'app.log')
+        writer = LayerWriter(path, buffer_size=10, flush_interval=60)
+
+        # 7 characters, but 13 bytes
+        writer.write('привет\n')
+        assert os.path.getsize(path) == 13
+        writer.close()
+
+    def test_keep_buffer_on_error(self, tmp_path, monkeypatch):
+        path: str = os.path.join(tmp_path, 'app.log')
+        writer = LayerWriter(path, buffer_size=1024, flush_interval=60)
+        writer.write('first\n')
+
+        def fail(*args):
+            raise OSError('No space left on device')
+
+        monkeypatch.setattr(writer, '_open', fail)
+        with pytest.raises(OSError):
+            writer.flush()
+        monkeypatch.undo()
+
+        writer.write('second\n')
+        writer.close()
+        with open(path) as file:
+            assert file.read() == 'first\nsecond\n'
+
+    def test_drop_oldest_on_error(self, tmp_path, monkeypatch):
+        path: str = os.path.join(tmp_path, 'app.log')
+        writer = LayerWriter(
+            path, buffer_size=4, flush_interval=60, max_retained_size=8)
+
+        def fail(*args):
+            raise OSError('No space left on device')
+
+        monkeypatch.setattr(writer, '_open', fail)
+        for i in range(5):
+            with pytest.raises(OSError):
+                writer.write(f'{i}{i}{i}\n')
+        monkeypatch.undo()
+
+        assert writer.dropped_count == 3
+        writer.close()
+        with open(path) as file:
+            assert file.read() == '333\n444\n'
+
+    def test_partial_write(self, tmp_path, monkeypatch):
+        path: str = os.path.join(tmp_path, 'app.log')
+        writer = LayerWriter(path, buffer_size=1024, flush_interval=60)
+        writer.write('first\n')
+        writer.write('second\n')
+        write_all = writer._write_all
+
+        def write_partially(file, data):
+            write_all(file, data[:8])
+            raise OSError('Input/output error')
+
+        monkeypatch.setattr(writer, '_write_all', write_partially)
+        with pytest.raises(OSError):
+            writer.flush()
+        monkeypatch.undo()
+
+        writer.close()
+        with open(path) as file:
+            assert file.read() == 'first\nsecond\n'
+        assert writer.dropped_count == 0
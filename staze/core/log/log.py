@@ -3,12 +3,20 @@ from pydoc import classname
 from typing import TYPE_CHECKING, Any, Callable, Literal
 
 from loguru import logger as loguru
+from loguru._better_exceptions import ExceptionFormatter
+from loguru._handler import Handler, prepare_stripped_format
 from loguru._logger import Logger
 from warepy import Singleton
 from staze.core.app.app_mode_enum import AppModeEnumUnion
 from staze.core.log.layers.ecs import Ecs
 from staze.core.log.layers.layer import Layer
+from staze.core.log.layers.layer_writer import LayerWriter
+from staze.core.log.log_archiver import LogArchiver
 from staze.core.log.log_error import LogError
+from staze.core.log.log_queue import LogQueue
+from staze.core.log.log_sampler import LogSampler
+from staze.core.log.log_queue_overflow_policy_enum import (
+    LogQueueOverflowPolicyEnum)
 
 if TYPE_CHECKING:
     from staze.core.service.service import Service
@@ -45,6 +53,13 @@ class log(Singleton):
 
     _mode_enum: AppModeEnumUnion
     _service_by_hash: dict[int, 'Service'] = {}
+    _layers: list[Layer] = []
+    _queues: list[LogQueue] = []
+    _writers: list[LayerWriter] = []
+    _archivers: list[LogArchiver] = []
+    # Layers, queues, writers and archivers created by setup by ids of
+    # handlers, to be released on removal of the handler
+    _resources_by_handler_id: dict[int, list[Any]] = {}
 
     @classmethod
     def setup(
@@ -57,7 +72,18 @@ class log(Singleton):
             serialize: bool,
             layer: str | None = None,
             filter: Callable | str | dict | None = None,
-            delete_old: bool = False
+            delete_old: bool = False,
+            buffer_size: int = 64 * 1024,
+            flush_interval: float = 1.0,
+            is_async: bool = False,
+            queue_size: int = 10000,
+            overflow_policy: str = 'block',
+            json_encoder: str = 'json',
+            sampling: dict | None = None,
+            request_body_max_bytes: int = 8192,
+            retention: int | None = None,
+            storage: str = 'file',
+            segment_block_size: int = 1000
         ) -> int:
         """Init log model instance depending on given arguments. 
 
@@ -74,7 +100,8 @@ class log(Singleton):
             format:
                 Format as loguru specifies
             rotation:
-                Rotation as loguru specifies
+                Rotation as loguru specifies. Rotated files are compressed in
+                background thread
             level:
                 Level as loguru specifies
             serialize:
@@ -88,10 +115,55 @@ class log(Singleton):
                 whether it should be sent to the sink or not
             delete_old (optional):
                 Flag whether is it required to remove old log file, specified under
+            buffer_size (optional):
+                Amount of bytes layer accumulates in memory before writing to
+                file. Not used for default behaviour. Defaults to 64 KiB
+            flush_interval (optional):
+                Maximum amount of seconds the record can stay in layer's
+                buffer. Not used for default behaviour. Defaults to 1 second
+            is_async (optional):
+                Whether records should be handed to a bounded queue and
+                formatted and written by a dedicated worker thread instead of
+                the emitting one. Defaults to False
+            queue_size (optional):
+                Maximum amount of records waiting in the queue in async mode.
+                Defaults to 10000
+            overflow_policy (optional):
+                What to do on full queue in async mode: `block` the emitting
+                thread, `drop_oldest` record or `drop_debug_first`. Defaults
+                to `block`
+            json_encoder (optional):
+                Encoder used by layers to serialize records: `json` or faster
+                `orjson`, which should be installed separately. Defaults to
+                `json`
+            sampling (optional):
+                Sampling config with keys: `rules` - list of mappings with
+                LogSamplingRule arguments, `keep_errors` and
+                `slow_request_threshold` as LogSampler specifies. Rate kept
+                records are sampled with is put to their `sample_rate` extra
+                by layers and async default sink, loguru's own file sink of
+                sync default behaviour gets records as is. Defaults to None,
+                i.e. all records are kept
+            request_body_max_bytes (optional):
+                Maximum amount of bytes of request body logged by layers.
+                Bodies with larger declared length are not logged. Defaults to
+                8192
+            retention (optional):
+                Amount of the newest rotated files to keep, older ones are
+                removed in background thread. Defaults to None, i.e. all
+                rotated files are kept
+            storage (optional):
+                How layers store records: `file` - as plain NDJSON file, or
+                `segments` - as compressed blocks with a sidecar index, which
+                can be queried by `staze logs query`. Defaults to `file`
+            segment_block_size (optional):
+                Amount of records in one block of segments storage. Defaults
+                to 1000
 
         Returns:
             int:
                 Id of created log handler. Useful to pass to log.remove()
+                to stop threads and close files of the handler
         """
         # FIXME: Replace this logic to loguru.add.retention func
         if (
@@ -102,31 +174,104 @@ class log(Singleton):
             log.warning('Delete old log file')
             os.remove(path)
 
+        sampler: LogSampler | None = None
+        if sampling is not None:
+            sampler = LogSampler.from_config(sampling, filter)
+            filter = sampler
+
         sink: Callable | str
         layer_names: list[str] = [
             X.__name__.lower() for X in cls.Layers
         ]
 
         if layer is None or layer == 'default':
+            if storage != 'file':
+                raise LogError(
+                    f'Storage {storage} is supported only by layers')
+
+            archiver = LogArchiver(
+                path=path, compression='zip', retention=retention)
+            cls._archivers.append(archiver)
+            resources: list[Any] = [archiver]
+
+            if is_async:
+                # Loguru's own file sink cannot be driven by the queue, so
+                # records are formatted by the worker as loguru would do and
+                # written by layer writer
+                writer = LayerWriter(
+                    path=path,
+                    rotation=rotation,
+                    archiver=archiver,
+                    buffer_size=buffer_size,
+                    flush_interval=flush_interval)
+                cls._writers.append(writer)
+                format_record: Callable[[dict], str] = \
+                    cls._make_record_formatter(format, serialize)
+                queue: LogQueue = cls._create_queue(
+                    lambda message, context: writer.write(
+                        format_record(message.record)),
+                    None,
+                    queue_size,
+                    overflow_policy)
+                # Released in order the records pass through them
+                resources = [queue, writer, archiver]
+                return cls._add_handler(
+                    resources,
+                    queue.write if sampler is None
+                        else sampler.wrap_sink(queue.write),
+                    # Dynamic empty format makes loguru skip formatting in
+                    # the emitting thread, the queue needs only the record
+                    format=lambda record: '',
+                    level=level,
+                    filter=filter
+                )
+
             sink = path
-            return cls.logger.add(
+            return cls._add_handler(
+                resources,
                 sink,
                 format=format, 
                 level=level,
-                compression="zip", 
+                # Loguru calls compression in the thread triggered rotation,
+                # so it's only scheduled there to be done by the archiver
+                compression=archiver.submit,
                 rotation=rotation, 
                 serialize=serialize,
                 filter=filter
             )
         elif layer in layer_names:
-            sink = cls._find_layer_by_name(layer)(
+            layer_instance: Layer = cls._find_layer_by_name(layer)(
                     path=path,
                     mode_enum=cls._mode_enum,
                     compression='zip',
                     rotation=rotation,
-                    service_by_hash=cls._service_by_hash
-                ).format
-            return cls.logger.add(
+                    retention=retention,
+                    service_by_hash=cls._service_by_hash,
+                    buffer_size=buffer_size,
+                    flush_interval=flush_interval,
+                    json_encoder=json_encoder,
+                    request_body_max_bytes=request_body_max_bytes,
+                    storage=storage,
+                    segment_block_size=segment_block_size
+                )
+            cls._layers.append(layer_instance)
+            resources = [layer_instance]
+
+            if is_async:
+                layer_queue: LogQueue = cls._create_queue(
+                    layer_instance.format,
+                    layer_instance.capture_context,
+                    queue_size,
+                    overflow_policy)
+                resources.insert(0, layer_queue)
+                sink = layer_queue.write
+            else:
+                sink = layer_instance.format
+            if sampler is not None:
+                sink = sampler.wrap_sink(sink)
+
+            return cls._add_handler(
+                resources,
                 # Warning here because of some error on overloaded types
                 sink,  # type: ignore
                 format=format, 
@@ -137,6 +282,133 @@ class log(Singleton):
         else:
             raise LogError(f'Unrecognized layer: {layer}')
 
+    @classmethod
+    def remove(cls, handler_id: int | None = None) -> None:
+        """Remove log handler and release resources created for it by setup:
+        remaining records are written out, worker threads are stopped and
+        files are closed.
+
+        Args:
+            handler_id (optional):
+                Id of handler returned by setup or logger.add. Defaults to
+                None, i.e. all handlers are removed
+        """
+        cls.logger.remove(handler_id)
+
+        handler_ids: list[int] = \
+            list(cls._resources_by_handler_id) if handler_id is None \
+            else [handler_id]
+        for id in handler_ids:
+            for resource in cls._resources_by_handler_id.pop(id, []):
+                cls._release(resource)
+
+    @classmethod
+    def _add_handler(cls, resources: list[Any], *args, **kwargs) -> int:
+        handler_id: int = cls.logger.add(*args, **kwargs)
+        cls._resources_by_handler_id[handler_id] = resources
+        return handler_id
+
+    @classmethod
+    def _release(cls, resource: Any) -> None:
+        for resources in (
+                cls._queues, cls._layers, cls._writers, cls._archivers):
+            if resource in resources:
+                resources.remove(resource)
+
+        if isinstance(resource, (LogQueue, LogArchiver)):
+            resource.stop()
+        else:
+            resource.close()
+
+    @classmethod
+    def get_queue_stats(cls) -> dict[str, int]:
+        """Return counters summed over all async mode queues.
+
+        Counters are: `queued` - records waiting in queues right now,
+        `enqueued`, `dropped`, `processed` and `failed` - amount of records
+        since setup.
+        """
+        stats: dict[str, int] = {
+            'queued': 0,
+            'enqueued': 0,
+            'dropped': 0,
+            'processed': 0,
+            'failed': 0
+        }
+        for queue in cls._queues:
+            for k, v in queue.stats.items():
+                stats[k] += v
+        return stats
+
+    @staticmethod
+    def _make_record_formatter(
+            format: str, serialize: bool) -> Callable[[dict], str]:
+        """Return function formatting loguru records as loguru's file sink
+        would do with given format.
+
+        Loguru has no public API to format records apart from the sink, so
+        it's internals are used, which is why loguru is pinned to 0.7.
+        """
+        stripped_format: str = prepare_stripped_format(
+            format + '\n{exception}')
+        # Same as loguru sets up for file sinks by default
+        exception_formatter = ExceptionFormatter(
+            colorize=False,
+            encoding='utf8',
+            diagnose=True,
+            backtrace=True,
+            hidden_frames_filename=loguru.catch.__code__.co_filename,
+            prefix='')
+
+        def format_record(record: dict) -> str:
+            formatter_record: dict = record.copy()
+            exception: Any = record['exception']
+            formatter_record['exception'] = \
+                '' if not exception \
+                else ''.join(exception_formatter.format_exception(
+                    *exception, from_decorator=False))
+
+            text: str = stripped_format.format_map(formatter_record)
+            if serialize:
+                text = Handler._serialize_record(text, record)
+            return text
+
+        return format_record
+
+    @classmethod
+    def _create_queue(
+            cls,
+            handler: Callable,
+            capture_context: Callable | None,
+            size: int,
+            overflow_policy: str) -> LogQueue:
+        try:
+            overflow_policy_enum = LogQueueOverflowPolicyEnum(overflow_policy)
+        except ValueError:
+            raise LogError(f'Unrecognized overflow policy: {overflow_policy}')
+
+        queue = LogQueue(
+            handler=handler,
+            capture_context=capture_context,
+            size=size,
+            overflow_policy=overflow_policy_enum)
+        cls._queues.append(queue)
+        return queue
+
+    @classmethod
+    def flush(cls) -> None:
+        """Write out all records waiting in async queues and buffered by
+        layers.
+        """
+        for queue in cls._queues:
+            queue.drain()
+        for layer in cls._layers:
+            layer.flush()
+        for writer in cls._writers:
+            writer.flush()
+        for archiver in cls._archivers:
+            archiver.drain()
+
     @classmethod
     def _find_layer_by_name(cls, name: str) -> type[Layer]:
         for X in cls.Layers:
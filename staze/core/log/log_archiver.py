@@ -0,0 +1,157 @@
+import atexit
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import traceback
+import zipfile
+from typing import Any
+
+from staze.core.log.log_error import LogError
+
+
+class LogArchiver:
+    """Compresses rotated log files and removes old ones in a background
+    thread, so the thread triggered rotation isn't stalled.
+
+    Rotated files are expected to be named as loguru does: the stem of the
+    log file, a dot, a rotation timestamp and the same extension, e.g.
+    `app.2022-01-01_00-00-00_000000.log` for `app.log`, optionally with a
+    counter before the extension and a compression suffix. Other files in
+    the directory, e.g. `app.errors.log`, are never removed.
+
+    Args:
+        path:
+            Path to the active log file rotated files are derived from.
+        compression (optional):
+            Format to compress rotated files to: `zip`, `gz`, `bz2` or `xz`.
+            Defaults to None, i.e. rotated files are left as is
+        retention (optional):
+            Amount of the newest rotated files to be kept, older ones are
+            removed. Defaults to None, i.e. all files are kept
+    """
+    COMPRESSIONS: list[str] = ['zip', 'gz', 'bz2', 'xz']
+
+    def __init__(
+                self,
+                path: str,
+                compression: str | None = None,
+                retention: int | None = None
+            ) -> None:
+        if compression is not None and compression not in self.COMPRESSIONS:
+            raise LogError(f'Unrecognized log compression: {compression}')
+        if retention is not None and retention < 0:
+            raise LogError(
+                f'Log retention should be non-negative, got {retention}')
+
+        self._path = path
+        self._compression = compression
+        self._retention = retention
+
+        self._jobs: queue.Queue[str | None] = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, path: str) -> None:
+        """Schedule archiving of rotated file.
+
+        Suits to be passed as loguru's `compression` callable.
+        """
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._work, name='staze-log-archiver', daemon=True)
+                self._worker.start()
+                atexit.register(self.stop)
+        self._jobs.put(path)
+
+    def drain(self) -> None:
+        """Wait until all scheduled files are archived."""
+        self._jobs.join()
+
+    def stop(self) -> None:
+        """Archive remaining files and stop the worker."""
+        with self._lock:
+            worker: threading.Thread | None = self._worker
+            self._worker = None
+        if worker is None:
+            return
+
+        self._jobs.put(None)
+        worker.join()
+        atexit.unregister(self.stop)
+
+    def archive(self, path: str) -> None:
+        """Compress rotated file and apply retention in place."""
+        if self._compression and os.path.isfile(path):
+            compress_file(path, self._compression)
+        if self._retention is not None:
+            self._apply_retention()
+
+    def _work(self) -> None:
+        while True:
+            path: str | None = self._jobs.get()
+            try:
+                if path is None:
+                    return
+                self.archive(path)
+            except Exception:
+                sys.stderr.write('--- Log archiving error ---\n')
+                traceback.print_exc(file=sys.stderr)
+            finally:
+                self._jobs.task_done()
+
+    def _apply_retention(self) -> None:
+        directory: str = os.path.dirname(self._path) or '.'
+        root, extension = os.path.splitext(os.path.basename(self._path))
+        rotated_re: re.Pattern = re.compile(
+            re.escape(root)
+            + r'\.\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}_\d{6}(?:\.\d+)?'
+            + re.escape(extension)
+            + r'(?:\.(?:' + '|'.join(self.COMPRESSIONS) + r'))?')
+
+        rotated_paths: list[str] = [
+            os.path.join(directory, x) for x in os.listdir(directory)
+            if rotated_re.fullmatch(x)
+        ]
+        rotated_paths.sort(key=os.path.getmtime, reverse=True)
+
+        for path in rotated_paths[self._retention:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def compress_file(path: str, compression: str) -> str:
+    """Compress file to the archive next to it, remove source file and return
+    path to created archive.
+    """
+    archive_path: str = f'{path}.{compression}'
+
+    match compression:
+        case 'zip':
+            with zipfile.ZipFile(
+                    archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.write(path, os.path.basename(path))
+        case 'gz':
+            _copy_to_stream(path, gzip.open(archive_path, 'wb'))
+        case 'bz2':
+            _copy_to_stream(path, bz2.open(archive_path, 'wb'))
+        case 'xz':
+            _copy_to_stream(path, lzma.open(archive_path, 'wb'))
+        case _:
+            raise LogError(f'Unrecognized log compression: {compression}')
+
+    os.remove(path)
+    return archive_path
+
+
+def _copy_to_stream(path: str, stream: Any) -> None:
+    with open(path, 'rb') as source, stream:
+        shutil.copyfileobj(source, stream)
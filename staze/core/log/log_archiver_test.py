@@ -0,0 +1,66 @@
+import gzip
+import os
+import time
+
+from staze.core.log.log_archiver import LogArchiver
+
+
+def _create_rotated(directory, name: str, content: str) -> str:
+    path: str = os.path.join(directory, name)
+    with open(path, 'w') as file:
+        file.write(content)
+    return path
+
+
+class TestLogArchiver:
+    def test_compression(self, tmp_path):
+        archiver = LogArchiver(
+            os.path.join(tmp_path, 'app.log'), compression='gz')
+        rotated_path: str = _create_rotated(
+            tmp_path, 'app.2022-01-01_00-00-00_000000.log', 'hello')
+
+        archiver.submit(rotated_path)
+        archiver.drain()
+        archiver.stop()
+
+        assert not os.path.exists(rotated_path)
+        with gzip.open(rotated_path + '.gz', 'rt') as file:
+            assert file.read() == 'hello'
+
+    def test_retention(self, tmp_path):
+        archiver = LogArchiver(os.path.join(tmp_path, 'app.log'), retention=2)
+        _create_rotated(tmp_path, 'app.log', 'active')
+        _create_rotated(tmp_path, 'other.log', 'other')
+
+        rotated_paths: list[str] = []
+        for i in range(4):
+            rotated_paths.append(_create_rotated(
+                tmp_path, f'app.2022-01-0{i + 1}_00-00-00_000000.log', 'x'))
+            # Modification times should differ to be ordered
+            os.utime(rotated_paths[-1], (time.time() + i, time.time() + i))
+
+        archiver.submit(rotated_paths[-1])
+        archiver.stop()
+
+        assert sorted(os.listdir(tmp_path)) == sorted([
+            'app.log',
+            'other.log',
+            os.path.basename(rotated_paths[2]),
+            os.path.basename(rotated_paths[3])
+        ])
+
+    def test_retention_keeps_siblings(self, tmp_path):
+        archiver = LogArchiver(os.path.join(tmp_path, 'app.log'), retention=0)
+        sibling_names: list[str] = [
+            'app.log', 'app.errors.log', 'app.audit.log', 'app.errors.log.gz']
+        for name in sibling_names:
+            _create_rotated(tmp_path, name, 'x')
+        rotated_path: str = _create_rotated(
+            tmp_path, 'app.2022-01-01_00-00-00_000000.log', 'x')
+        _create_rotated(tmp_path, 'app.2022-01-01_00-00-00_000000.2.log', 'x')
+        _create_rotated(
+            tmp_path, 'app.2022-01-02_00-00-00_000000.log.zip', 'x')
+
+        archiver.archive(rotated_path)
+
+        assert sorted(os.listdir(tmp_path)) == sorted(sibling_names)
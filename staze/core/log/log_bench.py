@@ -0,0 +1,299 @@
+"""Throughput benchmark of the logging stack.
+
+Measures records per second and per-record latency of `log.setup` sinks in
+typical scenarios:
+- `default` - default loguru file sink
+- `ecs` - ECS layer
+- `service` - ECS layer with records emitted by `Service.logger`
+- `request` - ECS layer with records emitted inside Flask request context
+
+Run as:
+```sh
+python -m staze.core.log.log_bench --save baseline.json
+python -m staze.core.log.log_bench --baseline baseline.json
+```
+With baseline given, exits with non-zero code if any scenario is slower than
+baseline more than by tolerance. The same check is made by `log_bench_test.py`
+if `STAZE_LOG_BENCH_BASELINE` environ is set to baseline path.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, NamedTuple
+
+from flask import Flask
+from staze.core.app.app_mode_enum import RunAppModeEnum
+from staze.core.log.log import log
+from staze.core.service.service import Service
+
+
+# Amount of records emitted within one request in `request` scenario
+RECORDS_PER_REQUEST: int = 10
+
+
+class LogBenchResult(NamedTuple):
+    name: str
+    records_per_second: float
+    p50_latency_us: float
+    p99_latency_us: float
+
+
+class BenchService(Service):
+    """Service emitting records in `service` scenario."""
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        self.users: list[dict] = [
+            {'id': i, 'name': f'user{i}'} for i in range(10)
+        ]
+
+
+@contextmanager
+def isolate_handlers() -> Iterator[None]:
+    """Detach all loguru handlers for the time of benchmark.
+
+    Records emitted by benchmark are not passed to handlers added before, and
+    handlers added within are dropped on exit. They should be removed by
+    the caller to be stopped properly.
+    """
+    core = log.logger._core  # type: ignore
+    with core.lock:
+        handlers = core.handlers
+        min_level = core.min_level
+        core.handlers = {}
+        core.min_level = float('inf')
+
+    try:
+        yield
+    finally:
+        with core.lock:
+            core.handlers = handlers
+            core.min_level = min_level
+
+
+@contextmanager
+def setup_log(path: str, layer: str | None) -> Iterator[None]:
+    """Set up the log for the time of benchmark and tear it down after."""
+    mode_enum = getattr(log, '_mode_enum', None)
+    log._mode_enum = RunAppModeEnum.PROD
+
+    handler_id: int = log.setup(
+        path=path,
+        format=log.DEFAULT_LOG_PARAMS['format'],
+        rotation='100 MB',
+        level='DEBUG',
+        serialize=False,
+        layer=layer)
+
+    try:
+        yield
+    finally:
+        log.remove(handler_id)
+
+        if mode_enum is None:
+            del log._mode_enum
+        else:
+            log._mode_enum = mode_enum
+
+
+def measure(
+        name: str,
+        emit: Callable[[int], None],
+        count: int) -> LogBenchResult:
+    """Call `emit` with record index given amount of times and return
+    throughput and latencies.
+
+    Final flush of buffered records is counted to throughput, but not to
+    latencies.
+    """
+    latencies: list[int] = []
+    perf_counter_ns = time.perf_counter_ns
+
+    started_at: int = perf_counter_ns()
+    for i in range(count):
+        emitted_at: int = perf_counter_ns()
+        emit(i)
+        latencies.append(perf_counter_ns() - emitted_at)
+    log.flush()
+    elapsed: int = perf_counter_ns() - started_at
+
+    latencies.sort()
+    return LogBenchResult(
+        name=name,
+        records_per_second=count / (elapsed / 1_000_000_000),
+        p50_latency_us=_get_percentile(latencies, 0.5) / 1000,
+        p99_latency_us=_get_percentile(latencies, 0.99) / 1000)
+
+
+def bench_default(path: str, count: int) -> LogBenchResult:
+    with setup_log(path, None):
+        return measure(
+            'default', lambda i: log.info(f'Record {i}'), count)
+
+
+def bench_ecs(path: str, count: int) -> LogBenchResult:
+    with setup_log(path, 'ecs'):
+        return measure('ecs', lambda i: log.info(f'Record {i}'), count)
+
+
+def bench_service(path: str, count: int) -> LogBenchResult:
+    service = BenchService({})
+    service_hash: int = hash(service)
+    log._service_by_hash[service_hash] = service
+
+    try:
+        with setup_log(path, 'ecs'):
+            return measure(
+                'service',
+                lambda i: service.logger.info(f'Record {i}'),
+                count)
+    finally:
+        del log._service_by_hash[service_hash]
+        BenchService.__class__.instances.pop(BenchService, None)
+
+
+def bench_request(path: str, count: int) -> LogBenchResult:
+    app = Flask(__name__)
+    body: dict = {'user': {'id': 1, 'name': 'user1'}}
+
+    with setup_log(path, 'ecs'):
+        # Request context is pushed and popped outside of emitting the
+        # record, so only logging is counted to latency
+        request_context = None
+
+        def emit(i: int) -> None:
+            nonlocal request_context
+            if i % RECORDS_PER_REQUEST == 0:
+                if request_context is not None:
+                    request_context.pop()
+                request_context = app.test_request_context(
+                    '/users/1', method='POST', json=body)
+                request_context.push()
+            log.info(f'Record {i}')
+
+        try:
+            return measure('request', emit, count)
+        finally:
+            if request_context is not None:
+                request_context.pop()
+
+
+BENCHES: list[Callable[[str, int], LogBenchResult]] = [
+    bench_default,
+    bench_ecs,
+    bench_service,
+    bench_request
+]
+
+
+def run(count: int = 20000) -> list[LogBenchResult]:
+    """Run all benchmarks emitting given amount of records each."""
+    results: list[LogBenchResult] = []
+
+    with tempfile.TemporaryDirectory() as directory, isolate_handlers():
+        for bench in BENCHES:
+            path: str = os.path.join(directory, f'{bench.__name__}.log')
+            results.append(bench(path, count))
+
+    return results
+
+
+def compare(
+        results: list[LogBenchResult],
+        baseline: dict[str, dict],
+        tolerance: float = 0.2,
+        latency_tolerance: float = 0.5) -> list[str]:
+    """Return descriptions of regressions against baseline.
+
+    Scenario is regressed if its throughput is lower than baseline's more than
+    by `tolerance` fraction, or its p99 latency is higher more than by
+    `latency_tolerance` fraction. Tail latency is much noisier than
+    throughput, so it is allowed to deviate more.
+    """
+    regressions: list[str] = []
+
+    for result in results:
+        base: dict | None = baseline.get(result.name, None)
+        if base is None:
+            continue
+
+        min_records_per_second: float = \
+            base['records_per_second'] * (1 - tolerance)
+        if result.records_per_second < min_records_per_second:
+            regressions.append(
+                f'{result.name}: {result.records_per_second:.0f} records/sec'
+                f' is lower than baseline {base["records_per_second"]:.0f}')
+
+        max_p99_latency_us: float = base['p99_latency_us'] * (1 + latency_tolerance)
+        if result.p99_latency_us > max_p99_latency_us:
+            regressions.append(
+                f'{result.name}: p99 latency {result.p99_latency_us:.1f} us'
+                f' is higher than baseline {base["p99_latency_us"]:.1f} us')
+
+    return regressions
+
+
+def load_baseline(path: str) -> dict[str, dict]:
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def save_baseline(results: list[LogBenchResult], path: str) -> None:
+    with open(path, 'w') as file:
+        json.dump({x.name: x._asdict() for x in results}, file, indent=2)
+
+
+def _get_percentile(sorted_values: list[int], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index: int = min(
+        len(sorted_values) - 1, int(len(sorted_values) * percentile))
+    return sorted_values[index]
+
+
+def main(args: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Benchmark throughput of the logging stack')
+    parser.add_argument(
+        '--count', type=int, default=20000,
+        help='amount of records emitted by every scenario')
+    parser.add_argument(
+        '--baseline', help='path to baseline to compare results against')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='allowed fraction of throughput regression against baseline')
+    parser.add_argument(
+        '--latency-tolerance', type=float, default=0.5,
+        help='allowed fraction of p99 latency regression against baseline')
+    parser.add_argument('--save', help='path to save results as baseline')
+    parsed = parser.parse_args(args)
+
+    results: list[LogBenchResult] = run(parsed.count)
+    for result in results:
+        print(
+            f'{result.name:>10}: {result.records_per_second:>10.0f}'
+            f' records/sec, p50 {result.p50_latency_us:>8.1f} us,'
+            f' p99 {result.p99_latency_us:>8.1f} us')
+
+    if parsed.save:
+        save_baseline(results, parsed.save)
+
+    if parsed.baseline:
+        regressions: list[str] = compare(
+            results,
+            load_baseline(parsed.baseline),
+            parsed.tolerance,
+            parsed.latency_tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+from staze.core.log import log_bench
+from staze.core.log.log_bench import LogBenchResult
+
+
+class TestLogBench:
+    def test_run(self):
+        results: list[LogBenchResult] = log_bench.run(count=200)
+
+        assert [x.name for x in results] \
+            == ['default', 'ecs', 'service', 'request']
+        for result in results:
+            assert result.records_per_second > 0
+            assert result.p99_latency_us >= result.p50_latency_us
+
+    def test_compare(self):
+        baseline: dict[str, dict] = {
+            'ecs': {'records_per_second': 1000.0, 'p99_latency_us': 100.0}
+        }
+
+        assert log_bench.compare(
+            [LogBenchResult('ecs', 900.0, 10.0, 120.0)], baseline) == []
+
+        regressions: list[str] = log_bench.compare(
+            [LogBenchResult('ecs', 700.0, 10.0, 200.0)], baseline)
+        assert len(regressions) == 2
+
+    @pytest.mark.skipif(
+        not os.environ.get('STAZE_LOG_BENCH_BASELINE'),
+        reason='No benchmark baseline given')
+    def test_baseline(self):
+        results: list[LogBenchResult] = log_bench.run()
+        regressions: list[str] = log_bench.compare(
+            results,
+            log_bench.load_baseline(os.environ['STAZE_LOG_BENCH_BASELINE']))
+        assert not regressions, regressions
@@ -0,0 +1,214 @@
+import atexit
+import itertools
+import sys
+import threading
+import traceback
+from collections import deque
+from typing import Callable
+
+from loguru._handler import Message
+from staze.core.log.log_error import LogError
+from staze.core.log.log_queue_overflow_policy_enum import (
+    LogQueueOverflowPolicyEnum)
+
+
+# Level number of INFO, records below are treated as debug ones
+_INFO_LEVEL_NO: int = 20
+
+
+class LogQueue:
+    """Bounded queue passing log records to a dedicated worker thread.
+
+    Added to loguru as a stream sink: `write()` is called in the emitting
+    thread and only captures context and enqueues the record, while the
+    worker calls the handler, which formats and writes it.
+
+    Args:
+        handler:
+            Callable accepting loguru message and captured context.
+        capture_context (optional):
+            Callable returning context to be captured in the emitting thread,
+            e.g. request data. Defaults to None, i.e. None context is passed
+            to the handler
+        size (optional):
+            Maximum amount of records waiting in the queue. Defaults to 10000
+        overflow_policy (optional):
+            What to do with incoming record if the queue is full. Defaults to
+            block the emitting thread until the worker frees the place
+    """
+    def __init__(
+                self,
+                handler: Callable[[Message, dict | None], None],
+                capture_context: Callable[[], dict] | None = None,
+                size: int = 10000,
+                overflow_policy: LogQueueOverflowPolicyEnum = \
+                    LogQueueOverflowPolicyEnum.BLOCK
+            ) -> None:
+        if size < 1:
+            raise LogError(f'Log queue size should be positive, got {size}')
+
+        self._handler = handler
+        self._capture_context = capture_context
+        self._size = size
+        self._overflow_policy = overflow_policy
+
+        # Debug records are kept apart to be dropped first on according
+        # policy. Every record is stored with sequence number to keep the
+        # emitting order between both queues
+        self._debug_records: deque[tuple[int, Message, dict | None]] = deque()
+        self._records: deque[tuple[int, Message, dict | None]] = deque()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._is_stopped: bool = False
+        # Whether the worker is handling popped record right now
+        self._is_busy: bool = False
+
+        self._enqueued_count: int = 0
+        self._dropped_count: int = 0
+        self._processed_count: int = 0
+        self._failed_count: int = 0
+
+        self._worker = threading.Thread(
+            target=self._work, name='staze-log-worker', daemon=True)
+        self._worker.start()
+
+        atexit.register(self.stop)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Counters of the queue for monitoring."""
+        with self._condition:
+            return {
+                'queued': self._queued_count,
+                'enqueued': self._enqueued_count,
+                'dropped': self._dropped_count,
+                'processed': self._processed_count,
+                'failed': self._failed_count
+            }
+
+    @property
+    def _queued_count(self) -> int:
+        return len(self._debug_records) + len(self._records)
+
+    def write(self, message: Message) -> None:
+        context: dict | None = None
+        if self._capture_context:
+            context = self._capture_context()
+
+        is_debug: bool = message.record['level'].no < _INFO_LEVEL_NO
+
+        with self._condition:
+            if self._is_stopped:
+                # Worker is gone, so write in place to not lose the record
+                self._handle(message, context)
+                return
+
+            if self._queued_count >= self._size:
+                if not self._make_place(is_debug):
+                    self._dropped_count += 1
+                    return
+
+            item = (next(self._sequence), message, context)
+            if is_debug:
+                self._debug_records.append(item)
+            else:
+                self._records.append(item)
+            self._enqueued_count += 1
+            self._condition.notify_all()
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Wait until all queued records are processed.
+
+        Returns:
+            bool:
+                Whether the queue has been drained before timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._queued_count == 0 and not self._is_busy,
+                timeout)
+
+    def stop(self) -> None:
+        """Process remaining records and stop the worker."""
+        with self._condition:
+            if self._is_stopped:
+                return
+            self._is_stopped = True
+            self._condition.notify_all()
+
+        self._worker.join()
+        atexit.unregister(self.stop)
+
+    def _make_place(self, is_debug: bool) -> bool:
+        """Free place for incoming record according to overflow policy.
+
+        Should be called under acquired condition.
+
+        Returns:
+            bool:
+                Whether the incoming record should be enqueued.
+        """
+        match self._overflow_policy:
+            case LogQueueOverflowPolicyEnum.BLOCK:
+                self._condition.wait_for(
+                    lambda: self._queued_count < self._size
+                        or self._is_stopped)
+                return True
+            case LogQueueOverflowPolicyEnum.DROP_OLDEST:
+                self._pop_oldest()
+                self._dropped_count += 1
+                return True
+            case LogQueueOverflowPolicyEnum.DROP_DEBUG_FIRST:
+                if self._debug_records:
+                    self._debug_records.popleft()
+                    self._dropped_count += 1
+                    return True
+                elif is_debug:
+                    # Nothing less important than incoming debug record
+                    return False
+                else:
+                    self._records.popleft()
+                    self._dropped_count += 1
+                    return True
+            case _:
+                raise LogError(
+                    f'Unrecognized overflow policy: {self._overflow_policy}')
+
+    def _pop_oldest(self) -> tuple[int, Message, dict | None]:
+        if not self._debug_records:
+            return self._records.popleft()
+        elif not self._records:
+            return self._debug_records.popleft()
+        elif self._debug_records[0][0] < self._records[0][0]:
+            return self._debug_records.popleft()
+        else:
+            return self._records.popleft()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                self._is_busy = False
+                self._condition.notify_all()
+                self._condition.wait_for(
+                    lambda: self._queued_count > 0 or self._is_stopped)
+
+                if self._queued_count == 0:
+                    # Stopped and nothing left
+                    return
+
+                _, message, context = self._pop_oldest()
+                self._is_busy = True
+                # Wake up producers blocked on full queue
+                self._condition.notify_all()
+
+            self._handle(message, context)
+
+    def _handle(self, message: Message, context: dict | None) -> None:
+        try:
+            self._handler(message, context)
+        except Exception:
+            self._failed_count += 1
+            sys.stderr.write('--- Logging error in staze log worker ---\n')
+            traceback.print_exc(file=sys.stderr)
+        else:
+            self._processed_count += 1
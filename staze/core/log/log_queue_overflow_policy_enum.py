@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class LogQueueOverflowPolicyEnum(Enum):
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop_oldest'
+    DROP_DEBUG_FIRST = 'drop_debug_first'
@@ -0,0 +1,98 @@
+import time
+import threading
+
+from pytest import fixture
+from staze.core.log.log import log
+from staze.core.log.log_queue import LogQueue
+from staze.core.log.log_queue_overflow_policy_enum import (
+    LogQueueOverflowPolicyEnum)
+
+
+class StalledHandler:
+    """Handler holding the worker until released."""
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+        self.release = threading.Event()
+
+    def __call__(self, message, context) -> None:
+        self.release.wait()
+        self.messages.append(message.record['message'])
+
+
+@fixture
+def handler() -> StalledHandler:
+    return StalledHandler()
+
+
+def _add(queue: LogQueue) -> int:
+    return log.logger.add(
+        queue,
+        format='{message}',
+        level='DEBUG',
+        filter=lambda record: record['extra'].get('queue_test') is queue)
+
+
+def _emit(queue: LogQueue, level: str, message: str) -> None:
+    log.logger.bind(queue_test=queue).log(level, message)
+
+
+class TestLogQueue:
+    def test_block(self, handler: StalledHandler):
+        queue = LogQueue(handler, size=2)
+        handler_id: int = _add(queue)
+        handler.release.set()
+
+        for i in range(10):
+            _emit(queue, 'INFO', str(i))
+        queue.drain()
+        log.logger.remove(handler_id)
+
+        assert handler.messages == [str(i) for i in range(10)]
+        assert queue.stats['processed'] == 10
+        assert queue.stats['dropped'] == 0
+
+    def test_drop_oldest(self, handler: StalledHandler):
+        queue = LogQueue(
+            handler,
+            size=2,
+            overflow_policy=LogQueueOverflowPolicyEnum.DROP_OLDEST)
+        handler_id: int = _add(queue)
+
+        _emit(queue, 'INFO', 'taken')
+        # Wait for the worker to pop the first record and stall on it
+        while queue.stats['queued'] != 0:
+            time.sleep(0.001)
+        for message in ['a', 'b', 'c', 'd']:
+            _emit(queue, 'INFO', message)
+
+        assert queue.stats['queued'] == 2
+        assert queue.stats['dropped'] == 2
+
+        handler.release.set()
+        queue.drain()
+        log.logger.remove(handler_id)
+
+        assert handler.messages == ['taken', 'c', 'd']
+
+    def test_drop_debug_first(self, handler: StalledHandler):
+        queue = LogQueue(
+            handler,
+            size=2,
+            overflow_policy=LogQueueOverflowPolicyEnum.DROP_DEBUG_FIRST)
+        handler_id: int = _add(queue)
+
+        _emit(queue, 'INFO', 'taken')
+        while queue.stats['queued'] != 0:
+            time.sleep(0.001)
+        _emit(queue, 'DEBUG', 'debug')
+        _emit(queue, 'INFO', 'a')
+        _emit(queue, 'INFO', 'b')
+        _emit(queue, 'DEBUG', 'late debug')
+
+        assert queue.stats['dropped'] == 2
+
+        handler.release.set()
+        queue.drain()
+        log.logger.remove(handler_id)
+
+        assert handler.messages == ['taken', 'a', 'b']
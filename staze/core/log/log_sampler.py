@@ -0,0 +1,150 @@
+import threading
+from typing import Any, Callable
+
+from flask import request
+from staze.core.log.log_error import LogError
+from staze.core.log.log_sampling_rule import LogSamplingRule
+
+
+# Level number of ERROR
+_ERROR_LEVEL_NO: int = 40
+
+
+class LogSampler:
+    """Loguru filter dropping records according to sampling rules.
+
+    Filter is applied by loguru before the record is formatted, so dropped
+    records cost only rule matching.
+
+    Record is shared by all handlers, so the sampling rate isn't stamped by
+    the filter itself. Sink wrapped by `wrap_sink()` gets copy of the record
+    with `sample_rate` extra: rate of the rule kept the record, or 1.0 for
+    records kept regardless of rules.
+
+    Args:
+        rules (optional):
+            Rules checked in order, the first matched one decides. Records
+            matched no rule are kept. Defaults to empty list
+        keep_errors (optional):
+            Whether records of ERROR level and above are always kept. Defaults
+            to True
+        slow_request_threshold (optional):
+            Records with `event_duration` extra (in nanoseconds) of at least
+            this amount of seconds are always kept. Defaults to None, i.e.
+            slow requests are sampled as any other ones
+        filter (optional):
+            Callable filter to be applied before sampling. Defaults to None
+    """
+    def __init__(
+                self,
+                rules: list[LogSamplingRule] | None = None,
+                keep_errors: bool = True,
+                slow_request_threshold: float | None = None,
+                filter: Callable[[dict], bool] | None = None
+            ) -> None:
+        self._rules: list[LogSamplingRule] = rules or []
+        self._keep_errors = keep_errors
+        self._slow_request_threshold_ns: int | None = None
+        if slow_request_threshold is not None:
+            self._slow_request_threshold_ns = int(
+                slow_request_threshold * 1_000_000_000)
+        self._filter = filter
+
+        # Avoid touching request context if no rule needs it
+        self._is_route_required: bool = any(
+            x.route is not None for x in self._rules)
+        # Rate of the last record kept in the thread, loguru calls the sink
+        # right after the filter in the same thread
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(
+            cls,
+            config: dict,
+            filter: Callable | str | dict | None = None) -> 'LogSampler':
+        """Create sampler from `sampling` section of log config."""
+        if filter is not None and not callable(filter):
+            raise LogError(
+                'Only callable log filter can be combined with sampling')
+
+        try:
+            rules: list[LogSamplingRule] = [
+                LogSamplingRule(**x) for x in config.get('rules', [])
+            ]
+            return cls(
+                rules=rules,
+                keep_errors=config.get('keep_errors', True),
+                slow_request_threshold=config.get(
+                    'slow_request_threshold', None),
+                filter=filter)
+        except TypeError as error:
+            raise LogError(f'Wrong sampling config: {error}')
+
+    def __call__(self, record: dict) -> bool:
+        if self._filter is not None and not self._filter(record):
+            return False
+
+        rate: float | None = self._sample(record)
+        if rate is None:
+            return False
+        self._local.rate = rate
+        return True
+
+    def wrap_sink(self, sink: Callable[..., Any]) -> Callable[..., Any]:
+        """Return sink passing messages to given one with copy of the record
+        stamped by the sampling rate.
+        """
+        def stamp_sink(message: Any, *args, **kwargs) -> Any:
+            record: dict = message.record
+            message.record = {
+                **record,
+                'extra': {
+                    **record['extra'],
+                    'sample_rate': getattr(self._local, 'rate', 1.0)
+                }
+            }
+            return sink(message, *args, **kwargs)
+
+        return stamp_sink
+
+    def _sample(self, record: dict) -> float | None:
+        """Return rate the record is kept with or None, if it's dropped."""
+        extra: dict = record['extra']
+
+        if self._keep_errors and record['level'].no >= _ERROR_LEVEL_NO:
+            return 1.0
+
+        if self._slow_request_threshold_ns is not None:
+            duration: int | None = extra.get('event_duration', None)
+            if (
+                    duration is not None
+                    and duration >= self._slow_request_threshold_ns):
+                return 1.0
+
+        if not self._rules:
+            return 1.0
+
+        status_class: str | None = None
+        status_code: int | None = extra.get('http_response_status_code', None)
+        if status_code is not None:
+            status_class = f'{status_code // 100}xx'
+
+        level: str = record['level'].name
+        route: str | None = self._get_route() \
+            if self._is_route_required else None
+
+        for rule in self._rules:
+            if rule.matches(route, status_class, level):
+                return float(rule.rate) if rule.should_keep() else None
+
+        return 1.0
+
+    def _get_route(self) -> str | None:
+        try:
+            url_rule = request.url_rule
+        except RuntimeError:
+            # Record is emitted outside of request context
+            return None
+        if url_rule is None:
+            return None
+        return url_rule.rule
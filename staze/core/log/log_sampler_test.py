@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+from staze.core.log.log_sampler import LogSampler
+from staze.core.log.log_sampling_rule import LogSamplingRule
+
+
+def _record(level: str = 'INFO', no: int = 20, **extra) -> dict:
+    return {'level': SimpleNamespace(name=level, no=no), 'extra': extra}
+
+
+def _stamp(sampler: LogSampler, record: dict) -> dict:
+    """Return record as the sink wrapped by the sampler gets it."""
+    received: list[dict] = []
+    message = SimpleNamespace(record=record)
+    sampler.wrap_sink(lambda x: received.append(x.record))(message)
+    return received[0]
+
+
+class TestLogSampler:
+    def test_rate(self):
+        sampler = LogSampler([
+            LogSamplingRule(status_class='2xx', rate=0),
+            LogSamplingRule(level='INFO', rate=1)
+        ])
+
+        assert not sampler(_record(http_response_status_code=200))
+        record: dict = _record(http_response_status_code=404)
+        assert sampler(record)
+        assert _stamp(sampler, record)['extra']['sample_rate'] == 1
+
+    def test_stamp_copy(self):
+        sampler = LogSampler([LogSamplingRule(rate=0.999999)])
+        record: dict = _record(user_id=1)
+
+        assert sampler(record)
+        stamped: dict = _stamp(sampler, record)
+
+        assert stamped['extra'] == {'user_id': 1, 'sample_rate': 0.999999}
+        # Record is shared by all handlers, so it's left untouched
+        assert record['extra'] == {'user_id': 1}
+
+    def test_keep_errors_and_slow_requests(self):
+        sampler = LogSampler(
+            [LogSamplingRule(rate=0)], slow_request_threshold=1)
+
+        for record in [
+                _record('ERROR', 40),
+                _record(event_duration=2_000_000_000)]:
+            assert sampler(record)
+            assert _stamp(sampler, record)['extra']['sample_rate'] == 1.0
+        assert not sampler(_record(event_duration=1000))
+
+    def test_limit(self):
+        sampler = LogSampler([LogSamplingRule(limit=1, burst=3)])
+
+        kept: list[bool] = [sampler(_record()) for _ in range(10)]
+
+        assert kept.count(True) == 3
+
+    def test_from_config(self):
+        sampler = LogSampler.from_config(
+            {'rules': [{'level': 'debug', 'rate': 0}]},
+            filter=lambda record: 'skipped' not in record['extra'])
+
+        assert not sampler(_record('DEBUG', 10))
+        assert not sampler(_record(skipped=True))
+        assert sampler(_record())
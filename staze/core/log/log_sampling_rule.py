@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+
+from staze.core.log.log_error import LogError
+
+
+class LogSamplingRule:
+    """Rule deciding whether matched log record should be kept.
+
+    Every condition left as None matches any record.
+
+    Args:
+        route (optional):
+            Url rule of the request the record is emitted within, e.g.
+            `/users/<id>`.
+        status_class (optional):
+            Class of response status code in record's extra, e.g. `2xx`.
+        level (optional):
+            Name of the record's level, e.g. `INFO`.
+        rate (optional):
+            Fraction of matched records to keep, from 0 to 1. Defaults to 1
+        limit (optional):
+            Maximum amount of kept records per second, enforced by token
+            bucket. Defaults to None, i.e. no limit
+        burst (optional):
+            Capacity of the token bucket. Defaults to `limit`
+    """
+    def __init__(
+                self,
+                route: str | None = None,
+                status_class: str | None = None,
+                level: str | None = None,
+                rate: float = 1.0,
+                limit: float | None = None,
+                burst: float | None = None
+            ) -> None:
+        if not 0 <= rate <= 1:
+            raise LogError(f'Sampling rate should be from 0 to 1, got {rate}')
+        if limit is not None and limit <= 0:
+            raise LogError(f'Sampling limit should be positive, got {limit}')
+
+        self.route = route
+        self.status_class = status_class.lower() if status_class else None
+        self.level = level.upper() if level else None
+        self.rate = rate
+        self.limit = limit
+        self.burst: float = burst if burst is not None else (limit or 0)
+
+        self._tokens: float = self.burst
+        self._refilled_at: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def matches(
+            self,
+            route: str | None,
+            status_class: str | None,
+            level: str) -> bool:
+        return (
+            (self.route is None or self.route == route)
+            and (
+                self.status_class is None
+                or self.status_class == status_class)
+            and (self.level is None or self.level == level)
+        )
+
+    def should_keep(self) -> bool:
+        """Decide whether the matched record is kept."""
+        if self.rate < 1 and random.random() >= self.rate:
+            return False
+        if self.limit is None:
+            return True
+
+        with self._lock:
+            now: float = time.monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._refilled_at) * self.limit)
+            self._refilled_at = now
+
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
@@ -0,0 +1,157 @@
+import gzip
+import json
+import os
+from typing import Iterator
+
+from staze.core.log.log_segment_writer import LogSegmentWriter
+
+
+class LogSegmentReader:
+    """Queries records from segments written by LogSegmentWriter.
+
+    Only blocks which index entries may contain matching records are read and
+    decompressed, then every record of them is checked against the criteria
+    exactly.
+
+    Args:
+        path:
+            Path to the active segment file. Rotated segments next to it are
+            read as well, from the oldest to the newest.
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+    def query(
+            self,
+            since: float | None = None,
+            until: float | None = None,
+            level: str | None = None,
+            service_hash: int | None = None,
+            status_code: int | None = None) -> Iterator[dict]:
+        """Yield records matching all given criteria.
+
+        Args:
+            since (optional):
+                Minimal timestamp of the record, inclusive.
+            until (optional):
+                Maximal timestamp of the record, inclusive.
+            level (optional):
+                Name of the record's level, e.g. `ERROR`.
+            service_hash (optional):
+                Hash of the service emitted the record.
+            status_code (optional):
+                HTTP status code of the response the record is made for.
+        """
+        for segment_path in self.get_segment_paths():
+            index_path: str = segment_path + LogSegmentWriter.INDEX_EXTENSION
+            if not os.path.isfile(index_path):
+                continue
+
+            with open(segment_path, 'rb') as segment:
+                for entry in self._read_index(index_path):
+                    if not self._is_block_matched(
+                            entry,
+                            since,
+                            until,
+                            level,
+                            service_hash,
+                            status_code):
+                        continue
+
+                    segment.seek(entry['offset'])
+                    data: bytes = gzip.decompress(
+                        segment.read(entry['length']))
+
+                    for line in data.decode('utf-8').splitlines():
+                        record: dict = json.loads(line)
+                        if self._is_record_matched(
+                                record,
+                                since,
+                                until,
+                                level,
+                                service_hash,
+                                status_code):
+                            yield record
+
+    def get_segment_paths(self) -> list[str]:
+        """Return paths of existing segments, from the oldest to the newest."""
+        directory: str = os.path.dirname(self._path) or '.'
+        if not os.path.isdir(directory):
+            return []
+
+        root, extension = os.path.splitext(os.path.basename(self._path))
+        # Rotation timestamps are sortable as strings
+        paths: list[str] = sorted(
+            os.path.join(directory, x) for x in os.listdir(directory)
+            if x.startswith(root + '.')
+                and x.endswith(extension)
+                and x != os.path.basename(self._path))
+
+        if os.path.isfile(self._path):
+            paths.append(self._path)
+        return paths
+
+    def _read_index(self, index_path: str) -> Iterator[dict]:
+        with open(index_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Entry is partially written by the writer interrupted in
+                    # the middle, block it refers to is skipped
+                    continue
+
+    def _is_block_matched(
+            self,
+            entry: dict,
+            since: float | None,
+            until: float | None,
+            level: str | None,
+            service_hash: int | None,
+            status_code: int | None) -> bool:
+        time_min: float | None = entry['time_min']
+        time_max: float | None = entry['time_max']
+
+        if since is not None and (time_max is None or time_max < since):
+            return False
+        if until is not None and (time_min is None or time_min > until):
+            return False
+        if level is not None and level not in entry['levels']:
+            return False
+        if (
+                service_hash is not None
+                and service_hash not in entry['service_hashes']):
+            return False
+        if (
+                status_code is not None
+                and status_code not in entry['status_codes']):
+            return False
+        return True
+
+    def _is_record_matched(
+            self,
+            record: dict,
+            since: float | None,
+            until: float | None,
+            level: str | None,
+            service_hash: int | None,
+            status_code: int | None) -> bool:
+        timestamp: float | None = record.get('@timestamp', None)
+
+        if since is not None and (timestamp is None or timestamp < since):
+            return False
+        if until is not None and (timestamp is None or timestamp > until):
+            return False
+        if level is not None and record.get('log.level', None) != level:
+            return False
+        if (
+                service_hash is not None
+                and record.get('labels', {}).get('service_hash', None)
+                    != service_hash):
+            return False
+        if (
+                status_code is not None
+                and record.get('http.response.status_code', None)
+                    != status_code):
+            return False
+        return True
@@ -0,0 +1,70 @@
+import json
+import os
+
+from pytest import fixture
+from staze.core.log.log_segment_reader import LogSegmentReader
+from staze.core.log.log_segment_writer import LogSegmentWriter
+
+
+@fixture
+def segment_path(tmp_path) -> str:
+    path: str = os.path.join(tmp_path, 'app.seg')
+    writer = LogSegmentWriter(
+        path, rotation='200 B', block_size=2, flush_interval=60)
+
+    for i in range(10):
+        log: dict = {
+            '@timestamp': float(i),
+            'log.level': 'ERROR' if i == 7 else 'INFO',
+            'labels': {'service_hash': i % 2},
+            'http.response.status_code': 500 if i == 7 else 200
+        }
+        writer.write(json.dumps(log) + '\n', log)
+    writer.close()
+
+    return path
+
+
+class TestLogSegmentReader:
+    def test_all(self, segment_path: str):
+        reader = LogSegmentReader(segment_path)
+
+        assert len(reader.get_segment_paths()) > 1
+        assert [x['@timestamp'] for x in reader.query()] \
+            == [float(x) for x in range(10)]
+
+    def test_time_range(self, segment_path: str):
+        records: list[dict] = list(
+            LogSegmentReader(segment_path).query(since=3.0, until=5.0))
+        assert [x['@timestamp'] for x in records] == [3.0, 4.0, 5.0]
+
+    def test_criteria(self, segment_path: str):
+        reader = LogSegmentReader(segment_path)
+
+        records: list[dict] = list(reader.query(level='ERROR'))
+        assert [x['@timestamp'] for x in records] == [7.0]
+
+        records = list(reader.query(status_code=500, service_hash=1))
+        assert [x['@timestamp'] for x in records] == [7.0]
+
+        assert list(reader.query(status_code=500, service_hash=0)) == []
+
+    def test_skipped_blocks(self, segment_path: str, monkeypatch):
+        reader = LogSegmentReader(segment_path)
+        read_blocks: list[dict] = []
+        is_block_matched = reader._is_block_matched
+
+        def _is_block_matched(entry, *args) -> bool:
+            is_matched: bool = is_block_matched(entry, *args)
+            if is_matched:
+                read_blocks.append(entry)
+            return is_matched
+
+        monkeypatch.setattr(reader, '_is_block_matched', _is_block_matched)
+        list(reader.query(level='ERROR'))
+
+        assert len(read_blocks) == 1
+
+    def test_no_segments(self, tmp_path):
+        reader = LogSegmentReader(os.path.join(tmp_path, 'none/app.seg'))
+        assert list(reader.query()) == []
@@ -0,0 +1,195 @@
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import IO
+
+from staze.core.log.layers.layer_writer import LayerWriter, get_encoded_size
+from staze.core.log.log_error import LogError
+
+
+class LogSegmentWriter(LayerWriter):
+    """Writes ECS records to compressed segment with a sidecar index.
+
+    Records are grouped to blocks, every block is written to the segment file
+    as a separate gzip member, so the whole segment is still readable by
+    `zcat`. For every block a line is appended to the index file
+    (segment path + `.idx`) with block's offset and length in the segment,
+    time range, level counts, service hashes and response status codes of
+    its records, so queries can seek directly to relevant blocks.
+
+    Rotated segments are renamed together with their indexes and neither
+    compressed nor removed, since they are compressed already.
+
+    Args:
+        path:
+            Path to the segment file.
+        rotation (optional):
+            Rotation as LayerWriter specifies, size is compared against
+            compressed segment size. Defaults to None
+        block_size (optional):
+            Amount of records in one block. Defaults to 1000
+        buffer_size (optional):
+            Amount of uncompressed bytes after which the block is closed even
+            if it has less records. Defaults to 1 MiB
+        flush_interval (optional):
+            Maximum amount of seconds the record can stay in unclosed block.
+            Defaults to 1 second
+    """
+    INDEX_EXTENSION: str = '.idx'
+
+    def __init__(
+                self,
+                path: str,
+                rotation: str | None = None,
+                block_size: int = 1000,
+                buffer_size: int = 1024 * 1024,
+                flush_interval: float = 1.0
+            ) -> None:
+        if block_size < 1:
+            raise LogError(
+                f'Segment block size should be positive, got {block_size}')
+
+        self._block_size = block_size
+        self._reset_block()
+        self._index_file: IO[str] | None = None
+
+        super().__init__(
+            path=path,
+            rotation=rotation,
+            buffer_size=buffer_size,
+            flush_interval=flush_interval)
+
+    @staticmethod
+    def get_segment_path(log_path: str) -> str:
+        """Return path of the segment for configured log path."""
+        return os.path.splitext(log_path)[0] + '.seg'
+
+    def write(self, line: str, log: dict | None = None) -> None:
+        """Put serialized record to the current block.
+
+        Given record is the one line is serialized from, it's used to fill the
+        block's index entry.
+        """
+        with self._lock:
+            if self._is_closed:
+                raise LogError(f'Writer for {self._path} is closed')
+
+            if log is not None:
+                self._update_block_index(log)
+            self._buffer.append(line)
+            self._buffered_size += get_encoded_size(line)
+
+            if (
+                    len(self._buffer) >= self._block_size
+                    or self._buffered_size >= self._buffer_size):
+                self.flush()
+
+    def flush(self) -> None:
+        """Compress buffered records to a block and index it."""
+        with self._lock:
+            if not self._buffer:
+                return
+
+            data: bytes = gzip.compress(
+                ''.join(self._buffer).encode('utf-8'))
+            count: int = len(self._buffer)
+
+            try:
+                if self._should_rotate(len(data)):
+                    self._rotate()
+
+                file: IO[bytes] = self._open()
+                offset: int = self._file_size
+                self._write_all(file, data)
+            except BaseException:
+                self._drop_oldest()
+                raise
+
+            index_file: IO[str] = self._open_index()
+            index_file.write(json.dumps({
+                'offset': offset,
+                'length': len(data),
+                'count': count,
+                'time_min': self._block_time_min,
+                'time_max': self._block_time_max,
+                'levels': self._block_levels,
+                'service_hashes': sorted(self._block_service_hashes),
+                'status_codes': sorted(self._block_status_codes)
+            }) + '\n')
+            index_file.flush()
+
+            self._buffer.clear()
+            self._buffered_size = 0
+            self._reset_block()
+
+    def _drop_oldest(self) -> None:
+        # Block is written again whole on the next flush, so only it's
+        # records are retained, up to the limit
+        while (
+                self._buffer
+                and self._buffered_size > self._max_retained_size):
+            self._buffered_size -= get_encoded_size(self._buffer.pop(0))
+            self._dropped_count += 1
+
+    def close(self) -> None:
+        # Not under the lock, since the flusher, which may wait for it, is
+        # joined
+        super().close()
+        with self._lock:
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
+
+    def _reset_block(self) -> None:
+        self._block_time_min: float | None = None
+        self._block_time_max: float | None = None
+        self._block_levels: dict[str, int] = {}
+        self._block_service_hashes: set[int] = set()
+        self._block_status_codes: set[int] = set()
+
+    def _update_block_index(self, log: dict) -> None:
+        timestamp: float | None = log.get('@timestamp', None)
+        if timestamp is not None:
+            if self._block_time_min is None or timestamp < self._block_time_min:
+                self._block_time_min = timestamp
+            if self._block_time_max is None or timestamp > self._block_time_max:
+                self._block_time_max = timestamp
+
+        level: str | None = log.get('log.level', None)
+        if level is not None:
+            self._block_levels[level] = self._block_levels.get(level, 0) + 1
+
+        service_hash: int | None = log.get('labels', {}).get(
+            'service_hash', None)
+        if service_hash is not None:
+            self._block_service_hashes.add(service_hash)
+
+        status_code: int | None = log.get('http.response.status_code', None)
+        if status_code is not None:
+            self._block_status_codes.add(status_code)
+
+    def _open_index(self) -> IO[str]:
+        if self._index_file is None:
+            self._index_file = open(
+                self._path + self.INDEX_EXTENSION, 'a', encoding='utf-8')
+        return self._index_file
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+        root, extension = os.path.splitext(self._path)
+        rotated_path: str = '{}.{}{}'.format(
+            root,
+            datetime.now().strftime('%Y-%m-%d_%H-%M-%S_%f'),
+            extension)
+        os.rename(self._path, rotated_path)
+
+        index_path: str = self._path + self.INDEX_EXTENSION
+        if os.path.isfile(index_path):
+            os.rename(index_path, rotated_path + self.INDEX_EXTENSION)
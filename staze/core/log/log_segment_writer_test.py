@@ -0,0 +1,78 @@
+import gzip
+import json
+import os
+
+import pytest
+from staze.core.log.log_error import LogError
+from staze.core.log.log_segment_writer import LogSegmentWriter
+
+
+def _make_log(
+        timestamp: float,
+        level: str = 'INFO',
+        service_hash: int | None = None,
+        status_code: int | None = None) -> dict:
+    log: dict = {
+        '@timestamp': timestamp,
+        'log.level': level,
+        'labels': {}
+    }
+    if service_hash is not None:
+        log['labels']['service_hash'] = service_hash
+    if status_code is not None:
+        log['http.response.status_code'] = status_code
+    return log
+
+
+def _write(writer: LogSegmentWriter, log: dict) -> None:
+    writer.write(json.dumps(log) + '\n', log)
+
+
+class TestLogSegmentWriter:
+    def test_blocks(self, tmp_path):
+        path: str = os.path.join(tmp_path, 'app.seg')
+        writer = LogSegmentWriter(path, block_size=2, flush_interval=60)
+
+        _write(writer, _make_log(1.0, 'INFO', 10, 200))
+        _write(writer, _make_log(2.0, 'ERROR', 20, 500))
+        _write(writer, _make_log(3.0, 'INFO'))
+        writer.close()
+
+        with open(path + '.idx') as file:
+            entries: list[dict] = [json.loads(x) for x in file]
+
+        assert len(entries) == 2
+        assert entries[0]['offset'] == 0
+        assert entries[0]['count'] == 2
+        assert entries[0]['time_min'] == 1.0
+        assert entries[0]['time_max'] == 2.0
+        assert entries[0]['levels'] == {'INFO': 1, 'ERROR': 1}
+        assert entries[0]['service_hashes'] == [10, 20]
+        assert entries[0]['status_codes'] == [200, 500]
+        assert entries[1]['offset'] == entries[0]['length']
+        assert entries[1]['service_hashes'] == []
+
+        # Segment is a valid gzip stream of all records
+        with gzip.open(path, 'rt') as file:
+            assert len(file.read().splitlines()) == 3
+
+    def test_rotation(self, tmp_path):
+        path: str = os.path.join(tmp_path, 'app.seg')
+        writer = LogSegmentWriter(
+            path, rotation='1 B', block_size=1, flush_interval=60)
+
+        _write(writer, _make_log(1.0))
+        _write(writer, _make_log(2.0))
+        writer.close()
+
+        names: list[str] = os.listdir(tmp_path)
+        assert len([x for x in names if x.endswith('.seg')]) == 2
+        assert len([x for x in names if x.endswith('.seg.idx')]) == 2
+
+    def test_wrong_block_size(self, tmp_path):
+        with pytest.raises(LogError):
+            LogSegmentWriter(os.path.join(tmp_path, 'app.seg'), block_size=0)
+
+    def test_get_segment_path(self):
+        assert LogSegmentWriter.get_segment_path('var/logs/app.log') \
+            == 'var/logs/app.seg'
@@ -1,4 +1,7 @@
 import json
+import os
+import threading
+
 from staze.core.log.log import log
 
 
@@ -15,3 +18,117 @@ from staze.core.log.log import log
 # def test_dummy():
 #     log.logger.bind(id=1).debug('Dummy Johnson')
 #     assert False
+
+
+def test_remove(tmp_path):
+    path: str = os.path.join(tmp_path, 'app.log')
+    threads_count: int = threading.active_count()
+
+    handler_id: int = log.setup(
+        path=path,
+        format='{message}',
+        rotation='10 MB',
+        level='DEBUG',
+        serialize=False,
+        filter=lambda record: 'remove_test' in record['extra'],
+        is_async=True)
+    writer = log._writers[-1]
+    log.logger.bind(remove_test=True).info('hello')
+
+    log.remove(handler_id)
+
+    # Queued record is written out and threads are stopped
+    with open(path) as file:
+        assert file.read() == 'hello\n'
+    assert writer._file is None
+    assert writer not in log._writers
+    assert handler_id not in log._resources_by_handler_id
+    assert threading.active_count() == threads_count
+
+
+def test_async_default_format(tmp_path):
+    async_path: str = os.path.join(tmp_path, 'async.log')
+    sync_path: str = os.path.join(tmp_path, 'sync.log')
+    format: str = '{level} | {extra} >> {message}'
+    handler_ids: list[int] = [
+        log.setup(
+            path=path,
+            format=format,
+            rotation='10 MB',
+            level='DEBUG',
+            serialize=serialize,
+            filter=lambda record: 'format_test' in record['extra'],
+            is_async=is_async)
+        for path, is_async, serialize in [
+            (async_path, True, False),
+            (sync_path, False, False),
+            (async_path + '.json', True, True),
+            (sync_path + '.json', False, True)
+        ]
+    ]
+
+    bound_log = log.logger.bind(format_test=1)
+    bound_log.info('hello {}', 'world')
+    try:
+        raise ValueError('wrong')
+    except ValueError:
+        bound_log.opt(exception=True).error('failed')
+
+    for handler_id in handler_ids:
+        log.remove(handler_id)
+
+    with open(async_path) as async_file, open(sync_path) as sync_file:
+        async_lines: list[str] = async_file.read().splitlines()
+        sync_lines: list[str] = sync_file.read().splitlines()
+    assert async_lines[:2] == sync_lines[:2] == [
+        "INFO | {'format_test': 1} >> hello world",
+        "ERROR | {'format_test': 1} >> failed"
+    ]
+    assert async_lines[-1] == sync_lines[-1] == 'ValueError: wrong'
+    # Tracebacks are formatted by loguru as well
+    assert async_lines == sync_lines
+
+    with open(async_path + '.json') as async_file:
+        records: list[dict] = [
+            json.loads(x)['record'] for x in async_file.read().splitlines()
+        ]
+    assert [x['message'] for x in records] == ['hello world', 'failed']
+    assert records[1]['exception']['type'] == 'ValueError'
+
+
+def test_sampling_rate(tmp_path):
+    sampled_path: str = os.path.join(tmp_path, 'sampled.log')
+    plain_path: str = os.path.join(tmp_path, 'plain.log')
+    handler_ids: list[int] = [
+        log.setup(
+            path=sampled_path,
+            format='{extra[sample_rate]} >> {message}',
+            rotation='10 MB',
+            level='DEBUG',
+            serialize=False,
+            filter=lambda record: 'sampling_test' in record['extra'],
+            is_async=True,
+            sampling={'rules': [{'level': 'INFO', 'rate': 1}]}),
+        log.setup(
+            path=plain_path,
+            format='{extra} >> {message}',
+            rotation='10 MB',
+            level='DEBUG',
+            serialize=False,
+            filter=lambda record: 'sampling_test' in record['extra'])
+    ]
+
+    bound_log = log.logger.bind(sampling_test=1)
+    bound_log.info('sampled')
+    bound_log.error('kept')
+
+    for handler_id in handler_ids:
+        log.remove(handler_id)
+
+    with open(sampled_path) as file:
+        assert file.read() == '1.0 >> sampled\n1.0 >> kept\n'
+    # Rate of other sink's sampler isn't leaked to this one
+    with open(plain_path) as file:
+        assert file.read() \
+            == "{'sampling_test': 1} >> sampled\n" \
+                "{'sampling_test': 1} >> kept\n"
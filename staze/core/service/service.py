@@ -25,11 +25,43 @@ class Service(Singleton):
         'protected': LogSnapshotFieldSpecEnum.ALWAYS,
         'private': LogSnapshotFieldSpecEnum.ALWAYS
     }
+    # Limits of snapshot made by log layers: how deep nested objects are
+    # traversed and how many values are stored at most
+    LOG_SNAPSHOT_MAX_DEPTH: int = 5
+    LOG_SNAPSHOT_MAX_SIZE: int = 1000
+    # Snapshot is cached by log layers until the service's state version is
+    # changed. If set, the snapshot is recomputed once per this amount of
+    # seconds instead, whether the version is changed or not, so in place
+    # changes of nested objects are shown at most this late
+    LOG_SNAPSHOT_INTERVAL: float | None = None
+    # Service's own keys never put to snapshot
+    LOG_SNAPSHOT_EXCLUDED_KEYS: set[str] = {'logger', '_log_snapshot_version'}
 
     def __init__(self, config: dict) -> None:
         self.config = config
         self.logger = log.logger.bind(service_hash=hash(self))
 
+    def __setattr__(self, name: str, value) -> None:
+        super().__setattr__(name, value)
+        self.__dict__['_log_snapshot_version'] = \
+            self.__dict__.get('_log_snapshot_version', 0) + 1
+
+    @property
+    def log_snapshot_version(self) -> int:
+        """Version of the service's state, changed on every attribute
+        assignment.
+        """
+        return self.__dict__.get('_log_snapshot_version', 0)
+
+    def invalidate_log_snapshot(self) -> None:
+        """Change state version to make log layers recompute the snapshot.
+
+        Should be called after mutating nested objects in place (e.g.
+        `self._cache[key] = value`), which is not tracked automatically.
+        """
+        self.__dict__['_log_snapshot_version'] = \
+            self.log_snapshot_version + 1
+
     @classmethod
     def get_config_name(cls) -> str:
         if cls.CONFIG_NAME:
@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import sqlalchemy as sa
+from staze.core.database.n_plus_one_detector import NPlusOneDetector
+from staze.core.database.sql_instrumentation import SqlInstrumentation
+
+
+class SqlAssertions:
+    """Assertions over SQL statements executed by the engine.
+
+    Example:
+        ```python
+        def test_list(self, http: HttpClient, sql: SqlAssertions):
+            with sql.max_statements(2), sql.no_n_plus_one():
+                http.get('/users')
+        ```
+    """
+    def __init__(
+            self,
+            engine: Any,
+            n_plus_one_detector: NPlusOneDetector | None = None) -> None:
+        self._engine = engine
+        self._n_plus_one_detector = n_plus_one_detector
+
+    @contextmanager
+    def max_statements(self, count: int) -> Iterator[list[str]]:
+        """Assert that at most given amount of statements are executed within
+        the context.
+
+        Yield:
+            List statements executed within the context are collected to.
+        """
+        statements: list[str] = []
+
+        def collect(conn, cursor, statement: str, *args) -> None:
+            statements.append(statement)
+
+        sa.event.listen(self._engine, 'after_cursor_execute', collect)
+        try:
+            yield statements
+        finally:
+            sa.event.remove(self._engine, 'after_cursor_execute', collect)
+
+        if len(statements) > count:
+            raise AssertionError(
+                f'Expected at most {count} statements, got {len(statements)}:'
+                + ''.join(
+                    '\n  ' + SqlInstrumentation.normalize(x)
+                    for x in statements))
+
+    @contextmanager
+    def no_n_plus_one(self) -> Iterator[None]:
+        """Assert that no N+1 queries are detected within requests made in
+        the context.
+
+        Raise:
+            ValueError:
+                N+1 detector is not enabled.
+        """
+        if self._n_plus_one_detector is None:
+            raise ValueError('N+1 detector is not enabled')
+
+        previous: list[dict[str, Any]] = self._n_plus_one_detector.detections
+        yield
+
+        detections: list[dict[str, Any]] = [
+            x for x in self._n_plus_one_detector.detections
+            if not any(x is y for y in previous)
+        ]
+        if detections:
+            raise AssertionError(
+                'N+1 queries are detected:'
+                + ''.join(
+                    f'\n  {x["statement"]} at {x["call_site"]}'
+                    for x in detections))
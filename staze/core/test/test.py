@@ -9,6 +9,7 @@ from staze.core import validation, parsing
 from staze.core.database.database import Database
 from staze.core.socket.socket import Socket
 from staze.core.test.http_client import HttpClient
+from staze.core.test.sql_assertions import SqlAssertions
 
 
 class Test:
@@ -34,6 +35,12 @@ class Test:
         with app.app_context():
             database.drop_all()
 
+    @fixture
+    def sql(self, app: App, db: Database) -> SqlAssertions:
+        with app.app_context():
+            return SqlAssertions(
+                db.native_database.engine, db.n_plus_one_detector)
+
     @fixture
     def socket(self) -> Socket:
         return Socket.instance()
@@ -24,6 +24,8 @@ class View(MethodView):
     # for this view
     METHODS: list[str] = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
     ENDPOINT: str | None = None
+    # Whether response bodies of this view are captured to request logs
+    IS_RESPONSE_BODY_LOGGED: bool = True
 
     # List of decorators to apply to all view's methods.
     # decorators = [log.catch]  
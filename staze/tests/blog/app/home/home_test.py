@@ -0,0 +1,58 @@
+from pytest import fixture
+from staze.core.app.app import App
+from staze.core.log.log import log
+from staze.core.test.http_client import HttpClient
+from staze.core.test.test import Test
+
+
+@fixture
+def response_records():
+    records: list[dict] = []
+    handler_id: int = log.logger.add(
+        lambda message: records.append(message.record),
+        level='DEBUG',
+        filter=lambda record:
+            'http_response_status_code' in record['extra'])
+    yield records
+    log.logger.remove(handler_id)
+
+
+class TestResponseBodyLog(Test):
+    def test_truncated(
+            self, app: App, http: HttpClient, response_records: list[dict]):
+        max_bytes: int = app._log_response_body_max_bytes
+        app._log_response_body_max_bytes = 6
+        try:
+            http.get('/', 200)
+        finally:
+            app._log_response_body_max_bytes = max_bytes
+
+        assert \
+            response_records[-1]['extra']['http_response_body_content'] \
+            == '<!DOCT'
+
+    def test_excluded_route(
+            self, app: App, http: HttpClient, response_records: list[dict]):
+        app._log_response_body_excluded_routes.add('/')
+        try:
+            http.get('/', 200)
+        finally:
+            app._log_response_body_excluded_routes.remove('/')
+
+        assert \
+            'http_response_body_content' not in response_records[-1]['extra']
+
+    def test_passthrough(
+            self, http: HttpClient, response_records: list[dict]):
+        http.get('/favicon.ico', 200)
+
+        assert \
+            'http_response_body_content' not in response_records[-1]['extra']
+
+    def test_no_mime_type(self, app: App):
+        response = app.native_app.response_class(b'data')
+        del response.headers['Content-Type']
+
+        assert response.mimetype is None
+        with app.native_app.test_request_context('/'):
+            assert app._get_response_body_for_log(response) is None
@@ -12,6 +12,10 @@ if TYPE_CHECKING:
 
 
 class UserOrm(Database.Orm):
+    TYPE_CODES = {'user': 1, 'advanced_user': 2}
+    WITH_POLYMORPHIC = True
+    MODEL_CLASS = User
+
     _username = Database.column(Database.string(150))
     _password = Database.column(Database.string(150))
     _post_orms = Database.relationship(
@@ -40,14 +44,6 @@ class UserOrm(Database.Orm):
     def post_ids(self) -> list[int]:
         return [orm.id for orm in self._post_orms]
 
-    @hybrid_property
-    def model(self) -> User:
-        return User(
-            id=self.id,
-            type=self.type,
-            username=self.username
-        )
-
 
 class AdvancedUserOrm(UserOrm):
     _badge_id = Database.column(
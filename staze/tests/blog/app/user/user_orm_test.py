@@ -0,0 +1,834 @@
+import os
+
+import pytest
+import sqlalchemy as sa
+from pytest import fixture
+from pydantic import ValidationError
+from staze.core.app.app import App
+from staze.core.database.database import Database, Orm
+from staze.core.database.replica_router import ReplicaRouter
+from staze.core.database.routing_session import RoutingSession
+from staze.core.database.sqlite_profile import SqliteProfile
+from staze.core.model.model import Model
+from staze.core.test.test import Test
+from staze.tests.blog.app.badge.badge_orm import BadgeOrm
+from staze.tests.blog.app.post.post_orm import PostOrm
+from staze.tests.blog.app.user.user import User
+from staze.tests.blog.app.user.user_orm import AdvancedUserOrm, UserOrm
+
+
+class TestBulkPush(Test):
+    def test_orms(self, app: App, db: Database):
+        with app.app_context():
+            ids: list[int] | None = db.bulk_push(
+                [
+                    UserOrm.create(username=f'user{i}', password='123')
+                    for i in range(5)
+                ],
+                chunk_size=2,
+                has_to_return_ids=True)
+
+            assert ids == [1, 2, 3, 4, 5]
+            assert [x.username for x in UserOrm.get_all(order_by=UserOrm._id)] \
+                == [f'user{i}' for i in range(5)]
+            assert {x.type for x in UserOrm.get_all()} == {'user'}
+
+    def test_mappings(self, app: App, db: Database):
+        with app.app_context():
+            result = db.bulk_push(
+                [{'_username': f'user{i}'} for i in range(3)],
+                orm_class=UserOrm)
+
+            assert result is None
+            assert len(UserOrm.get_all()) == 3
+
+    def test_columns(self, app: App, db: Database):
+        with app.app_context():
+            db.bulk_push(
+                {'_username': ['a', 'b'], '_password': ['1', '2']},
+                orm_class=UserOrm)
+
+            assert UserOrm.get_first(_username='b')._password == '2'
+
+            with pytest.raises(ValueError):
+                db.bulk_push(
+                    {'_username': ['a', 'b'], '_password': ['1']},
+                    orm_class=UserOrm)
+
+    def test_polymorphic(self, app: App, db: Database):
+        with app.app_context():
+            badge_orm: BadgeOrm = BadgeOrm.create(name='gold')
+            db.refpush(badge_orm)
+
+            ids: list[int] | None = db.bulk_push(
+                [
+                    UserOrm(_username='simple'),
+                    AdvancedUserOrm(_username='advanced', _badge_id=badge_orm.id)
+                ],
+                has_to_return_ids=True)
+            assert ids is not None
+
+            advanced_user_orm = UserOrm.get_first(_username='advanced')
+            assert type(advanced_user_orm) is AdvancedUserOrm
+            assert advanced_user_orm.type == 'advanced_user'
+            assert advanced_user_orm.id == ids[1]
+
+    def test_mappings_without_orm_class(self, app: App, db: Database):
+        with app.app_context():
+            with pytest.raises(ValueError):
+                db.bulk_push([{'_username': 'max'}])
+
+
+class TestIterAll(Test):
+    def test_chunks(self, app: App, db: Database):
+        with app.app_context():
+            db.bulk_push(
+                {'_username': [f'user{i:02}' for i in range(25)]},
+                orm_class=UserOrm)
+
+            usernames: list[str] = []
+            for user_orm in UserOrm.iter_all(chunk_size=10):
+                usernames.append(user_orm.username)
+            assert usernames == [f'user{i:02}' for i in range(25)]
+
+    def test_order_by(self, app: App, db: Database):
+        with app.app_context():
+            db.bulk_push(
+                {'_username': ['b', 'a', 'c', 'a']}, orm_class=UserOrm)
+
+            assert [
+                (x.username, x.id) for x in UserOrm.iter_all(
+                    chunk_size=1, order_by=UserOrm._username)
+            ] == [('a', 2), ('a', 4), ('b', 1), ('c', 3)]
+
+            assert [
+                x.id for x in UserOrm.iter_all(
+                    chunk_size=3, order_by=UserOrm._id.desc())
+            ] == [4, 3, 2, 1]
+
+            with pytest.raises(ValueError):
+                list(UserOrm.iter_all(
+                    order_by=[UserOrm._username, UserOrm._id.desc()]))
+
+    def test_expunged(self, app: App, db: Database):
+        with app.app_context():
+            db.bulk_push({'_username': ['a', 'b', 'c']}, orm_class=UserOrm)
+
+            iterator = UserOrm.iter_all(chunk_size=2)
+            first_user_orm: UserOrm = next(iterator)
+            assert first_user_orm in db.native_database.session
+
+            remaining: list[UserOrm] = list(iterator)
+            assert len(remaining) == 2
+            assert first_user_orm not in db.native_database.session
+
+    def test_filter(self, app: App, db: Database):
+        with app.app_context():
+            db.bulk_push({'_username': ['a', 'b', 'a']}, orm_class=UserOrm)
+
+            assert [x.id for x in UserOrm.iter_all(_username='a')] == [1, 3]
+
+    def test_eager_collection(self, app: App, db: Database):
+        with app.app_context():
+            db.bulk_push(
+                {'_title': ['a', 'b', 'c'], '_content': ['1', '2', '3']},
+                orm_class=PostOrm)
+
+            assert [x._title for x in PostOrm.iter_all(chunk_size=2)] \
+                == ['a', 'b', 'c']
+
+
+@fixture
+def cached_user_orm(monkeypatch):
+    monkeypatch.setattr(UserOrm, 'CACHE_TTL', 60)
+    yield UserOrm
+
+
+class TestQueryCache(Test):
+    def test_hit(self, app: App, db: Database, cached_user_orm):
+        with app.app_context():
+            db.push(UserOrm.create(username='max', password='123'))
+            stats: dict[str, int] = db.query_cache.get_orm_stats(UserOrm)
+
+            assert UserOrm.get_first(_username='max').username == 'max'
+            assert len(UserOrm.get_all()) == 1
+            db.remove()
+
+            user_orm: UserOrm = UserOrm.get_first(_username='max')
+            assert user_orm in db.native_database.session
+            assert user_orm.check_password('123')
+            assert len(UserOrm.get_all()) == 1
+
+            new_stats: dict[str, int] = db.query_cache.get_orm_stats(UserOrm)
+            assert new_stats['misses'] - stats['misses'] == 2
+            assert new_stats['hits'] - stats['hits'] == 2
+
+    def test_invalidation_on_commit(
+            self, app: App, db: Database, cached_user_orm):
+        with app.app_context():
+            db.push(UserOrm.create(username='max', password='123'))
+            assert len(UserOrm.get_all()) == 1
+
+            db.push(UserOrm.create(username='john', password='123'))
+            assert len(UserOrm.get_all()) == 2
+
+            user_orm: UserOrm = UserOrm.get_first(_username='john')
+            user_orm_id: int = user_orm.id
+            user_orm._username = 'johnny'
+            db.commit()
+            db.remove()
+            assert UserOrm.get_first(_username='johnny').id == user_orm_id
+
+            db.bulk_push({'_username': ['a']}, orm_class=UserOrm)
+            assert len(UserOrm.get_all()) == 3
+
+    def test_not_invalidated_on_rollback(
+            self, app: App, db: Database, cached_user_orm):
+        with app.app_context():
+            db.push(UserOrm.create(username='max', password='123'))
+            assert len(UserOrm.get_all()) == 1
+            stats: dict[str, int] = db.query_cache.get_orm_stats(UserOrm)
+
+            db.add(UserOrm.create(username='john', password='123'))
+            db.flush()
+            db.rollback()
+            assert len(UserOrm.get_all()) == 1
+
+            new_stats: dict[str, int] = db.query_cache.get_orm_stats(UserOrm)
+            assert new_stats['hits'] - stats['hits'] == 1
+
+    def test_read_own_writes(
+            self, app: App, db: Database, cached_user_orm):
+        with app.app_context():
+            db.push(UserOrm.create(username='max', password='123'))
+            assert len(UserOrm.get_all()) == 1
+
+            with db.transaction():
+                db.push(UserOrm.create(username='john', password='123'))
+                assert len(UserOrm.get_all()) == 2
+                assert UserOrm.get_first(_username='john').username == 'john'
+            assert len(UserOrm.get_all()) == 2
+
+            db.add(UserOrm.create(username='kate', password='123'))
+            assert len(UserOrm.get_all()) == 3
+            db.rollback()
+
+            # Results including rolled back changes are not cached
+            assert len(UserOrm.get_all()) == 2
+
+    def test_disabled(self, app: App, db: Database):
+        with app.app_context():
+            stats: dict[str, int] = db.query_cache.get_orm_stats(UserOrm)
+            UserOrm.get_all()
+            assert db.query_cache.get_orm_stats(UserOrm) == stats
+
+
+class TestPoolStats(Test):
+    def test_checkouts(self, app: App, db: Database):
+        with app.app_context():
+            checkouts: int = db.get_pool_stats()['checkouts']
+            UserOrm.get_all()
+            db.remove()
+
+            stats: dict = db.get_pool_stats()
+            assert stats['checkouts'] > checkouts
+            assert stats['checked_out'] == 0
+
+    def test_engine_options(self, db: Database):
+        assert db._get_engine_options(
+            {'recycle': 3600, 'pre_ping': True, 'size': 10}) \
+                == {'pool_recycle': 3600, 'pool_pre_ping': True}
+
+        with pytest.raises(ValueError):
+            db._get_engine_options({'unknown': 1})
+
+    def test_engine_options_sqlite_profile(
+            self, db: Database, monkeypatch):
+        # Profiled sqlite uses queue pool, so sizing options are applied
+        monkeypatch.setattr(
+            db, 'sqlite_profile', SqliteProfile.from_config({'profile': 'wal'}))
+        assert db._get_engine_options({'size': 10, 'timeout': 5}) \
+            == {'pool_size': 10, 'pool_timeout': 5}
+
+
+@fixture
+def replica_router(app: App, db: Database, tmp_path):
+    # Replica has own data to distinguish reads sent to it
+    router = ReplicaRouter(
+        ['sqlite:///' + os.path.join(tmp_path, 'replica.db')],
+        read_your_writes_window=60)
+    engine = router.engines[0]
+    db.native_database.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            sa.insert(UserOrm.__table__),
+            {'_type': 1, '_username': 'replica', '_password': '123'})
+
+    extensions: dict = app.native_app.extensions
+    extensions[RoutingSession.REPLICA_ROUTER_KEY] = router
+    yield router
+    extensions.pop(RoutingSession.REPLICA_ROUTER_KEY, None)
+    router.dispose()
+
+
+class TestReplicaReads(Test):
+    def test_reads(self, app: App, db: Database, replica_router):
+        with app.app_context():
+            assert [x.username for x in UserOrm.get_all()] == ['replica']
+            assert UserOrm.get_first().username == 'replica'
+            assert [x.username for x in UserOrm.iter_all()] == ['replica']
+            # Queries outside of Orm read helpers go to primary
+            assert UserOrm.query.all() == []
+
+    def test_writes(self, app: App, db: Database, replica_router):
+        with app.app_context():
+            db.push(UserOrm.create(username='max', password='123'))
+            # Within read-your-writes window after the commit
+            assert [x.username for x in UserOrm.get_all()] == ['max']
+
+            db.remove()
+            assert [x.username for x in UserOrm.get_all()] == ['replica']
+
+            db.add(UserOrm.create(username='john', password='123'))
+            # Pending changes are flushed and read from primary
+            assert sorted(x.username for x in UserOrm.get_all()) \
+                == ['john', 'max']
+
+    def test_cached_from_primary(
+            self, app: App, db: Database, replica_router, cached_user_orm):
+        with app.app_context():
+            db.push(UserOrm.create(username='max', password='123'))
+            db.remove()
+
+            # Replica lags behind, but isn't cached for the whole TTL
+            assert [x.username for x in UserOrm.get_all()] == ['max']
+            assert UserOrm.get_first().username == 'max'
+            # Uncached reads still go to replicas
+            assert [x.username for x in UserOrm.iter_all()] == ['replica']
+
+    def test_fallback(self, app: App, db: Database, replica_router):
+        replica_router.mark_unavailable(replica_router.engines[0])
+
+        with app.app_context():
+            db.push(UserOrm.create(username='max', password='123'))
+            db.remove()
+            assert [x.username for x in UserOrm.get_all()] == ['max']
+
+    def test_replicas_config(self, db: Database):
+        assert db._parse_uri('./replica.database')[0] \
+            == 'sqlite:///./replica.database'
+        with pytest.raises(ValueError):
+            db._parse_uri('mysql://localhost/replica')
+
+
+@fixture
+def statements(app: App, db: Database):
+    """Collect statements executed by the engine within the fixture."""
+    executed: list[str] = []
+
+    def collect(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    with app.app_context():
+        engine = db.native_database.engine
+    sa.event.listen(engine, 'before_cursor_execute', collect)
+    yield executed
+    sa.event.remove(engine, 'before_cursor_execute', collect)
+
+
+class TestLoad(Test):
+    def push_users(self, db: Database) -> None:
+        for i in range(3):
+            user_orm: UserOrm = UserOrm.create(
+                username=f'user{i}', password='123')
+            for j in range(2):
+                PostOrm.create(
+                    title=f'post{i}{j}',
+                    content='content',
+                    creator_user_orm=user_orm)
+            db.add(user_orm)
+        db.commit()
+        db.remove()
+
+    def test_lazy(self, app: App, db: Database, statements):
+        with app.app_context():
+            self.push_users(db)
+            statements.clear()
+
+            for user_orm in UserOrm.get_all():
+                assert len(user_orm.post_ids) == 2
+            # Tags of posts are loaded by own subquery strategy along with
+            # every posts query
+            assert len(statements) == 1 + 3 * 2
+
+    def test_selectin(self, app: App, db: Database, statements):
+        with app.app_context():
+            self.push_users(db)
+            statements.clear()
+
+            for user_orm in UserOrm.get_all(load={'_post_orms': 'selectin'}):
+                assert len(user_orm.post_ids) == 2
+            assert len(statements) == 3
+
+    def test_joined(self, app: App, db: Database, statements):
+        with app.app_context():
+            self.push_users(db)
+            statements.clear()
+
+            user_orm: UserOrm = UserOrm.get_first(
+                _username='user1', load={'_post_orms': 'joined'})
+            assert len(user_orm.post_ids) == 2
+            assert len(statements) == 2
+
+    def test_nested(self, app: App, db: Database, statements):
+        with app.app_context():
+            self.push_users(db)
+            statements.clear()
+
+            post_orms = [
+                x for user_orm in UserOrm.get_all(load={
+                    '_post_orms': 'selectin',
+                    '_post_orms.user': 'joined'
+                })
+                for x in user_orm._post_orms
+            ]
+            assert all(x.user.username for x in post_orms)
+            assert len(statements) == 3
+
+    def test_raise(self, app: App, db: Database):
+        with app.app_context():
+            self.push_users(db)
+
+            user_orm: UserOrm = UserOrm.get_first(
+                _username='user1', load={'*': 'raise'})
+            with pytest.raises(sa.exc.InvalidRequestError):
+                user_orm.post_ids
+
+    def test_default_load(
+            self, app: App, db: Database, statements, monkeypatch):
+        monkeypatch.setattr(
+            UserOrm, 'DEFAULT_LOAD', {'_post_orms': 'selectin'})
+
+        with app.app_context():
+            self.push_users(db)
+            statements.clear()
+
+            user_orms: list[UserOrm] = list(UserOrm.iter_all(chunk_size=2))
+            assert [len(x.post_ids) for x in user_orms] == [2, 2, 2]
+            assert len(statements) == 2 * 3
+
+            db.remove()
+            with pytest.raises(sa.exc.InvalidRequestError):
+                UserOrm.get_first(load={'_post_orms': 'raise'}).post_ids
+
+    def test_cache_bypassed(
+            self, app: App, db: Database, cached_user_orm):
+        with app.app_context():
+            self.push_users(db)
+            stats: dict[str, int] = db.query_cache.get_orm_stats(UserOrm)
+
+            UserOrm.get_all(load={'_post_orms': 'selectin'})
+            assert db.query_cache.get_orm_stats(UserOrm) == stats
+
+    def test_wrong_load(self, app: App, db: Database):
+        with app.app_context():
+            with pytest.raises(ValueError):
+                UserOrm.get_all(load={'_post_orms': 'eager'})
+            with pytest.raises(ValueError):
+                UserOrm.get_all(load={'_unknown_orms': 'selectin'})
+            with pytest.raises(ValueError):
+                UserOrm.get_all(load={'_post_orms._unknown_orms': 'joined'})
+
+
+class TestTypeCodes(Test):
+    def test_stored_codes(self, app: App, db: Database):
+        with app.app_context():
+            badge_orm: BadgeOrm = BadgeOrm.create(name='gold')
+            db.refpush(badge_orm)
+            db.push(UserOrm.create(username='simple', password='123'))
+            db.push(
+                AdvancedUserOrm(_username='advanced', _badge_orm=badge_orm))
+
+            assert db.native_database.session.execute(
+                sa.text('SELECT _type FROM user_orm ORDER BY _id')
+            ).scalars().all() == [1, 2]
+            assert [x['name'] for x in sa.inspect(
+                db.native_database.engine).get_indexes('user_orm')] \
+                    == ['ix_user_orm__type']
+
+            assert [x.type for x in UserOrm.get_all(order_by=UserOrm.id)] \
+                == ['user', 'advanced_user']
+            assert [x.username for x in AdvancedUserOrm.get_all()] \
+                == ['advanced']
+            assert [
+                x.username for x in UserOrm.query.filter(
+                    UserOrm.type == 'advanced_user')
+            ] == ['advanced']
+
+    def test_with_polymorphic(
+            self, app: App, db: Database, statements):
+        with app.app_context():
+            badge_orm: BadgeOrm = BadgeOrm.create(name='gold')
+            db.refpush(badge_orm)
+            badge_id: int = badge_orm.id
+            db.push(
+                AdvancedUserOrm(_username='advanced', _badge_orm=badge_orm))
+            db.remove()
+            statements.clear()
+
+            advanced_user_orm: AdvancedUserOrm = UserOrm.get_first()
+            assert advanced_user_orm._badge_id == badge_id
+            # Columns of the subclass are loaded with the base query
+            assert len(statements) == 1
+
+
+class TestAggregates(Test):
+    def test_aggregates(self, app: App, db: Database, statements):
+        with app.app_context():
+            badge_orm: BadgeOrm = BadgeOrm.create(name='gold')
+            db.refpush(badge_orm)
+            badge_id: int = badge_orm.id
+            db.push(UserOrm.create(username='simple', password='123'))
+            db.push(
+                AdvancedUserOrm(_username='advanced', _badge_orm=badge_orm))
+            db.push(
+                AdvancedUserOrm(_username='expert', _badge_orm=badge_orm))
+            db.remove()
+            statements.clear()
+
+            assert UserOrm.get_count() == 3
+            assert AdvancedUserOrm.get_count() == 2
+            assert UserOrm.get_count(_username='advanced') == 1
+            assert AdvancedUserOrm.get_count(_username='simple') == 0
+
+            assert UserOrm.check_exists(_username='simple')
+            assert not AdvancedUserOrm.check_exists(_username='simple')
+
+            assert UserOrm.get_sum(UserOrm._id) == 6
+            assert AdvancedUserOrm.get_sum(UserOrm._id) == 5
+            assert AdvancedUserOrm.get_min(UserOrm._id) == 2
+            assert UserOrm.get_max(UserOrm._id, _username='simple') == 1
+            assert AdvancedUserOrm.get_avg(AdvancedUserOrm._badge_id) \
+                == badge_id
+            assert UserOrm.get_max(UserOrm._id, _username='unknown') is None
+
+            # Every helper is a single query not loading any model
+            assert len(statements) == 12
+            assert len(db.native_database.session.identity_map) == 0
+
+
+class TestWhere(Test):
+    def push_users(self, db: Database) -> None:
+        badge_orm: BadgeOrm = BadgeOrm.create(name='gold')
+        db.add(UserOrm.create(username='simple', password='123'))
+        db.add(AdvancedUserOrm(_username='advanced', _badge_orm=badge_orm))
+        db.add(AdvancedUserOrm(_username='expert', _badge_orm=badge_orm))
+        db.commit()
+
+    def test_delete_where(self, app: App, db: Database, statements):
+        with app.app_context():
+            self.push_users(db)
+            simple_user_orm: UserOrm = UserOrm.get_first(_username='simple')
+            advanced_user_orm: UserOrm = UserOrm.get_first(
+                _username='advanced')
+            statements.clear()
+
+            assert AdvancedUserOrm.delete_where(_username='simple') == 0
+            assert AdvancedUserOrm.delete_where() == 2
+            assert len(statements) == 2
+            assert advanced_user_orm not in db.native_database.session
+            assert simple_user_orm in db.native_database.session
+            db.commit()
+
+            assert [x.username for x in UserOrm.get_all()] == ['simple']
+
+    def test_update_where(self, app: App, db: Database, statements):
+        with app.app_context():
+            self.push_users(db)
+            user_orms: list[UserOrm] = UserOrm.get_all(order_by=UserOrm.id)
+            statements.clear()
+
+            assert AdvancedUserOrm.update_where(
+                {}, {'_username': UserOrm._username + '_user'}) == 2
+            assert UserOrm.update_where(
+                {'_username': 'simple'}, {'_password': '456'}) == 1
+            assert len(statements) == 2
+            assert [x.username for x in user_orms] \
+                == ['simple', 'advanced_user', 'expert_user']
+            assert user_orms[0]._password == '456'
+            db.commit()
+            db.remove()
+
+            assert [
+                x.username for x in UserOrm.get_all(order_by=UserOrm.id)
+            ] == ['simple', 'advanced_user', 'expert_user']
+
+    def test_cache_invalidated(
+            self, app: App, db: Database, cached_user_orm):
+        with app.app_context():
+            self.push_users(db)
+            assert UserOrm.get_count() == len(UserOrm.get_all()) == 3
+
+            UserOrm.delete_where(_username='simple')
+            db.commit()
+            assert len(UserOrm.get_all()) == 2
+
+            UserOrm.update_where({}, {'_username': 'same'})
+            db.commit()
+            assert len(UserOrm.get_all(_username='same')) == 2
+
+    def test_related_tables_changed(self, app: App, db: Database):
+        with app.app_context():
+            UserOrm.delete_where(_username='simple')
+
+            # Badges by relationship of the subclass, posts by foreign key
+            assert db.native_database.session.info[
+                Database.CHANGED_TABLES_KEY] == {
+                    'user_orm', 'badge_orm', 'post_orm'}
+            db.rollback()
+
+
+@fixture
+def commits(app: App, db: Database):
+    """Count commits of the session within the fixture."""
+    committed: list[None] = []
+
+    def count(session):
+        committed.append(None)
+
+    with app.app_context():
+        session_factory = db.native_database.session.session_factory
+    sa.event.listen(session_factory, 'after_commit', count)
+    yield committed
+    sa.event.remove(session_factory, 'after_commit', count)
+
+
+class TestTransaction(Test):
+    def test_commit_once(self, app: App, db: Database, commits):
+        with app.app_context():
+            with db.transaction():
+                first_user_orm: UserOrm = UserOrm.create(
+                    username='first', password='123')
+                db.push(first_user_orm)
+                # Flushed, so id is available within the scope
+                assert first_user_orm.id is not None
+                db.push(UserOrm.create(username='second', password='123'))
+                assert commits == []
+            assert len(commits) == 1
+
+            db.remove()
+            assert UserOrm.get_count() == 2
+
+    def test_rollback(self, app: App, db: Database, commits):
+        with app.app_context():
+            with pytest.raises(ValueError):
+                with db.transaction():
+                    db.push(UserOrm.create(username='first', password='123'))
+                    raise ValueError
+            assert commits == []
+            assert UserOrm.get_count() == 0
+
+    def test_nested(self, app: App, db: Database, commits):
+        with app.app_context():
+            with db.transaction():
+                with db.transaction():
+                    db.push(UserOrm.create(username='first', password='123'))
+                assert commits == []
+                db.push(UserOrm.create(username='second', password='123'))
+            assert len(commits) == 1
+            assert UserOrm.get_count() == 2
+
+    def test_nested_error_caught(self, app: App, db: Database, commits):
+        with app.app_context():
+            with pytest.raises(sa.exc.InvalidRequestError):
+                with db.transaction():
+                    db.push(UserOrm.create(username='first', password='123'))
+                    with pytest.raises(ValueError):
+                        with db.transaction():
+                            db.push(UserOrm.create(
+                                username='second', password='123'))
+                            raise ValueError
+                    db.push(UserOrm.create(username='third', password='123'))
+            assert commits == []
+            assert UserOrm.get_count() == 0
+
+            # Failure is not carried over to the next transaction
+            with db.transaction():
+                db.push(UserOrm.create(username='fourth', password='123'))
+            assert len(commits) == 1
+            assert UserOrm.get_count() == 1
+
+    def test_decorator(self, app: App, db: Database, commits):
+        @db.transaction()
+        def create_users(count: int) -> None:
+            for i in range(count):
+                db.push(UserOrm.create(username=f'user{i}', password='123'))
+
+        with app.app_context():
+            create_users(3)
+            create_users(2)
+            assert len(commits) == 2
+            assert UserOrm.get_count() == 5
+
+    def test_refpush_batched(self, app: App, db: Database, statements):
+        with app.app_context():
+            user_orms: list[UserOrm] = [
+                UserOrm.create(username=f'user{i}', password='123')
+                for i in range(5)
+            ]
+            with db.transaction():
+                for user_orm in user_orms:
+                    db.refpush(user_orm)
+                statements.clear()
+
+            # Commit is not a statement, so only refresh is left
+            assert len(statements) == 1
+            assert statements[0].startswith('SELECT')
+            assert [x.username for x in user_orms] \
+                == [f'user{i}' for i in range(5)]
+
+    def test_refresh_deleted(self, app: App, db: Database):
+        with app.app_context():
+            user_orms: list[UserOrm] = [
+                UserOrm.create(username=f'user{i}', password='123')
+                for i in range(2)
+            ]
+            db.push(*user_orms)
+            UserOrm.delete_where(_username='user1')
+
+            with pytest.raises(sa.exc.InvalidRequestError):
+                db.refresh(*user_orms)
+
+
+class TestSelectRows(Test):
+    def push_users(self, db: Database) -> None:
+        badge_orm: BadgeOrm = BadgeOrm.create(name='gold')
+        db.add(UserOrm.create(username='simple', password='123'))
+        db.add(AdvancedUserOrm(_username='advanced', _badge_orm=badge_orm))
+        db.commit()
+
+    def test_select_rows(self, app: App, db: Database):
+        with app.app_context():
+            self.push_users(db)
+            db.remove()
+
+            rows = UserOrm.select_rows(
+                'id', 'username', sa.func.upper(UserOrm._username).label(
+                    'upper'),
+                order_by=UserOrm.id)
+            assert [tuple(x) for x in rows] \
+                == [(1, 'simple', 'SIMPLE'), (2, 'advanced', 'ADVANCED')]
+            assert rows[1].username == 'advanced'
+            # Models are not loaded to the session
+            assert len(db.native_database.session.identity_map) == 0
+
+            assert [x.username for x in AdvancedUserOrm.select_rows(
+                'username')] == ['advanced']
+            assert UserOrm.select_rows(
+                'id', _username='advanced', limit=1)[0].id == 2
+
+            with pytest.raises(ValueError):
+                UserOrm.select_rows()
+
+    def test_get_all_columns(self, app: App, db: Database):
+        with app.app_context():
+            self.push_users(db)
+
+            assert [
+                tuple(x) for x in UserOrm.get_all(
+                    order_by=UserOrm.id, limit=1, columns=['id', 'type'])
+            ] == [(1, 'user')]
+
+    def test_select_models(self, app: App, db: Database):
+        with app.app_context():
+            self.push_users(db)
+            expected: list[User] = [
+                x.model for x in UserOrm.get_all(order_by=UserOrm.id)
+            ]
+            db.remove()
+
+            assert UserOrm.select_models(User, order_by=UserOrm.id) \
+                == expected
+            assert len(db.native_database.session.identity_map) == 0
+
+
+class TestToModels(Test):
+    def push_users(self, db: Database) -> None:
+        badge_orm: BadgeOrm = BadgeOrm.create(name='gold')
+        for i in range(3):
+            db.add(UserOrm.create(username=f'user{i}', password='123'))
+        db.add(AdvancedUserOrm(_username='advanced', _badge_orm=badge_orm))
+        db.commit()
+
+    def test_to_models(self, app: App, db: Database):
+        with app.app_context():
+            self.push_users(db)
+            user_orms: list[UserOrm] = UserOrm.get_all(order_by=UserOrm.id)
+
+            users: list[User] = UserOrm.to_models(user_orms)
+            assert users == [
+                User(id=x.id, type=x.type, username=x.username)
+                for x in user_orms
+            ]
+            assert users[-1].type == 'advanced_user'
+            assert user_orms[0].model == users[0]
+            assert UserOrm.to_models([]) == []
+
+    def test_model_fields(self, app: App, db: Database, monkeypatch):
+        monkeypatch.setattr(
+            UserOrm, 'MODEL_FIELDS', {'username': '_password'})
+        monkeypatch.setattr(Orm, '_model_mappings', {})
+        with app.app_context():
+            self.push_users(db)
+            user_orm: UserOrm = UserOrm.get_first(id=1)
+
+            assert UserOrm.to_models([user_orm])[0].username \
+                == user_orm._password
+
+    def test_nested_model(self, app: App, db: Database, monkeypatch):
+        class Author(Model):
+            id: int
+            user: User
+
+        with app.app_context():
+            self.push_users(db)
+            user_orms: list[UserOrm] = UserOrm.get_all(order_by=UserOrm.id)
+            users: list[User] = UserOrm.to_models(user_orms)
+
+            monkeypatch.setattr(UserOrm, 'MODEL_CLASS', Author)
+            monkeypatch.setattr(UserOrm, 'MODEL_FIELDS', {'user': 'user'})
+            monkeypatch.setattr(Orm, '_model_mappings', {})
+            monkeypatch.setattr(
+                UserOrm,
+                'user',
+                property(lambda x: users[x.id - 1]),
+                raising=False)
+
+            authors: list[Model] = UserOrm.to_models(user_orms)
+            assert authors == [
+                Author(id=x.id, user=users[x.id - 1]) for x in user_orms]
+            assert authors[0].dict(exclude_unset=True) == {
+                'id': 1,
+                'user': {'id': 1, 'type': 'user', 'username': 'user0'}
+            }
+            assert authors[0].__fields_set__ is not authors[1].__fields_set__
+
+    def test_validation_rate(self, app: App, db: Database, monkeypatch):
+        with app.app_context():
+            self.push_users(db)
+            user_orms: list[UserOrm] = UserOrm.get_all(order_by=UserOrm.id)
+            db.native_database.session.expunge_all()
+            user_orms[1]._username = None  # type: ignore
+
+            # Only the first and the third models are validated
+            UserOrm.to_models(user_orms, validation_rate=0.5)
+            with pytest.raises(ValidationError):
+                UserOrm.to_models(user_orms, validation_rate=1)
+
+            with pytest.raises(ValueError):
+                UserOrm.to_models(user_orms, validation_rate=2)
+
+    def test_no_model_class(self, app: App, db: Database):
+        with app.app_context():
+            with pytest.raises(NotImplementedError):
+                PostOrm.to_models([])
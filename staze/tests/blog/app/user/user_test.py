@@ -1,8 +1,12 @@
+import pytest
 from pytest import fixture
 from staze.core.test.http_client import HttpClient
+from staze.core.test.sql_assertions import SqlAssertions
 from staze.core.test.test import Test
 from staze.core.app.app import App
 from staze.core.database.database import Database
+from staze.core.log.log import log
+from staze.tests.blog.app.post.post_orm import PostOrm
 from staze.tests.blog.app.user.user import User
 from staze.tests.blog.app.user.user_orm import UserOrm
 from staze.core.parsing import parse, parse_key
@@ -14,6 +18,18 @@ def user_orm(app: App, db: Database) -> UserOrm:
         return UserOrm.create(username='max', password='helloworld')
 
 
+@fixture
+def response_records():
+    records: list[dict] = []
+    handler_id: int = log.logger.add(
+        lambda message: records.append(message.record),
+        level='DEBUG',
+        filter=lambda record:
+            'http_response_status_code' in record['extra'])
+    yield records
+    log.logger.remove(handler_id)
+
+
 class TestApiUsersId(Test):
     def test_get(
             self, app: App, db: Database, http: HttpClient, user_orm: UserOrm):
@@ -22,3 +38,92 @@ class TestApiUsersId(Test):
             response = http.get('/users/1', 200)
             json: dict = parse(response.json, dict)
             User(**json['user'])
+
+    def test_sql_stats(
+            self,
+            app: App,
+            db: Database,
+            http: HttpClient,
+            user_orm: UserOrm,
+            response_records: list[dict]):
+        with app.app_context():
+            db.refpush(user_orm)
+        http.get('/users/1', 200)
+
+        extra: dict = response_records[-1]['extra']
+        assert extra['db_statements'] == 1
+        assert extra['db_slowest_statement'].startswith('SELECT user_orm.')
+        assert extra['db_duration'] == extra['db_slowest_duration'] > 0
+
+
+class TestApiUsers(Test):
+    def push_users(self, db: Database, count: int) -> None:
+        for i in range(count):
+            user_orm: UserOrm = UserOrm.create(
+                username=f'user{i}', password='123')
+            PostOrm.create(
+                title=f'post{i}', content='content', creator_user_orm=user_orm)
+            db.add(user_orm)
+        db.commit()
+
+    def test_n_plus_one(
+            self,
+            app: App,
+            db: Database,
+            http: HttpClient,
+            sql: SqlAssertions):
+        with app.app_context():
+            self.push_users(db, 7)
+
+        with pytest.raises(AssertionError) as error:
+            with sql.no_n_plus_one():
+                http.get('/users', 200)
+        assert 'user_orm.py' in str(error.value)
+
+        with pytest.raises(AssertionError):
+            with sql.max_statements(3):
+                http.get('/users', 200)
+
+    def test_eager_load(
+            self,
+            app: App,
+            db: Database,
+            http: HttpClient,
+            sql: SqlAssertions,
+            monkeypatch):
+        monkeypatch.setattr(
+            UserOrm, 'DEFAULT_LOAD', {'_post_orms': 'selectin'})
+        with app.app_context():
+            self.push_users(db, 7)
+
+        # Users, their posts and tags of the posts
+        with sql.max_statements(3), sql.no_n_plus_one():
+            response = http.get('/users', 200)
+        assert len(response.json['users']) == 7
+
+    @fixture
+    def unit_of_work(self, db: Database, monkeypatch):
+        monkeypatch.setattr(db, '_is_request_unit_of_work', True)
+
+    def test_post_unit_of_work(
+            self,
+            app: App,
+            db: Database,
+            http: HttpClient,
+            unit_of_work):
+        users: list[dict] = [
+            {'username': f'user{i}', 'password': '123'} for i in range(3)
+        ]
+
+        response = http.post('/users', 200, json={'users': users})
+        assert response.json['user_ids'] == [1, 2, 3]
+
+        # Users pushed before the error are rolled back as well
+        http.post(
+            '/users', 400,
+            json={'users': [
+                {'username': 'user3', 'password': '123'},
+                {'username': '', 'password': '123'}
+            ]})
+        with app.app_context():
+            assert UserOrm.get_count() == 3
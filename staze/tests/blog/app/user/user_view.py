@@ -1,4 +1,5 @@
-from staze import View
+from flask import request
+from staze import Database, Error, View
 from staze.tests.blog.app.user.user_service import UserService
 
 from .user_orm import UserOrm
@@ -12,6 +13,31 @@ class UsersIdView(View):
         return user_orm.model.api_dict
 
 
+class UsersView(View):
+    ROUTE: str = '/users'
+
+    def get(self):
+        return {
+            'users': [
+                {'id': x.id, 'post_ids': x.post_ids}
+                for x in UserOrm.get_all(order_by=UserOrm.id)
+            ]
+        }
+
+    def post(self):
+        user_ids: list[int] = []
+
+        for user in request.json['users']:
+            if not user['username']:
+                raise Error('Username should not be empty')
+            user_orm: UserOrm = UserOrm.create(
+                username=user['username'], password=user['password'])
+            Database.instance().push(user_orm)
+            user_ids.append(user_orm.id)
+
+        return {'user_ids': user_ids}
+
+
 class UsersServiceLogView(View):
     ROUTE: str = '/users/service/log'
 
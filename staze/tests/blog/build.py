@@ -10,7 +10,8 @@ from staze.tests.blog.app.post.post_orm import PostOrm
 from staze.tests.blog.app.tag.tag_orm import TagOrm
 from staze.tests.blog.app.user.user_orm import UserOrm
 from staze.tests.blog.app.user.user_service import UserService
-from staze.tests.blog.app.user.user_view import UsersIdView, UsersServiceLogView
+from staze.tests.blog.app.user.user_view import (
+    UsersIdView, UsersServiceLogView, UsersView)
 from staze.tests.blog.app.favicon_view import FaviconView
 
 
@@ -31,6 +32,7 @@ service_classes: list[type[Service]] = [
 
 view_classes: list[type[View]] = [
     UsersIdView,
+    UsersView,
     UsersServiceLogView,
     HomeView,
     FaviconView
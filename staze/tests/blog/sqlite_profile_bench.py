@@ -0,0 +1,101 @@
+"""Benchmark of sqlite profiles against blog ORMs.
+
+For every profile of SqliteProfile measures per second amount of:
+- `commits` - users inserted in own transaction each, as `Database.push` does
+- `batch_rows` - posts inserted in transactions of BATCH_SIZE rows
+- `reads` - users fetched by username with a fresh session state
+
+Run as:
+```sh
+python -m staze.tests.blog.sqlite_profile_bench
+```
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from staze.core.database.database import Database
+from staze.core.database.sqlite_profile import SqliteProfile
+from staze.tests.blog.app.post.post_orm import PostOrm
+from staze.tests.blog.app.user.user_orm import UserOrm
+
+# Imported to register all blog tables in metadata
+from staze.tests.blog.app.badge.badge_orm import BadgeOrm  # noqa
+from staze.tests.blog.app.tag.tag_orm import TagOrm  # noqa
+
+
+BATCH_SIZE: int = 100
+
+
+def bench_profile(
+        profile: SqliteProfile, path: str, count: int) -> dict[str, float]:
+    """Return operations per second of every workload for given profile."""
+    # Connections are kept open as Database does for sqlite profiles,
+    # otherwise pragmas are applied and caches are lost on every checkout
+    engine: Any = sa.create_engine(
+        f'sqlite:///{path}', poolclass=sa.pool.QueuePool)
+    profile.listen(engine)
+    Database.native_database.metadata.create_all(engine)
+
+    result: dict[str, float] = {}
+
+    try:
+        with Session(engine) as session:
+            started_at: float = time.perf_counter()
+            for i in range(count):
+                session.add(UserOrm(_username=f'user{i}', _password='123'))
+                session.commit()
+            result['commits'] = count / (time.perf_counter() - started_at)
+
+            started_at = time.perf_counter()
+            for i in range(count):
+                session.add(PostOrm(_title=f'post{i}', _content='content'))
+                if (i + 1) % BATCH_SIZE == 0:
+                    session.commit()
+            session.commit()
+            result['batch_rows'] = count / (time.perf_counter() - started_at)
+
+            started_at = time.perf_counter()
+            for i in range(count):
+                session.query(UserOrm).filter_by(
+                    _username=f'user{i}').first()
+                # Identity map would serve repeated reads without sqlite
+                session.expunge_all()
+            result['reads'] = count / (time.perf_counter() - started_at)
+    finally:
+        engine.dispose()
+
+    return result
+
+
+def run(count: int = 2000) -> dict[str, dict[str, float]]:
+    """Return results of every predefined profile by it's name."""
+    results: dict[str, dict[str, float]] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in SqliteProfile.PROFILES:
+            results[name] = bench_profile(
+                SqliteProfile.from_config({'profile': name}),
+                os.path.join(directory, f'{name}.database'),
+                count)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark sqlite profiles against blog ORMs')
+    parser.add_argument(
+        '--count', type=int, default=2000,
+        help='amount of operations of every workload')
+    parsed = parser.parse_args()
+
+    for name, result in run(parsed.count).items():
+        print(
+            f'{name:>12}: {result["commits"]:>9.0f} commits/sec,'
+            f' {result["batch_rows"]:>9.0f} batch rows/sec,'
+            f' {result["reads"]:>9.0f} reads/sec')
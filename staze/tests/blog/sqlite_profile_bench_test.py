@@ -0,0 +1,9 @@
+from staze.tests.blog import sqlite_profile_bench
+
+
+def test_run():
+    results: dict[str, dict[str, float]] = sqlite_profile_bench.run(count=50)
+
+    assert list(results.keys()) == ['default', 'wal', 'performance']
+    for result in results.values():
+        assert all(x > 0 for x in result.values())